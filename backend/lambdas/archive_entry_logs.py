@@ -0,0 +1,223 @@
+"""
+Lambda function to archive old entry logs from Entry_Log to S3.
+Triggered on a schedule (EventBridge, e.g. once per night).
+Writes logs older than the retention window as day-partitioned,
+gzip-compressed JSON-lines objects and sets a DynamoDB TTL on the
+originals so the hot table stays small.
+"""
+
+import json
+import gzip
+import io
+import os
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from botocore.exceptions import ClientError
+
+# AWS clients are created on first use, keeping module import (cold start) cheap
+_s3_client = None
+_dynamodb = None
+ENTRY_LOG_TABLE = os.environ.get('ENTRY_LOG_TABLE', 'Entry_Log')
+
+ARCHIVE_BUCKET_NAME = os.environ.get('ARCHIVE_BUCKET_NAME', os.environ.get('UPLOAD_BUCKET_NAME', 'attendance-uploads-default'))
+ARCHIVE_PREFIX = os.environ.get('ENTRY_LOG_ARCHIVE_PREFIX', 'entry-logs/')
+# Must match the settings of get_entry_logs, which reads days older than the
+# retention window from the archive
+RETENTION_DAYS = int(os.environ.get('ENTRY_LOG_RETENTION_DAYS', '30'))
+# Archived originals are kept a little longer so readers never see a gap
+# between the archive being written and DynamoDB deleting the item
+TTL_GRACE_DAYS = int(os.environ.get('ENTRY_LOG_TTL_GRACE_DAYS', '2'))
+
+class DecimalEncoder(json.JSONEncoder):
+    """Helper class to convert Decimal to int/float for JSON serialization."""
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return int(obj) if obj % 1 == 0 else float(obj)
+        return super(DecimalEncoder, self).default(obj)
+
+def lambda_handler(event, context):
+    """
+    Archive entry logs older than the retention window.
+    The window is always ENTRY_LOG_RETENTION_DAYS, the same setting
+    get_entry_logs uses to decide which days to read from the archive.
+
+    Optional event fields (for manual runs):
+    {
+        "dry_run": false
+    }
+    """
+    try:
+        event = event or {}
+        retention_days = RETENTION_DAYS
+        dry_run = bool(event.get('dry_run', False))
+
+        # Use IST date (UTC + 5.5 hours) to match the 'date' field sent by devices
+        utc_now = datetime.utcnow()
+        ist_now = utc_now + timedelta(hours=5, minutes=30)
+        cutoff_date = (ist_now - timedelta(days=retention_days)).strftime('%Y-%m-%d')
+        print(f"Archiving entry logs with date < {cutoff_date} (retention: {retention_days} days)")
+
+        dates_to_archive = find_unarchived_dates(cutoff_date)
+        print(f"Found {len(dates_to_archive)} dates to archive: {sorted(dates_to_archive)}")
+
+        expires_at = int(time.time()) + TTL_GRACE_DAYS * 86400
+        summary = {}
+        for date in sorted(dates_to_archive):
+            logs = fetch_entry_logs_for_date(date)
+            if not logs:
+                continue
+
+            if dry_run:
+                summary[date] = len(logs)
+                continue
+
+            archived_count = write_archive_for_date(date, logs)
+
+            # Only expire the originals once the archive object is safely written
+            expired_count = 0
+            for log in logs:
+                if log.get('expires_at'):
+                    continue
+                try:
+                    get_table(ENTRY_LOG_TABLE).update_item(
+                        Key={'log_id': log['log_id']},
+                        UpdateExpression='SET expires_at = :exp',
+                        ExpressionAttributeValues={':exp': expires_at}
+                    )
+                    expired_count += 1
+                except ClientError as e:
+                    print(f"Error setting TTL on log {log.get('log_id')}: {str(e)}")
+
+            summary[date] = archived_count
+            print(f"✅ Archived {archived_count} logs for {date}, set TTL on {expired_count}")
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'message': 'Entry log archiving completed successfully',
+                'cutoff_date': cutoff_date,
+                'dry_run': dry_run,
+                'archived': summary
+            })
+        }
+
+    except Exception as e:
+        print(f"Error archiving entry logs: {str(e)}")
+        return {
+            'statusCode': 500,
+            'body': json.dumps({
+                'error': f'Error archiving entry logs: {str(e)}'
+            })
+        }
+
+def archive_key_for_date(date):
+    """Return the S3 key of the archive object for a date (YYYY-MM-DD)."""
+    return f"{ARCHIVE_PREFIX}date={date}/entry_logs.jsonl.gz"
+
+def find_unarchived_dates(cutoff_date):
+    """Find dates older than the cutoff that still have logs without a TTL."""
+    dates = set()
+    last_evaluated_key = None
+
+    # Only project the date so the scan stays cheap
+    while True:
+        scan_kwargs = {
+            'FilterExpression': '#date < :cutoff AND attribute_not_exists(expires_at)',
+            'ProjectionExpression': '#date',
+            'ExpressionAttributeNames': {'#date': 'date'},
+            'ExpressionAttributeValues': {':cutoff': cutoff_date}
+        }
+        if last_evaluated_key:
+            scan_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+        response = get_table(ENTRY_LOG_TABLE).scan(**scan_kwargs)
+        for item in response.get('Items', []):
+            if item.get('date'):
+                dates.add(item['date'])
+
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if not last_evaluated_key:
+            break
+
+    return dates
+
+def fetch_entry_logs_for_date(date):
+    """Fetch all entry logs for a specific date using the date index."""
+    try:
+        logs = []
+        last_evaluated_key = None
+        while True:
+            query_kwargs = {
+                'IndexName': 'date-index',
+                'KeyConditionExpression': '#date = :date_val',
+                'ExpressionAttributeNames': {'#date': 'date'},
+                'ExpressionAttributeValues': {':date_val': date}
+            }
+            if last_evaluated_key:
+                query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+            response = get_table(ENTRY_LOG_TABLE).query(**query_kwargs)
+            logs.extend(response.get('Items', []))
+
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            if not last_evaluated_key:
+                break
+        return logs
+    except ClientError as e:
+        print(f"Error fetching entry logs for {date}: {str(e)}")
+        return []
+
+def read_existing_archive(date):
+    """Read an existing archive object for a date, or an empty list if none."""
+    try:
+        response = get_s3_client().get_object(Bucket=ARCHIVE_BUCKET_NAME, Key=archive_key_for_date(date))
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+            return []
+        raise
+
+    with gzip.GzipFile(fileobj=response['Body'], mode='rb') as archive:
+        return [json.loads(line) for line in archive if line.strip()]
+
+def write_archive_for_date(date, logs):
+    """
+    Write (or merge into) the archive object for a date.
+    Late-arriving logs for an already archived day are merged by log_id,
+    so re-running the job is safe.
+    """
+    merged = {log['log_id']: log for log in read_existing_archive(date)}
+    for log in logs:
+        item = {k: v for k, v in log.items() if k != 'expires_at'}
+        merged[item['log_id']] = item
+
+    ordered = sorted(merged.values(), key=lambda log: log.get('timestamp') or log.get('created_at') or '')
+
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as archive:
+        for log in ordered:
+            archive.write((json.dumps(log, cls=DecimalEncoder) + '\n').encode('utf-8'))
+
+    get_s3_client().put_object(
+        Bucket=ARCHIVE_BUCKET_NAME,
+        Key=archive_key_for_date(date),
+        Body=buffer.getvalue(),
+        ContentType='application/gzip'
+    )
+    return len(ordered)
+
+def get_table(table_name):
+    """Return a DynamoDB Table, creating the resource on first use."""
+    global _dynamodb
+    if _dynamodb is None:
+        import boto3
+        _dynamodb = boto3.resource('dynamodb')
+    return _dynamodb.Table(table_name)
+
+def get_s3_client():
+    """Return the S3 client, creating it on first use."""
+    global _s3_client
+    if _s3_client is None:
+        import boto3
+        _s3_client = boto3.client('s3')
+    return _s3_client
@@ -4,13 +4,12 @@ This enables direct browser-to-S3 uploads without exposing bucket credentials.
 """
 
 import json
-import boto3
 import os
 from datetime import timedelta
 from botocore.exceptions import ClientError
 
-# Initialize S3 client
-s3_client = boto3.client('s3')
+# AWS clients are created on first use, keeping module import (cold start) cheap
+_s3_client = None
 BUCKET_NAME = os.environ.get('UPLOAD_BUCKET_NAME', 'attendance-uploads-default')
 
 def lambda_handler(event, context):
@@ -22,6 +21,9 @@ def lambda_handler(event, context):
         "file_name": "uploads/2025-11-03_Lecture1.xlsx",
         "date": "2025-11-03",
         "lecture": "Lecture1",
+        "department": "Computer",      (optional, with year and division)
+        "year": "2",
+        "division": "A",
         "content_type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     }
     """
@@ -48,7 +50,7 @@ def lambda_handler(event, context):
         # Check if body is a string (Lambda Proxy integration)
         if isinstance(event.get('body'), str):
             try:
-            body = json.loads(event['body'])
+                body = json.loads(event['body'])
                 print(f"✅ Parsed body from string (Lambda Proxy)")
             except json.JSONDecodeError as e:
                 print(f"❌ ERROR: Failed to parse body as JSON: {str(e)}")
@@ -215,7 +217,7 @@ def lambda_handler(event, context):
         if final_date_match:
             final_date = final_date_match.group(1)
             print(f"✅ Final filename date: {final_date}")
-            else:
+        else:
             print(f"❌ ERROR: Generated filename does not contain a valid date: {file_name}")
         
         # Log the filename being used for debugging
@@ -226,18 +228,34 @@ def lambda_handler(event, context):
         # Determine content type
         content_type = body.get('content_type', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
         
+        # Optional target class (department/year/division). Stored as object
+        # metadata so process_attendance_upload can mark roster students Absent.
+        metadata = {}
+        for field in ('department', 'year', 'division'):
+            value = str(body.get(field) or '').strip()
+            if value:
+                metadata[field] = value
+        if metadata and len(metadata) != 3:
+            print(f"⚠️ WARNING: Incomplete target class {metadata}, ignoring (department, year and division are all required)")
+            metadata = {}
+        upload_headers = {f"x-amz-meta-{k}": v for k, v in metadata.items()}
+        
         # Set expiration (1 hour)
         expiration = int(body.get('expiration', 3600))
         
         # Generate presigned URL
         try:
-            presigned_url = s3_client.generate_presigned_url(
+            params = {
+                'Bucket': BUCKET_NAME,
+                'Key': file_name,
+                'ContentType': content_type
+            }
+            if metadata:
+                params['Metadata'] = metadata
+            
+            presigned_url = get_s3_client().generate_presigned_url(
                 'put_object',
-                Params={
-                    'Bucket': BUCKET_NAME,
-                    'Key': file_name,
-                    'ContentType': content_type
-                },
+                Params=params,
                 ExpiresIn=expiration
             )
             
@@ -254,6 +272,7 @@ def lambda_handler(event, context):
                     'file_name': file_name,
                     'bucket': BUCKET_NAME,
                     'expires_in': expiration,
+                    'upload_headers': upload_headers,
                     'date_used': date_clean if date_clean else 'NOT_PROVIDED',
                     'date_received': str(date) if date else 'EMPTY',
                     'debug': {
@@ -306,3 +325,10 @@ def lambda_handler(event, context):
             })
         }
 
+def get_s3_client():
+    """Return the S3 client, creating it on first use."""
+    global _s3_client
+    if _s3_client is None:
+        import boto3
+        _s3_client = boto3.client('s3')
+    return _s3_client
@@ -1,20 +1,107 @@
 """
 Lambda function to retrieve analytics and reports.
-Supports daily, weekly, monthly, and semester-level analytics.
+Supports daily, weekly, monthly, and semester-level analytics, plus
+range totals and period comparisons answered from a prefix-sum index.
+Record reads run under a read and time budget; a query that exhausts it
+returns partial results and a continuation token.
 """
 
 import json
-import boto3
+import base64
+import gzip
+import hashlib
+import io
 import os
+import time
+import zlib
+from array import array
+from collections import OrderedDict
 from decimal import Decimal
 from botocore.exceptions import ClientError
 from datetime import datetime, timedelta
 from collections import defaultdict
 
-# Initialize DynamoDB client
-dynamodb = boto3.resource('dynamodb')
-final_attendance_table = dynamodb.Table(os.environ.get('FINAL_ATTENDANCE_TABLE', 'Final_Attendance'))
-student_master_table = dynamodb.Table(os.environ.get('STUDENT_MASTER_TABLE', 'Student_Master'))
+# AWS clients are created on first use, keeping module import (cold start) cheap
+_dynamodb = None
+_s3_client = None
+FINAL_ATTENDANCE_TABLE = os.environ.get('FINAL_ATTENDANCE_TABLE', 'Final_Attendance')
+STUDENT_MASTER_TABLE = os.environ.get('STUDENT_MASTER_TABLE', 'Student_Master')
+ANALYTICS_STATE_TABLE = os.environ.get('ANALYTICS_STATE_TABLE', 'Analytics_State')
+LIVE_STATS_TABLE = os.environ.get('LIVE_STATS_TABLE', 'Live_Stats')
+
+# Prefix-sum index of daily status counts, stored in S3 and cached per container
+ANALYTICS_BUCKET_NAME = os.environ.get('ANALYTICS_BUCKET_NAME', os.environ.get('UPLOAD_BUCKET_NAME', 'attendance-uploads-default'))
+ANALYTICS_INDEX_KEY = os.environ.get('ANALYTICS_INDEX_KEY', 'analytics/prefix_index.json.gz')
+ANALYTICS_STATUSES = ('Present', 'Absent', 'Proxy', 'Bunk')
+PREFIX_INDEX_FORMAT = 1
+_prefix_index = None
+
+# Academic calendar (terms, holidays, weekly off days), loaded once per container
+ANALYTICS_CALENDAR_KEY = os.environ.get('ANALYTICS_CALENDAR_KEY', 'analytics/academic_calendar.json')
+OUTSIDE_TERM = 'Outside term'
+WEEKDAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+_calendar = None
+
+# Columnar in-memory copy of Final_Attendance (needs NumPy), cached per container
+ANALYTICS_COLUMNAR_CACHE = os.environ.get('ANALYTICS_COLUMNAR_CACHE', 'true').lower() == 'true'
+# Until the cache is loaded, requests are answered from the records and then
+# continue its full-table scan under this separate, smaller budget
+ANALYTICS_COLUMNAR_FILL_READS = int(os.environ.get('ANALYTICS_COLUMNAR_FILL_READS', '500'))
+ANALYTICS_COLUMNAR_FILL_MS = int(os.environ.get('ANALYTICS_COLUMNAR_FILL_MS', '3000'))
+# Dates are stored as uint16 day numbers counted from this day
+DAY_BASE = datetime(2000, 1, 1).toordinal()
+# Status codes: index in ANALYTICS_STATUSES, plus one code for any other status
+STATUS_CODES = len(ANALYTICS_STATUSES) + 1
+_numpy = None
+_columnar_cache = None
+
+# Read budget (read capacity units) and time budget of one analytics request
+ANALYTICS_READ_BUDGET = int(os.environ.get('ANALYTICS_READ_BUDGET', '2000'))
+ANALYTICS_TIME_BUDGET_MS = int(os.environ.get('ANALYTICS_TIME_BUDGET_MS', '20000'))
+# Time kept back from the Lambda timeout for building the response
+ANALYTICS_RESPONSE_RESERVE_MS = 2000
+CONTINUATION_FORMAT = 1
+# Query parameters that do not change the result (excluded from the token's query fingerprint)
+BUDGET_PARAMS = ('continuation', 'max_reads', 'max_ms')
+STATUS_INDEX = {status: code for code, status in enumerate(ANALYTICS_STATUSES)}
+
+# Matrix views: (row, column) dimensions of each axes choice
+MATRIX_AXES = {
+    'weekday_lecture': ('weekday', 'lecture'),
+    'date_department': ('date', 'department'),
+    'department_year': ('department', 'year')
+}
+HEATMAP_AXES = ('weekday_lecture', 'date_department')
+
+# Arrival histograms written by handle_entry_log: per-minute bins relative to
+# the first lecture (IST HH:MM), merged over the requested days
+ARRIVAL_REFERENCE_TIME = os.environ.get('ARRIVAL_REFERENCE_TIME', '09:00')
+ARRIVAL_DEFAULT_DAYS = 30
+ARRIVAL_PERCENTILES = (50, 90, 99)
+
+# Response cache: in-container LRU, then S3 shared by all containers. Entries
+# are validated against the Analytics_State versions of the dates they cover;
+# periods still open (reaching today) also expire after a TTL
+ANALYTICS_RESPONSE_CACHE = os.environ.get('ANALYTICS_RESPONSE_CACHE', 'true').lower() == 'true'
+ANALYTICS_CACHE_PREFIX = os.environ.get('ANALYTICS_CACHE_PREFIX', 'analytics/cache/')
+ANALYTICS_CACHE_TTL_SECONDS = int(os.environ.get('ANALYTICS_CACHE_TTL_SECONDS', '300'))
+ANALYTICS_CACHE_ENTRIES = int(os.environ.get('ANALYTICS_CACHE_ENTRIES', '64'))
+ANALYTICS_CACHE_MAX_BYTES = int(os.environ.get('ANALYTICS_CACHE_MAX_MB', '32')) * 1024 * 1024
+# Concurrent misses: one invocation computes under a lease, the others wait for its entry
+ANALYTICS_CACHE_LEASE_SECONDS = 30
+ANALYTICS_CACHE_WAIT_MS = int(os.environ.get('ANALYTICS_CACHE_WAIT_MS', '10000'))
+ANALYTICS_CACHE_POLL_SECONDS = 0.25
+# Part of every cache key: bump when the response format changes
+ANALYTICS_CACHE_FORMAT = 2
+_response_cache = OrderedDict()
+_response_cache_bytes = 0
+
+# Downsampling of the daily series (max_points): LTTB keeps the shape-defining
+# dates, buckets aggregates consecutive dates with min/max/mean percentages
+DOWNSAMPLE_METHODS = ('lttb', 'buckets')
+
+# Population count of a bitmap int (int.bit_count needs Python 3.10)
+popcount = int.bit_count if hasattr(int, 'bit_count') else (lambda bitmap: bin(bitmap).count('1'))
 
 class DecimalEncoder(json.JSONEncoder):
     """Helper class to convert Decimal to float for JSON serialization."""
@@ -34,31 +121,77 @@ def lambda_handler(event, context):
     - division: Filter by division
     - start_date: Start date for analytics period
     - end_date: End date for analytics period
+    - view: summary (range totals) or compare (two periods), answered from
+      the prefix-sum index without reading attendance records
+    - compare_start_date, compare_end_date: Second period for view=compare
+    - view=students: student set metrics (unique, always present, repeat
+      offenders) over the period; status (default Proxy) and min_count
+      (default 2) select the repeat offenders
+    - max_reads, max_ms: Lower the request's read (capacity units) and time
+      budget; when it runs out the response has partial=true and a
+      continuation token
+    - continuation: Token of a partial response, resumes the same query
+      (or POST the same query string with {"continuation": token} as body)
+    - view=heatmap: status count matrices over axes=weekday_lecture (default)
+      or axes=date_department; view=dept_year_matrix: department x year
+    - max_points: Cap the daily series at this many points (at least 3);
+      downsample=lttb (default) or buckets selects the method
+    - view=arrival: p50/p90/p99 first-tap arrival times relative to the first
+      lecture, overall and per day (default: the last 30 days; department
+      is the only filter)
     """
     try:
         # Parse query parameters
         query_params = event.get('queryStringParameters') or {}
+        # Follow-up requests POST the continuation token in a JSON body (same
+        # query string), since a token can outgrow URL length limits
+        if event.get('httpMethod') == 'POST' and event.get('body'):
+            request_body = event['body']
+            if event.get('isBase64Encoded'):
+                request_body = base64.b64decode(request_body)
+            request_body = json.loads(request_body)
+            if not isinstance(request_body, dict):
+                raise ValueError('The request body must be a JSON object')
+            if request_body.get('continuation'):
+                query_params = dict(query_params, continuation=request_body['continuation'])
         period = query_params.get('period', 'daily')
         year = query_params.get('year')
         department = query_params.get('department')
         division = query_params.get('division')
         start_date = query_params.get('start_date')
         end_date = query_params.get('end_date')
+        view = query_params.get('view')
+        
+        if view in ('summary', 'compare', 'arrival'):
+            if view == 'arrival':
+                body = get_arrival_view(query_params, department, year, division)
+            else:
+                # Only the first build of the index reads records (under the budget)
+                budget = start_budget(parse_budget_limits(query_params), context)
+                if query_params.get('continuation'):
+                    decode_continuation(query_params['continuation'], query_params)
+                body = get_range_view(view, query_params, department, year, division, budget)
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Headers': 'Content-Type',
+                    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS'
+                },
+                'body': json.dumps(body, cls=DecimalEncoder)
+            }
+        
+        budget_limits = parse_budget_limits(query_params)
+        continuation = None
+        if query_params.get('continuation'):
+            continuation = decode_continuation(query_params['continuation'], query_params)
+            # A resumed query keeps the dates it started with
+            start_date = continuation['start_date']
+            end_date = continuation['end_date']
         
         # Set default date range if not provided
-        # If no dates provided, fetch ALL records (don't default to today)
-        if not end_date and not start_date:
-            # No date filter - get ALL records
-            print("No date filter specified for analytics, fetching ALL attendance records")
-            try:
-                response = final_attendance_table.scan()
-                attendance_records = response.get('Items', [])
-                print(f"Found {len(attendance_records)} total records for analytics")
-            except ClientError as e:
-                print(f"Error fetching all records for analytics: {str(e)}")
-                attendance_records = []
-        else:
-            # Date range provided - use it
+        # If no dates provided, use ALL records (don't default to today)
+        if continuation is None and (end_date or start_date):
             if not end_date:
                 # Use IST date (UTC + 5.5 hours)
                 utc_now = datetime.utcnow()
@@ -76,64 +209,65 @@ def lambda_handler(event, context):
                 elif period == 'monthly':
                     start_date = (ist_now - timedelta(days=30)).strftime('%Y-%m-%d')
                 elif period == 'semester':
-                    start_date = (ist_now - timedelta(days=180)).strftime('%Y-%m-%d')
+                    # Start of the term containing end_date, or 180 days back outside any term
+                    term = current_term(get_calendar(), end_date)
+                    start_date = term['start'] if term else (ist_now - timedelta(days=180)).strftime('%Y-%m-%d')
                 else:
                     start_date = (ist_now - timedelta(days=30)).strftime('%Y-%m-%d')
-            
-            print(f"Fetching analytics for date range: {start_date} to {end_date}")
-            # Fetch attendance records
-            attendance_records = fetch_attendance_by_date_range(start_date, end_date)
-            print(f"Found {len(attendance_records)} records in date range for analytics")
-        
-        # Fetch all students for filtering
-        all_students = fetch_all_students()
-        student_info_map = {s['student_id']: s for s in all_students}
-        
-        # Apply filters and enrich records
-        filtered_records = []
-        for record in attendance_records:
-            student_id = record.get('student_id')
-            student_info = student_info_map.get(student_id, {})
-            
-            if year and student_info.get('year') != year:
-                continue
-            if department and student_info.get('department') != department:
-                continue
-            if division and student_info.get('division') != division:
-                continue
-            
-            record['student_info'] = student_info
-            filtered_records.append(record)
         
-        # Generate analytics based on period
-        if period == 'daily':
-            analytics = generate_daily_analytics(filtered_records)
-        elif period == 'weekly':
-            analytics = generate_weekly_analytics(filtered_records)
-        elif period == 'monthly':
-            analytics = generate_monthly_analytics(filtered_records)
-        elif period == 'semester':
-            analytics = generate_semester_analytics(filtered_records)
-        else:
-            analytics = generate_daily_analytics(filtered_records)
+        # Identical queries are answered from the response cache
+        cache_entry = None
+        if ANALYTICS_RESPONSE_CACHE and continuation is None:
+            cache_entry = open_cache_entry(query_params, period, start_date, end_date)
+            cached_body = read_cached_response(cache_entry)
+            if cached_body is not None:
+                return {
+                    'statusCode': 200,
+                    'headers': {
+                        'Access-Control-Allow-Origin': '*',
+                        'Access-Control-Allow-Headers': 'Content-Type',
+                        'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+                        'X-Cache': 'HIT'
+                    },
+                    'body': cached_body
+                }
         
-        # Add overall statistics
-        overall_stats = calculate_overall_statistics(filtered_records)
+        # Started after the cache lookup, so waiting on another request's
+        # lease does not come out of this request's budget
+        budget = start_budget(budget_limits, context)
+        try:
+            body = compute_analytics(query_params, period, view, start_date, end_date,
+                                     department, year, division, budget, continuation)
+            response_body = json.dumps(body, cls=DecimalEncoder)
+            # Partial responses depend on the budget, so only complete ones are cached
+            if cache_entry and not body['partial']:
+                write_cached_response(cache_entry, response_body)
+        finally:
+            if cache_entry:
+                release_cache_lease(cache_entry)
         
         return {
             'statusCode': 200,
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Headers': 'Content-Type',
-                'Access-Control-Allow-Methods': 'GET, OPTIONS'
+                'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+                'X-Cache': 'MISS' if cache_entry else 'BYPASS'
+            },
+            'body': response_body
+        }
+    
+    except ValueError as e:
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Methods': 'GET, POST, OPTIONS'
             },
             'body': json.dumps({
-                'period': period,
-                'start_date': start_date,
-                'end_date': end_date,
-                'analytics': analytics,
-                'overall_statistics': overall_stats
-            }, cls=DecimalEncoder)
+                'error': str(e)
+            })
         }
     
     except Exception as e:
@@ -142,217 +276,233 @@ def lambda_handler(event, context):
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Headers': 'Content-Type',
-                'Access-Control-Allow-Methods': 'GET, OPTIONS'
+                'Access-Control-Allow-Methods': 'GET, POST, OPTIONS'
             },
             'body': json.dumps({
                 'error': f'Error retrieving analytics: {str(e)}'
             })
         }
 
-def fetch_attendance_by_date_range(start_date, end_date):
-    """Fetch attendance records for a date range."""
+def compute_analytics(query_params, period, view, start_date, end_date, department, year, division,
+                      budget, continuation):
+    """Compute the response body of a period or view query (not view=summary/compare/arrival)."""
+    # Fetch all students for filtering
+    all_students = fetch_all_students()
+    filters = {'department': department, 'year': year, 'division': division}
+    
+    # Aggregate from the container's columnar copy of Final_Attendance once it
+    # is loaded, otherwise from the DynamoDB records (date-index per day)
+    columnar = get_columnar_cache()
+    if columnar is not None:
+        analytics, overall_stats = generate_columnar_analytics(
+            columnar, all_students, period, view, start_date, end_date, filters, query_params)
+        state = None
+    else:
+        analytics, overall_stats, state = generate_record_analytics(
+            all_students, period, view, start_date, end_date, filters, query_params, budget, continuation)
+        fill_columnar_cache(budget)
+    
+    series_points = None
+    if query_params.get('max_points') and not view and period == 'daily':
+        series_points = len(analytics)
+        analytics = downsample_series(analytics, query_params)
+    
+    elapsed_ms = int((time.monotonic() - budget['started']) * 1000)
+    print(f"Analytics read {budget['read_units']} capacity units in {budget['pages']} pages, {elapsed_ms} ms"
+          f"{' (partial)' if state else ''}")
+    
+    return {
+        'period': period,
+        'start_date': start_date,
+        'end_date': end_date,
+        'analytics': analytics,
+        'overall_statistics': overall_stats,
+        'partial': state is not None,
+        'continuation': encode_continuation(state, query_params) if state else None,
+        'read_units': budget['read_units'],
+        'elapsed_ms': elapsed_ms,
+        **({'series_points': series_points} if series_points is not None else {})
+    }
+
+def generate_record_analytics(all_students, period, view, start_date, end_date, filters, query_params,
+                              budget, continuation=None):
+    """
+    Compute (analytics, overall statistics, continuation state) from the
+    Final_Attendance records. Pages are folded into an accumulator until the
+    records are exhausted (state None) or the budget runs out; the state then
+    holds the read position and the accumulator to resume from.
+    """
+    student_info_map = {s['student_id']: s for s in all_students}
+    student_index = build_student_index(all_students)
+    master_count = len(student_index['ids'])
+    students = student_fingerprint(student_index)
+    calendar = get_calendar()
+    
+    if continuation and 'accumulator' in continuation:
+        if continuation['students'] != students:
+            raise ValueError('Student_Master changed since the continuation token was issued, restart the query')
+        for student_id in continuation['extra_ids']:
+            student_position(student_index, student_id)
+        accumulator = load_accumulator(continuation['accumulator'])
+        start_position = continuation['position']
+    else:
+        accumulator = new_accumulator(period, view, query_params)
+        start_position = None
+    
+    if not end_date and not start_date:
+        # No date filter - get ALL records
+        print("No date filter specified for analytics, scanning ALL attendance records")
+    else:
+        print(f"Fetching analytics for date range: {start_date} to {end_date}")
+    
+    records_read = 0
+    position = None
+    for items, position in read_attendance_pages(start_date, end_date, start_position, budget):
+        records_read += len(items)
+        accumulate_records(accumulator, items, student_info_map, student_index, filters, calendar)
+        if position is not None and budget_exhausted(budget):
+            break
+    print(f"Read {records_read} records for analytics{', budget exhausted' if position is not None else ''}")
+    
+    # Generate analytics based on period
+    if view == 'students':
+        analytics = generate_student_set_analytics(accumulator, student_index)
+    elif 'cells' in accumulator:
+        analytics = generate_matrix_analytics(accumulator)
+    elif period == 'weekly':
+        analytics = generate_weekly_analytics(accumulator, calendar)
+    elif period == 'monthly':
+        analytics = generate_monthly_analytics(accumulator, calendar)
+    elif period == 'semester':
+        analytics = generate_semester_analytics(accumulator, student_index)
+    else:
+        analytics = generate_daily_analytics(accumulator)
+    
+    state = None
+    if position is not None:
+        state = {
+            'start_date': start_date,
+            'end_date': end_date,
+            'position': position,
+            'students': students,
+            'extra_ids': student_index['ids'][master_count:],
+            'accumulator': dump_accumulator(accumulator)
+        }
+    
+    # Add overall statistics
+    return analytics, calculate_overall_statistics(accumulator), state
+
+def fetch_all_students():
+    """Fetch all students from Student_Master table with pagination."""
     try:
-        response = final_attendance_table.scan()
-        all_records = response.get('Items', [])
-        
-        filtered_records = []
-        for record in all_records:
-            record_date = record.get('date')
-            if record_date and start_date <= record_date <= end_date:
-                filtered_records.append(record)
-        
-        return filtered_records
+        all_students = []
+        last_evaluated_key = None
+        while True:
+            if last_evaluated_key:
+                response = get_table(STUDENT_MASTER_TABLE).scan(ExclusiveStartKey=last_evaluated_key)
+            else:
+                response = get_table(STUDENT_MASTER_TABLE).scan()
+            
+            all_students.extend(response.get('Items', []))
+            
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            if not last_evaluated_key:
+                break
+        return all_students
     except ClientError as e:
-        print(f"Error fetching attendance by date range: {str(e)}")
+        print(f"Error fetching students: {str(e)}")
         return []
 
-def generate_daily_analytics(records):
+def generate_daily_analytics(accumulator):
     """Generate daily analytics grouped by date."""
-    daily_stats = defaultdict(lambda: {
-        'present': 0,
-        'absent': 0,
-        'proxy': 0,
-        'bunk': 0,
-        'total': 0
-    })
-    
-    for record in records:
-        date = record.get('date')
-        status = record.get('status', '')
-        
-        if date:
-            if status == 'Present':
-                daily_stats[date]['present'] += 1
-            elif status == 'Absent':
-                daily_stats[date]['absent'] += 1
-            elif status == 'Proxy':
-                daily_stats[date]['proxy'] += 1
-            elif status == 'Bunk':
-                daily_stats[date]['bunk'] += 1
-            
-            daily_stats[date]['total'] += 1
-    
-    # Convert to list format and calculate percentages
     result = []
-    for date in sorted(daily_stats.keys()):
-        stats = daily_stats[date]
-        total = stats['total']
-        attendance_pct = (stats['present'] / total * 100) if total > 0 else 0
-        
+    for date in sorted(accumulator['days']):
+        if not date:
+            continue
+        totals = status_totals(accumulator['days'][date])
         result.append({
             'date': date,
-            **stats,
-            'attendance_percentage': round(attendance_pct, 2)
+            **totals,
+            'attendance_percentage': attendance_percentage(totals)
         })
     
     return result
 
-def generate_weekly_analytics(records):
-    """Generate weekly analytics grouped by week."""
-    weekly_stats = defaultdict(lambda: {
-        'present': 0,
-        'absent': 0,
-        'proxy': 0,
-        'bunk': 0,
-        'total': 0,
-        'dates': set()
-    })
-    
-    for record in records:
-        date_str = record.get('date')
-        if date_str:
-            date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-            week_key = f"{date_obj.year}-W{date_obj.isocalendar()[1]}"
-            weekly_stats[week_key]['dates'].add(date_str)
-            
-            status = record.get('status', '')
-            if status == 'Present':
-                weekly_stats[week_key]['present'] += 1
-            elif status == 'Absent':
-                weekly_stats[week_key]['absent'] += 1
-            elif status == 'Proxy':
-                weekly_stats[week_key]['proxy'] += 1
-            elif status == 'Bunk':
-                weekly_stats[week_key]['bunk'] += 1
-            
-            weekly_stats[week_key]['total'] += 1
+def generate_weekly_analytics(accumulator, calendar):
+    """Generate weekly analytics grouped by ISO week."""
+    weekly_counts = defaultdict(lambda: [0] * STATUS_CODES)
+    weekly_dates = defaultdict(int)
+    week_labels = {}
+    for date, counts in sorted(accumulator['days'].items()):
+        if date:
+            entry = calendar_day(calendar, date)
+            week_key = entry['iso_week']
+            add_counts(weekly_counts[week_key], counts)
+            weekly_dates[week_key] += 1
+            week_labels.setdefault(week_key, entry['week_label'])
     
     # Convert to list format
     result = []
-    for week in sorted(weekly_stats.keys()):
-        stats = weekly_stats[week]
-        total = stats['total']
-        attendance_pct = (stats['present'] / total * 100) if total > 0 else 0
-        
+    for week in sorted(weekly_counts.keys()):
+        totals = status_totals(weekly_counts[week])
         result.append({
             'week': week,
-            'present': stats['present'],
-            'absent': stats['absent'],
-            'proxy': stats['proxy'],
-            'bunk': stats['bunk'],
-            'total': total,
-            'attendance_percentage': round(attendance_pct, 2),
-            'days_count': len(stats['dates'])
+            'week_label': week_labels[week],
+            **totals,
+            'attendance_percentage': attendance_percentage(totals),
+            'days_count': weekly_dates[week],
+            'working_days': period_working_days(calendar, 'week', week)
         })
     
     return result
 
-def generate_monthly_analytics(records):
+def generate_monthly_analytics(accumulator, calendar):
     """Generate monthly analytics grouped by month."""
-    monthly_stats = defaultdict(lambda: {
-        'present': 0,
-        'absent': 0,
-        'proxy': 0,
-        'bunk': 0,
-        'total': 0
-    })
-    
-    for record in records:
-        date_str = record.get('date')
-        if date_str:
-            month_key = date_str[:7]  # YYYY-MM
-            
-            status = record.get('status', '')
-            if status == 'Present':
-                monthly_stats[month_key]['present'] += 1
-            elif status == 'Absent':
-                monthly_stats[month_key]['absent'] += 1
-            elif status == 'Proxy':
-                monthly_stats[month_key]['proxy'] += 1
-            elif status == 'Bunk':
-                monthly_stats[month_key]['bunk'] += 1
-            
-            monthly_stats[month_key]['total'] += 1
+    monthly_counts = defaultdict(lambda: [0] * STATUS_CODES)
+    for date, counts in accumulator['days'].items():
+        if date:
+            add_counts(monthly_counts[date[:7]], counts)  # YYYY-MM
     
     # Convert to list format
     result = []
-    for month in sorted(monthly_stats.keys()):
-        stats = monthly_stats[month]
-        total = stats['total']
-        attendance_pct = (stats['present'] / total * 100) if total > 0 else 0
-        
+    for month in sorted(monthly_counts.keys()):
+        totals = status_totals(monthly_counts[month])
         result.append({
             'month': month,
-            **stats,
-            'attendance_percentage': round(attendance_pct, 2)
+            **totals,
+            'attendance_percentage': attendance_percentage(totals),
+            'working_days': period_working_days(calendar, 'month', month)
         })
     
     return result
 
-def generate_semester_analytics(records):
-    """Generate semester-level analytics."""
-    # Group by department and year
-    dept_year_stats = defaultdict(lambda: {
-        'present': 0,
-        'absent': 0,
-        'proxy': 0,
-        'bunk': 0,
-        'total': 0,
-        'students': set()
-    })
-    
-    for record in records:
-        student_info = record.get('student_info', {})
-        dept = student_info.get('department', 'Unknown')
-        year = student_info.get('year', 'Unknown')
-        key = f"{dept}_{year}"
-        
-        student_id = record.get('student_id')
-        dept_year_stats[key]['students'].add(student_id)
-        
-        status = record.get('status', '')
-        if status == 'Present':
-            dept_year_stats[key]['present'] += 1
-        elif status == 'Absent':
-            dept_year_stats[key]['absent'] += 1
-        elif status == 'Proxy':
-            dept_year_stats[key]['proxy'] += 1
-        elif status == 'Bunk':
-            dept_year_stats[key]['bunk'] += 1
-        
-        dept_year_stats[key]['total'] += 1
+def generate_semester_analytics(accumulator, student_index):
+    """Generate semester-level analytics per academic term, department and year."""
+    # Unique students per group: the term's students, masked per department/year
+    group_masks = student_group_masks(student_index, lambda info: (
+        info.get('department', 'Unknown'), info.get('year', 'Unknown')))
     
     # Convert to list format
     result = []
-    for key in sorted(dept_year_stats.keys()):
-        dept, year = key.split('_', 1)
-        stats = dept_year_stats[key]
-        total = stats['total']
-        attendance_pct = (stats['present'] / total * 100) if total > 0 else 0
+    for key in sorted(accumulator['groups'].keys(), key=lambda k: tuple(str(part) for part in k)):
+        semester, dept, year = key
+        totals = status_totals(accumulator['groups'][key])
+        semester_students = accumulator['semester_seen'].get(semester, 0)
         
         result.append({
+            'semester': semester,
             'department': dept,
             'year': year,
-            **{k: v for k, v in stats.items() if k != 'students'},
-            'unique_students': len(stats['students']),
-            'attendance_percentage': round(attendance_pct, 2)
+            **totals,
+            'unique_students': popcount(semester_students & group_masks.get((dept, year), 0)),
+            'attendance_percentage': attendance_percentage(totals)
         })
     
     return result
 
-def calculate_overall_statistics(records):
+def calculate_overall_statistics(accumulator):
     """Calculate overall statistics from all records."""
-    if not records:
+    if not accumulator['days']:
         return {
             'total_records': 0,
             'present': 0,
@@ -362,36 +512,1540 @@ def calculate_overall_statistics(records):
             'attendance_percentage': 0
         }
     
-    status_counts = {
-        'Present': 0,
-        'Absent': 0,
-        'Proxy': 0,
-        'Bunk': 0
+    overall_counts = [0] * STATUS_CODES
+    for counts in accumulator['days'].values():
+        add_counts(overall_counts, counts)
+    totals = status_totals(overall_counts)
+    
+    return {
+        'total_records': totals['total'],
+        'present': totals['present'],
+        'absent': totals['absent'],
+        'proxy': totals['proxy'],
+        'bunk': totals['bunk'],
+        'attendance_percentage': attendance_percentage(totals),
+        'unique_students': popcount(accumulator['seen']),
+        'unique_dates': sum(1 for date in accumulator['days'] if date)
+    }
+
+def downsample_series(rows, query_params):
+    """Reduce daily rows to at most max_points with the requested method."""
+    method = query_params.get('downsample') or 'lttb'
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"downsample must be one of: {', '.join(DOWNSAMPLE_METHODS)}")
+    try:
+        max_points = int(query_params['max_points'])
+    except ValueError:
+        raise ValueError('max_points must be an integer')
+    if max_points < 3:
+        raise ValueError('max_points must be at least 3')
+    if len(rows) <= max_points:
+        return rows
+    if method == 'buckets':
+        return bucket_series(rows, max_points)
+    return lttb_series(rows, max_points)
+
+def lttb_series(rows, max_points):
+    """
+    Largest-Triangle-Three-Buckets over (day, attendance percentage): keeps
+    the first and last date and, from each of max_points - 2 buckets, the
+    date forming the largest triangle with the previously kept date and the
+    average of the next bucket. Kept rows are returned unchanged.
+    """
+    xs = [day_number(row['date']) for row in rows]
+    ys = [row['attendance_percentage'] for row in rows]
+    bucket_size = (len(rows) - 2) / (max_points - 2)
+    
+    kept = [0]
+    for i in range(max_points - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, len(rows))
+        average_x = sum(xs[end:next_end]) / (next_end - end)
+        average_y = sum(ys[end:next_end]) / (next_end - end)
+        
+        a = kept[-1]
+        kept.append(max(range(start, end), key=lambda j: abs(
+            (xs[a] - average_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (average_y - ys[a]))))
+    kept.append(len(rows) - 1)
+    return [rows[i] for i in kept]
+
+def bucket_series(rows, max_points):
+    """
+    Split the rows into max_points runs of consecutive dates; each run becomes
+    one row with summed counts, its date range and the min/max/mean of the
+    daily attendance percentages.
+    """
+    result = []
+    for i in range(max_points):
+        bucket = rows[i * len(rows) // max_points:(i + 1) * len(rows) // max_points]
+        counts = [sum(row[status.lower()] for row in bucket) for status in ANALYTICS_STATUSES]
+        totals = dict(zip((status.lower() for status in ANALYTICS_STATUSES), counts),
+                      total=sum(row['total'] for row in bucket))
+        percentages = [row['attendance_percentage'] for row in bucket]
+        result.append({
+            'date': bucket[0]['date'],
+            'end_date': bucket[-1]['date'],
+            **totals,
+            'attendance_percentage': attendance_percentage(totals),
+            'min_attendance_percentage': min(percentages),
+            'max_attendance_percentage': max(percentages),
+            'mean_attendance_percentage': round(sum(percentages) / len(percentages), 2),
+            'days_count': len(bucket)
+        })
+    return result
+
+# Accumulator: the running aggregates of a record pass, folded page by page.
+# Status counts are kept per date (and per term, department and year for
+# period=semester), students as bitmaps, so the state stays small enough to
+# travel in a continuation token whatever the number of records read.
+
+def new_accumulator(period, view, query_params):
+    """Empty accumulator holding the aggregates the period or view needs."""
+    accumulator = {'days': {}, 'seen': 0}
+    if view == 'students':
+        status = query_params.get('status') or 'Proxy'
+        try:
+            min_count = int(query_params.get('min_count') or 2)
+        except ValueError:
+            raise ValueError('min_count must be an integer')
+        accumulator.update(lectures={}, status_seen={}, repeat_status=status,
+                           repeat_min_count=min_count, repeat_levels=[0] * max(min_count, 0))
+    elif view in ('heatmap', 'dept_year_matrix'):
+        axes = 'department_year' if view == 'dept_year_matrix' else query_params.get('axes') or 'weekday_lecture'
+        if axes not in MATRIX_AXES:
+            raise ValueError(f"axes must be one of: {', '.join(HEATMAP_AXES)}")
+        accumulator.update(axes=axes, cells={})
+    elif period == 'semester':
+        accumulator.update(groups={}, semester_seen={})
+    return accumulator
+
+def add_counts(totals, counts):
+    for code, count in enumerate(counts):
+        totals[code] += count
+
+def accumulate_records(accumulator, records, student_info_map, student_index, filters, calendar):
+    """Fold one page of records into the accumulator, applying the student filters."""
+    kept = []
+    for record in records:
+        student_info = student_info_map.get(record.get('student_id'), {})
+        
+        if filters.get('year') and student_info.get('year') != filters['year']:
+            continue
+        if filters.get('department') and student_info.get('department') != filters['department']:
+            continue
+        if filters.get('division') and student_info.get('division') != filters['division']:
+            continue
+        
+        date = record.get('date') or ''
+        code = STATUS_INDEX.get(record.get('status'), STATUS_CODES - 1)
+        accumulator['days'].setdefault(date, [0] * STATUS_CODES)[code] += 1
+        if 'groups' in accumulator and date:
+            key = (calendar_day(calendar, date)['semester'],
+                   student_info.get('department', 'Unknown'), student_info.get('year', 'Unknown'))
+            accumulator['groups'].setdefault(key, [0] * STATUS_CODES)[code] += 1
+        if 'cells' in accumulator and date:
+            key = matrix_cell(accumulator['axes'], calendar_day(calendar, date), date, record, student_info)
+            accumulator['cells'].setdefault(key, [0] * STATUS_CODES)[code] += 1
+        kept.append(record)
+    
+    accumulate_bitmaps(accumulator, build_attendance_bitmaps(kept, student_index), calendar)
+
+def accumulate_bitmaps(accumulator, bitmaps, calendar):
+    """
+    Fold per-(date, lecture, status) student bitmaps into the accumulator. A
+    lecture split across pages arrives as disjoint bitmaps, which count the
+    same as one.
+    """
+    for (date, lecture, status), bitmap in bitmaps.items():
+        accumulator['seen'] |= bitmap
+        if 'semester_seen' in accumulator:
+            semester = calendar_day(calendar, date)['semester']
+            accumulator['semester_seen'][semester] = accumulator['semester_seen'].get(semester, 0) | bitmap
+        if 'status_seen' in accumulator:
+            accumulator['status_seen'][status] = accumulator['status_seen'].get(status, 0) | bitmap
+            accumulator['lectures'].setdefault(date, set()).add(lecture)
+            if status == accumulator['repeat_status']:
+                accumulate_levels(accumulator['repeat_levels'], bitmap)
+
+def dump_accumulator(accumulator):
+    """JSON-serializable copy of an accumulator (bitmaps as hex strings)."""
+    data = {'days': accumulator['days'], 'seen': format(accumulator['seen'], 'x')}
+    if 'groups' in accumulator:
+        data['groups'] = [[semester, dept, year, counts]
+                          for (semester, dept, year), counts in accumulator['groups'].items()]
+        data['semester_seen'] = {semester: format(bitmap, 'x')
+                                 for semester, bitmap in accumulator['semester_seen'].items()}
+    if 'cells' in accumulator:
+        data['axes'] = accumulator['axes']
+        data['cells'] = [[row, column, counts] for (row, column), counts in accumulator['cells'].items()]
+    if 'status_seen' in accumulator:
+        data['lectures'] = {date: sorted(lectures) for date, lectures in accumulator['lectures'].items()}
+        data['status_seen'] = {status: format(bitmap, 'x') for status, bitmap in accumulator['status_seen'].items()}
+        data['repeat_status'] = accumulator['repeat_status']
+        data['repeat_min_count'] = accumulator['repeat_min_count']
+        data['repeat_levels'] = [format(bitmap, 'x') for bitmap in accumulator['repeat_levels']]
+    return data
+
+def load_accumulator(data):
+    """Accumulator from dump_accumulator output."""
+    accumulator = {'days': data['days'], 'seen': int(data['seen'], 16)}
+    if 'groups' in data:
+        accumulator['groups'] = {(semester, dept, year): counts for semester, dept, year, counts in data['groups']}
+        accumulator['semester_seen'] = {semester: int(bitmap, 16) for semester, bitmap in data['semester_seen'].items()}
+    if 'cells' in data:
+        accumulator['axes'] = data['axes']
+        accumulator['cells'] = {(row, column): counts for row, column, counts in data['cells']}
+    if 'status_seen' in data:
+        accumulator['lectures'] = {date: set(lectures) for date, lectures in data['lectures'].items()}
+        accumulator['status_seen'] = {status: int(bitmap, 16) for status, bitmap in data['status_seen'].items()}
+        accumulator['repeat_status'] = data['repeat_status']
+        accumulator['repeat_min_count'] = data['repeat_min_count']
+        accumulator['repeat_levels'] = [int(bitmap, 16) for bitmap in data['repeat_levels']]
+    return accumulator
+
+def matrix_cell(axes, entry, date, record, student_info):
+    """(row, column) cell of a record; weekdays are 0 (Monday) to 6."""
+    if axes == 'weekday_lecture':
+        return entry['weekday'], record.get('lecture', '')
+    if axes == 'date_department':
+        return date, student_info.get('department', 'Unknown')
+    return student_info.get('department', 'Unknown'), student_info.get('year', 'Unknown')
+
+def generate_matrix_analytics(accumulator):
+    """
+    Dense matrices over the accumulated cells: one row list per row label and
+    one value per column label, for every status, the total and the
+    attendance percentage (None for empty cells).
+    """
+    row_axis, column_axis = MATRIX_AXES[accumulator['axes']]
+    cells = accumulator['cells']
+    if row_axis == 'weekday':
+        rows = list(range(len(WEEKDAY_NAMES)))
+    else:
+        rows = sorted({row for row, _ in cells}, key=str)
+    columns = sorted({column for _, column in cells}, key=str)
+    
+    matrices = {name: [] for name in [status.lower() for status in ANALYTICS_STATUSES] + ['total', 'attendance_percentage']}
+    for row in rows:
+        row_totals = [status_totals(cells.get((row, column), [0] * STATUS_CODES)) for column in columns]
+        for name, matrix in matrices.items():
+            if name == 'attendance_percentage':
+                matrix.append([attendance_percentage(totals) if totals['total'] else None for totals in row_totals])
+            else:
+                matrix.append([totals[name] for totals in row_totals])
+    
+    return {
+        'axes': accumulator['axes'],
+        'row_axis': row_axis,
+        'column_axis': column_axis,
+        'rows': [WEEKDAY_NAMES[row] for row in rows] if row_axis == 'weekday' else rows,
+        'columns': columns,
+        **matrices
+    }
+
+# Budget: every page of records read is charged its consumed capacity and
+# time. Reading stops before a page that could overrun either limit, judged
+# by the largest page so far; the first page is always read so every request
+# makes progress.
+
+def parse_budget_limits(query_params):
+    """(max_reads, max_ms) of this request; max_reads and max_ms may only lower the defaults."""
+    try:
+        max_reads = min(int(query_params.get('max_reads') or ANALYTICS_READ_BUDGET), ANALYTICS_READ_BUDGET)
+        max_ms = min(int(query_params.get('max_ms') or ANALYTICS_TIME_BUDGET_MS), ANALYTICS_TIME_BUDGET_MS)
+    except ValueError:
+        raise ValueError('max_reads and max_ms must be integers')
+    return max_reads, max_ms
+
+def start_budget(budget_limits, context):
+    """Start the read and time budget of this request, within the Lambda's remaining time."""
+    max_reads, max_ms = budget_limits
+    if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+        max_ms = min(max_ms, context.get_remaining_time_in_millis() - ANALYTICS_RESPONSE_RESERVE_MS)
+    return {
+        'started': time.monotonic(),
+        'max_reads': max_reads,
+        'max_seconds': max_ms / 1000,
+        'read_units': 0,
+        'pages': 0,
+        'largest_page_units': 0,
+        'slowest_page_seconds': 0
+    }
+
+def charge_page(budget, response, seconds):
+    """Charge one DynamoDB page (read with ReturnConsumedCapacity) to the budget."""
+    units = (response.get('ConsumedCapacity') or {}).get('CapacityUnits') or 0
+    budget['read_units'] += units
+    budget['pages'] += 1
+    budget['largest_page_units'] = max(budget['largest_page_units'], units)
+    budget['slowest_page_seconds'] = max(budget['slowest_page_seconds'], seconds)
+
+def budget_exhausted(budget):
+    """True when one more page could exceed the read or time budget."""
+    if not budget['pages']:
+        return False
+    elapsed = time.monotonic() - budget['started']
+    return (budget['read_units'] + budget['largest_page_units'] > budget['max_reads']
+            or elapsed + budget['slowest_page_seconds'] > budget['max_seconds'])
+
+# Continuation token: the read position and accumulator of a partial
+# response, as zlib-compressed JSON in URL-safe base64. The token also holds
+# a fingerprint of the query parameters, so it cannot resume another query.
+
+def query_fingerprint(query_params):
+    params = {key: value for key, value in query_params.items() if key not in BUDGET_PARAMS and value}
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+def student_fingerprint(student_index):
+    """Fingerprint of the Student_Master ids behind the bitmap positions."""
+    return f"{len(student_index['ids'])}:{zlib.crc32(chr(0).join(student_index['ids']).encode('utf-8')):08x}"
+
+def encode_continuation(state, query_params):
+    data = dict(state, format=CONTINUATION_FORMAT, query=query_fingerprint(query_params))
+    packed = zlib.compress(json.dumps(data, separators=(',', ':'), cls=DecimalEncoder).encode('utf-8'), 9)
+    return base64.urlsafe_b64encode(packed).decode('ascii').rstrip('=')
+
+def decode_continuation(token, query_params):
+    """State of a continuation token issued for the same query parameters."""
+    try:
+        packed = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data = json.loads(zlib.decompress(packed))
+    except (ValueError, zlib.error):
+        raise ValueError('Invalid continuation token')
+    if not isinstance(data, dict) or data.get('format') != CONTINUATION_FORMAT:
+        raise ValueError('Invalid continuation token')
+    if data.get('query') != query_fingerprint(query_params):
+        raise ValueError('The continuation token belongs to a query with other parameters')
+    return data
+
+# Calendar dimension: date -> ISO week, month, semester (term), term week,
+# working-day and holiday flags. The configured terms are precomputed when the
+# calendar is loaded; other dates are computed on first lookup and memoized,
+# so bucketing a record is a dict lookup instead of a date parse.
+
+def get_calendar():
+    """Return the academic calendar, loading it on first use."""
+    global _calendar
+    if _calendar is None:
+        _calendar = build_calendar(load_calendar_config())
+    return _calendar
+
+def load_calendar_config():
+    """Read the calendar JSON from S3 ({} when missing or invalid)."""
+    try:
+        response = get_s3_client().get_object(Bucket=ANALYTICS_BUCKET_NAME, Key=ANALYTICS_CALENDAR_KEY)
+        return json.loads(response['Body'].read())
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+            print(f"No academic calendar at {ANALYTICS_CALENDAR_KEY}, using July-December / January-June terms")
+        else:
+            print(f"Error reading academic calendar: {str(e)}")
+    except ValueError as e:
+        print(f"Invalid academic calendar {ANALYTICS_CALENDAR_KEY}: {str(e)}")
+    return {}
+
+def build_calendar(config):
+    """
+    Build the calendar from its configuration:
+    {
+        "weekly_off": ["Sunday"],
+        "terms": [{"name": "2025-26 Odd", "start": "2025-07-14", "end": "2025-11-28"}],
+        "holidays": {"2025-08-15": "Independence Day"}
+    }
+    Without terms, July-December and January-June are the odd and even terms.
+    """
+    calendar = {
+        'weekly_off': {WEEKDAY_NAMES.index(name.capitalize()) for name in config.get('weekly_off', ['Sunday'])},
+        'terms': sorted((day_number(term['start']), day_number(term['end']), term['name'])
+                        for term in config.get('terms', [])),
+        'holidays': dict(config.get('holidays') or {}),
+        'days': {},
+        'working_days': {}
+    }
+    
+    if calendar['terms']:
+        first_day = calendar['terms'][0][0]
+        last_day = max(end for _, end, _ in calendar['terms'])
+    else:
+        # The current academic year (July to June)
+        ist_now = datetime.utcnow() + timedelta(hours=5, minutes=30)
+        start_year = ist_now.year if ist_now.month >= 7 else ist_now.year - 1
+        first_day = datetime(start_year, 7, 1).toordinal()
+        last_day = datetime(start_year + 1, 6, 30).toordinal()
+    for ordinal in range(first_day, last_day + 1):
+        date_obj = datetime.fromordinal(ordinal)
+        calendar['days'][date_obj.strftime('%Y-%m-%d')] = calendar_entry(calendar, date_obj)
+    print(f"Academic calendar: {len(calendar['terms'])} terms, {len(calendar['holidays'])} holidays")
+    return calendar
+
+def term_of_day(calendar, ordinal):
+    """(name, start ordinal) of the term containing a day, or None."""
+    if calendar['terms']:
+        for start, end, name in calendar['terms']:
+            if start <= ordinal <= end:
+                return name, start
+        return None
+    date_obj = datetime.fromordinal(ordinal)
+    start_year = date_obj.year if date_obj.month >= 7 else date_obj.year - 1
+    if date_obj.month >= 7:
+        return f"{start_year}-{(start_year + 1) % 100:02d} Odd", datetime(date_obj.year, 7, 1).toordinal()
+    return f"{start_year}-{(start_year + 1) % 100:02d} Even", datetime(date_obj.year, 1, 1).toordinal()
+
+def calendar_entry(calendar, date_obj):
+    date = date_obj.strftime('%Y-%m-%d')
+    iso_year, iso_week, _ = date_obj.isocalendar()
+    term = term_of_day(calendar, date_obj.toordinal())
+    holiday = date in calendar['holidays']
+    return {
+        'iso_week': f"{iso_year}-W{iso_week:02d}",
+        'week_label': f"{date_obj.year}-W{iso_week}",
+        'month': date[:7],
+        'semester': term[0] if term else OUTSIDE_TERM,
+        'term_week': (date_obj.toordinal() - term[1]) // 7 + 1 if term else None,
+        'working_day': bool(term) and date_obj.weekday() not in calendar['weekly_off'] and not holiday,
+        'holiday': holiday,
+        'weekday': date_obj.weekday()
+    }
+
+def calendar_day(calendar, date):
+    """Calendar attributes of a YYYY-MM-DD date."""
+    entry = calendar['days'].get(date)
+    if entry is None:
+        entry = calendar['days'][date] = calendar_entry(calendar, datetime.strptime(date, '%Y-%m-%d'))
+    return entry
+
+def current_term(calendar, date):
+    """{'name', 'start'} of the term containing a date, or None."""
+    term = term_of_day(calendar, day_number(date))
+    if not term:
+        return None
+    return {'name': term[0], 'start': datetime.fromordinal(term[1]).strftime('%Y-%m-%d')}
+
+def period_working_days(calendar, kind, label):
+    """Number of working days in an ISO week ('YYYY-Www') or month ('YYYY-MM')."""
+    key = (kind, label)
+    if key not in calendar['working_days']:
+        if kind == 'week':
+            iso_year, iso_week = label.split('-W')
+            dates = [datetime.fromisocalendar(int(iso_year), int(iso_week), weekday) for weekday in range(1, 8)]
+        else:
+            first = datetime.strptime(f"{label}-01", '%Y-%m-%d')
+            dates = [first + timedelta(days=i) for i in range(31) if (first + timedelta(days=i)).month == first.month]
+        calendar['working_days'][key] = sum(
+            1 for date_obj in dates if calendar_day(calendar, date_obj.strftime('%Y-%m-%d'))['working_day'])
+    return calendar['working_days'][key]
+
+# Student bitmaps: every student gets a dense position (index into the sorted
+# Student_Master ids), and a set of students is an int with those bits set.
+# Unions, intersections and counts over thousands of students are then a few
+# big-int operations instead of set operations on string ids.
+
+def build_student_index(all_students):
+    """Dense student positions: {'ids': [...], 'position': {id: pos}, 'info': [...]}."""
+    students = sorted((s for s in all_students if s.get('student_id')), key=lambda s: s['student_id'])
+    return {
+        'ids': [s['student_id'] for s in students],
+        'position': {s['student_id']: i for i, s in enumerate(students)},
+        'info': students
+    }
+
+def student_position(student_index, student_id):
+    """Position of a student, appending ids missing from Student_Master."""
+    position = student_index['position'].get(student_id)
+    if position is None:
+        position = len(student_index['ids'])
+        student_index['position'][student_id] = position
+        student_index['ids'].append(student_id)
+        student_index['info'].append({})
+    return position
+
+def bitmap_from_positions(positions):
+    """Build a bitmap int from student positions."""
+    if not positions:
+        return 0
+    bits = bytearray((max(positions) >> 3) + 1)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, 'little')
+
+def bitmap_positions(bitmap):
+    """Yield the positions set in a bitmap, lowest first."""
+    while bitmap:
+        lowest = bitmap & -bitmap
+        yield lowest.bit_length() - 1
+        bitmap ^= lowest
+
+def union_bitmaps(bitmaps):
+    result = 0
+    for bitmap in bitmaps:
+        result |= bitmap
+    return result
+
+def at_least_bitmap(bitmaps, min_count):
+    """Students set in at least min_count of the bitmaps (saturating bit-sliced counter)."""
+    if min_count <= 0:
+        return union_bitmaps(bitmaps)
+    # levels[k] holds the students seen at least k + 1 times so far
+    levels = [0] * min_count
+    for bitmap in bitmaps:
+        accumulate_levels(levels, bitmap)
+    return levels[-1]
+
+def accumulate_levels(levels, bitmap):
+    """Add one bitmap to the bit-sliced counter of at_least_bitmap."""
+    for k in range(len(levels) - 1, 0, -1):
+        levels[k] |= levels[k - 1] & bitmap
+    if levels:
+        levels[0] |= bitmap
+
+def build_attendance_bitmaps(records, student_index):
+    """Group records into {(date, lecture, status): bitmap of students}."""
+    positions = defaultdict(list)
+    for record in records:
+        student_id = record.get('student_id')
+        if not student_id or not record.get('date'):
+            continue
+        key = (record['date'], record.get('lecture', ''), record.get('status', ''))
+        positions[key].append(student_position(student_index, student_id))
+    return {key: bitmap_from_positions(group) for key, group in positions.items()}
+
+def student_group_masks(student_index, group_of):
+    """Bitmap of the students of each group, e.g. each department/year."""
+    positions = defaultdict(list)
+    for position, info in enumerate(student_index['info']):
+        positions[group_of(info)].append(position)
+    return {group: bitmap_from_positions(group_positions) for group, group_positions in positions.items()}
+
+def generate_student_set_analytics(accumulator, student_index):
+    """
+    Student set metrics over the period: unique students per status, students
+    present in every lecture they had a record for, and students with at
+    least min_count records of a status (e.g. proxy twice or more).
+    """
+    status_unions = accumulator['status_seen']
+    students_seen = union_bitmaps(status_unions.values())
+    not_present = union_bitmaps(bitmap for record_status, bitmap in status_unions.items() if record_status != 'Present')
+    always_present = students_seen & ~not_present
+    levels = accumulator['repeat_levels']
+    repeat = levels[-1] if levels else status_unions.get(accumulator['repeat_status'], 0)
+    
+    ids = student_index['ids']
+    return {
+        'lectures': sum(len(lectures) for lectures in accumulator['lectures'].values()),
+        'unique_students': popcount(students_seen),
+        'unique_students_by_status': {record_status.lower(): popcount(status_unions.get(record_status, 0))
+                                      for record_status in ANALYTICS_STATUSES},
+        'always_present': popcount(always_present),
+        'repeat_status': accumulator['repeat_status'],
+        'repeat_min_count': accumulator['repeat_min_count'],
+        'repeat_students': [ids[position] for position in bitmap_positions(repeat)]
+    }
+
+# Columnar cache: Final_Attendance held as NumPy columns (uint16 day number,
+# uint8 status code, int32 student position, uint16 lecture code), about 9
+# bytes per record. It is loaded once per container and refreshed per date
+# using the Analytics_State versions, and periods are aggregated with
+# np.bincount instead of per-record dicts.
+
+def get_numpy():
+    """Return the numpy module, importing it on first use (None if not installed)."""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            print("NumPy not available, analytics are computed from the records")
+            _numpy = False
+    return _numpy or None
+
+def get_columnar_cache():
+    """
+    Return the container's columnar cache with the dates whose Analytics_State
+    version changed reloaded, or None until fill_columnar_cache has loaded
+    all of it (or when disabled or NumPy is missing).
+    """
+    cache = _columnar_cache
+    if cache is None or cache['scan_key'] is not None:
+        return None
+    np = get_numpy()
+    
+    versions = load_date_versions()
+    stale_dates = sorted(date for date in set(versions) | set(cache['versions'])
+                         if versions.get(date) != cache['versions'].get(date))
+    if stale_dates:
+        print(f"Reloading {len(stale_dates)} changed dates in the columnar cache: {stale_dates[:10]}")
+        stale_days = np.array([day_number(date) - DAY_BASE for date in stale_dates], dtype=np.int64)
+        keep = ~np.isin(cache['day'], stale_days)
+        for column in ('day', 'status', 'student', 'lecture'):
+            cache[column] = cache[column][keep]
+        for date in stale_dates:
+            append_columnar_rows(np, cache, query_attendance_items(date))
+        cache['versions'] = dict(versions)
+    return cache
+
+def fill_columnar_cache(request_budget):
+    """
+    Start or continue the full-table scan that loads the columnar cache,
+    after a request was answered from the records. The scan runs under its
+    own budget (ANALYTICS_COLUMNAR_FILL_READS/_MS, within what is left of the
+    request's time budget), so a cold container never answers from a
+    half-loaded cache and the load costs each request a bounded amount.
+    """
+    global _columnar_cache
+    if not ANALYTICS_COLUMNAR_CACHE:
+        return
+    np = get_numpy()
+    if np is None:
+        return
+    
+    remaining = request_budget['max_seconds'] - (time.monotonic() - request_budget['started'])
+    if remaining <= 0:
+        return
+    budget = {
+        'started': time.monotonic(),
+        'max_reads': ANALYTICS_COLUMNAR_FILL_READS,
+        'max_seconds': min(ANALYTICS_COLUMNAR_FILL_MS / 1000, remaining),
+        'read_units': 0,
+        'pages': 0,
+        'largest_page_units': 0,
+        'slowest_page_seconds': 0
     }
     
-    unique_students = set()
-    unique_dates = set()
+    cache = _columnar_cache
+    if cache is None:
+        cache = {
+            # Versions as of the start of the load; dates changed meanwhile are reloaded once it completes
+            'versions': load_date_versions(),
+            'scan_key': None,
+            'student_index': {'ids': [], 'position': {}, 'info': []},
+            'lectures': [],
+            'lecture_codes': {},
+            'day': np.zeros(0, dtype=np.uint16),
+            'status': np.zeros(0, dtype=np.uint8),
+            'student': np.zeros(0, dtype=np.int32),
+            'lecture': np.zeros(0, dtype=np.uint16)
+        }
+        _columnar_cache = cache
+        load_columnar_pages(np, cache, None, budget)
+    elif cache['scan_key'] is not None:
+        load_columnar_pages(np, cache, {'date': None, 'key': cache['scan_key']}, budget)
+
+def load_columnar_pages(np, cache, position, budget):
+    """Continue the initial full scan of the columnar cache until done or out of its fill budget."""
+    for items, position in read_attendance_pages(None, None, position, budget):
+        append_columnar_rows(np, cache, items)
+        if position is not None and budget_exhausted(budget):
+            break
+    cache['scan_key'] = position['key'] if position else None
     
+    size = sum(cache[column].nbytes for column in ('day', 'status', 'student', 'lecture'))
+    state = 'loading, budget exhausted' if cache['scan_key'] else 'loaded'
+    print(f"Columnar cache {state}: {len(cache['day'])} records, {size} bytes")
+
+def append_columnar_rows(np, cache, records):
+    """Encode records into the cache columns."""
+    days, statuses, students, lectures = array('H'), array('B'), array('i'), array('H')
+    status_codes = {status: code for code, status in enumerate(ANALYTICS_STATUSES)}
+    day_codes = {}
     for record in records:
-        status = record.get('status', '')
-        if status in status_counts:
-            status_counts[status] += 1
+        date = record.get('date')
+        student_id = record.get('student_id')
+        if not date or not student_id:
+            continue
+        day = day_codes.get(date)
+        if day is None:
+            day = day_codes[date] = day_number(date) - DAY_BASE
+        lecture = record.get('lecture', '')
+        lecture_code = cache['lecture_codes'].get(lecture)
+        if lecture_code is None:
+            lecture_code = cache['lecture_codes'][lecture] = len(cache['lectures'])
+            cache['lectures'].append(lecture)
+        
+        days.append(day)
+        statuses.append(status_codes.get(record.get('status'), STATUS_CODES - 1))
+        students.append(student_position(cache['student_index'], student_id))
+        lectures.append(lecture_code)
+    
+    for column, values, dtype in (('day', days, np.uint16), ('status', statuses, np.uint8),
+                                  ('student', students, np.int32), ('lecture', lectures, np.uint16)):
+        if values:
+            cache[column] = np.concatenate([cache[column], np.frombuffer(values, dtype=dtype)])
+
+def day_label(day):
+    """YYYY-MM-DD of a columnar day number."""
+    return datetime.fromordinal(int(day) + DAY_BASE).strftime('%Y-%m-%d')
+
+def status_label(code):
+    return ANALYTICS_STATUSES[code] if code < len(ANALYTICS_STATUSES) else 'Other'
+
+def bucket_status_counts(np, buckets, statuses, bucket_count):
+    """Matrix of record counts per bucket (rows) and status code (columns)."""
+    flat = buckets.astype(np.int64) * STATUS_CODES + statuses
+    return np.bincount(flat, minlength=bucket_count * STATUS_CODES).reshape(bucket_count, STATUS_CODES)
+
+def status_totals(counts):
+    """present/absent/proxy/bunk/total dict from a row (or list) of status counts."""
+    totals = {status.lower(): int(counts[code]) for code, status in enumerate(ANALYTICS_STATUSES)}
+    totals['total'] = int(sum(counts))
+    return totals
+
+def attendance_percentage(totals):
+    return round(totals['present'] / totals['total'] * 100, 2) if totals['total'] > 0 else 0
+
+def columnar_bitmaps(np, cache, day, lecture, status, student):
+    """Per-(date, lecture, status) student bitmaps from the selected rows."""
+    bitmaps = {}
+    if not len(day):
+        return bitmaps
+    lecture_count = len(cache['lectures'])
+    student_count = len(cache['student_index']['ids'])
+    keys = (day.astype(np.int64) * lecture_count + lecture) * STATUS_CODES + status
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    students = student[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)]
+    for start, end in zip(starts, ends):
+        key = int(keys[start])
+        bits = np.zeros(student_count, dtype=bool)
+        bits[students[start:end]] = True
+        bitmap = int.from_bytes(np.packbits(bits, bitorder='little').tobytes(), 'little')
+        day_lecture, status_code = divmod(key, STATUS_CODES)
+        day_code, lecture_code = divmod(day_lecture, lecture_count)
+        bitmaps[(day_label(day_code), cache['lectures'][lecture_code], status_label(status_code))] = bitmap
+    return bitmaps
+
+def student_codes(np, student_index, field):
+    """(code per student position, labels) of a Student_Master field, e.g. department."""
+    labels = {}
+    codes = np.array([labels.setdefault(info.get(field, 'Unknown'), len(labels)) for info in student_index['info']],
+                     dtype=np.int64)
+    return codes, list(labels)
+
+def generate_columnar_analytics(cache, all_students, period, view, start_date, end_date, filters, query_params):
+    """Compute (analytics, overall statistics) from the columnar cache, same output as the record path."""
+    np = get_numpy()
+    student_index = cache['student_index']
+    # Student details come from the current Student_Master, not the load time
+    info_by_id = {s['student_id']: s for s in all_students if s.get('student_id')}
+    student_index['info'] = [info_by_id.get(student_id, {}) for student_id in student_index['ids']]
+    
+    mask = np.ones(len(cache['day']), dtype=bool)
+    if start_date and end_date:
+        first = day_number(start_date) - DAY_BASE
+        last = day_number(end_date) - DAY_BASE
+        mask &= (cache['day'] >= max(first, 0)) & (cache['day'] <= min(last, 0xFFFF))
+    if any(filters.values()):
+        allowed = np.array([
+            all(not value or info.get(field) == value for field, value in filters.items())
+            for info in student_index['info']
+        ], dtype=bool)
+        mask &= allowed[cache['student']]
+    rows = np.flatnonzero(mask)
+    
+    day = cache['day'][rows]
+    status = cache['status'][rows]
+    student = cache['student'][rows]
+    lecture = cache['lecture'][rows]
+    bitmaps = columnar_bitmaps(np, cache, day, lecture, status, student)
+    calendar = get_calendar()
+    accumulator = new_accumulator(period, view, query_params)
+    
+    if not len(rows):
+        if view == 'students':
+            analytics = generate_student_set_analytics(accumulator, student_index)
+        elif 'cells' in accumulator:
+            analytics = generate_matrix_analytics(accumulator)
+        else:
+            analytics = []
+        return analytics, calculate_overall_statistics(accumulator)
+    
+    days, day_of_row = np.unique(day, return_inverse=True)
+    # Calendar attributes are looked up once per distinct day, then mapped to rows
+    day_entries = [calendar_day(calendar, day_label(d)) for d in days]
+    if view == 'students':
+        accumulate_bitmaps(accumulator, bitmaps, calendar)
+        analytics = generate_student_set_analytics(accumulator, student_index)
+    elif 'cells' in accumulator:
+        axes = accumulator['axes']
+        if axes == 'weekday_lecture':
+            weekday_of_day = np.array([entry['weekday'] for entry in day_entries], dtype=np.int64)
+            row_codes, row_keys = weekday_of_day[day_of_row], list(range(len(WEEKDAY_NAMES)))
+            column_codes, column_keys = lecture, cache['lectures']
+        elif axes == 'date_department':
+            row_codes, row_keys = day_of_row, [day_label(d) for d in days]
+            department_of_student, column_keys = student_codes(np, student_index, 'department')
+            column_codes = department_of_student[student]
+        else:
+            department_of_student, row_keys = student_codes(np, student_index, 'department')
+            year_of_student, column_keys = student_codes(np, student_index, 'year')
+            row_codes, column_codes = department_of_student[student], year_of_student[student]
+        # One bucket per (row, column) cell
+        counts = bucket_status_counts(np, row_codes.astype(np.int64) * len(column_keys) + column_codes,
+                                      status, len(row_keys) * len(column_keys))
+        for bucket in np.flatnonzero(counts.sum(axis=1)):
+            row, column = divmod(int(bucket), len(column_keys))
+            accumulator['cells'][(row_keys[row], column_keys[column])] = [int(count) for count in counts[bucket]]
+        analytics = generate_matrix_analytics(accumulator)
+    elif period == 'weekly':
+        weeks, first_day, week_of_day = np.unique(np.array([entry['iso_week'] for entry in day_entries]),
+                                                  return_index=True, return_inverse=True)
+        counts = bucket_status_counts(np, week_of_day[day_of_row], status, len(weeks))
+        days_per_week = np.bincount(week_of_day, minlength=len(weeks))
+        analytics = []
+        for i, week in enumerate(weeks):
+            totals = status_totals(counts[i])
+            analytics.append({
+                'week': str(week),
+                'week_label': day_entries[first_day[i]]['week_label'],
+                **totals,
+                'attendance_percentage': attendance_percentage(totals),
+                'days_count': int(days_per_week[i]),
+                'working_days': period_working_days(calendar, 'week', str(week))
+            })
+    elif period == 'monthly':
+        months, month_of_day = np.unique(np.array([entry['month'] for entry in day_entries]), return_inverse=True)
+        counts = bucket_status_counts(np, month_of_day[day_of_row], status, len(months))
+        analytics = []
+        for i, month in enumerate(months):
+            totals = status_totals(counts[i])
+            analytics.append({
+                'month': str(month),
+                **totals,
+                'attendance_percentage': attendance_percentage(totals),
+                'working_days': period_working_days(calendar, 'month', str(month))
+            })
+    elif period == 'semester':
+        semesters, semester_of_day = np.unique(np.array([entry['semester'] for entry in day_entries]), return_inverse=True)
+        group_keys = {}
+        group_of_student = np.array([
+            group_keys.setdefault((info.get('department', 'Unknown'), info.get('year', 'Unknown')), len(group_keys))
+            for info in student_index['info']
+        ], dtype=np.int64)
+        groups = list(group_keys)
+        # One bucket per (term, department/year group)
+        buckets = semester_of_day[day_of_row].astype(np.int64) * len(groups) + group_of_student[student]
+        counts = bucket_status_counts(np, buckets, status, len(semesters) * len(groups))
+        student_count = len(student_index['ids'])
+        pairs = np.unique(buckets * student_count + student)
+        students_per_bucket = np.bincount(pairs // student_count, minlength=len(semesters) * len(groups))
+        analytics = []
+        for bucket in range(len(semesters) * len(groups)):
+            totals = status_totals(counts[bucket])
+            if not totals['total']:
+                continue
+            semester_code, group_code = divmod(bucket, len(groups))
+            dept, year = groups[group_code]
+            analytics.append({
+                'semester': str(semesters[semester_code]),
+                'department': dept,
+                'year': year,
+                **totals,
+                'unique_students': int(students_per_bucket[bucket]),
+                'attendance_percentage': attendance_percentage(totals)
+            })
+        analytics.sort(key=lambda row: (row['semester'], str(row['department']), str(row['year'])))
+    else:
+        counts = bucket_status_counts(np, day_of_row, status, len(days))
+        analytics = []
+        for i, d in enumerate(days):
+            totals = status_totals(counts[i])
+            analytics.append({'date': day_label(d), **totals, 'attendance_percentage': attendance_percentage(totals)})
+    
+    totals = status_totals(np.bincount(status, minlength=STATUS_CODES))
+    overall_stats = {
+        'total_records': totals['total'],
+        'present': totals['present'],
+        'absent': totals['absent'],
+        'proxy': totals['proxy'],
+        'bunk': totals['bunk'],
+        'attendance_percentage': attendance_percentage(totals),
+        'unique_students': popcount(union_bitmaps(bitmaps.values())),
+        'unique_dates': len(days)
+    }
+    return analytics, overall_stats
+
+# Prefix-sum index: for every (department, year, division) slice and status
+# the index keeps a cumulative count array over consecutive days, where
+# prefix[i] is the number of records on the first i days. The count of any date range is then
+# prefix[end + 1] - prefix[start], whatever the length of the range.
+#
+# process_attendance_upload increments a per-date version in Analytics_State
+# whenever it writes records for a date; days whose version differs from the
+# one recorded in the index are recounted and patched into it.
+
+def get_range_view(view, query_params, department, year, division, budget):
+    """
+    Answer view=summary or view=compare from the prefix-sum index. While the
+    index is still being built, the totals cover the records scanned so far
+    and the response is partial, with a continuation token that resumes the
+    build.
+    """
+    index, complete = get_prefix_index(budget)
+    first_date, last_date = index_date_bounds(index)
+    
+    start_date = query_params.get('start_date') or first_date
+    end_date = query_params.get('end_date') or last_date
+    filters = {'department': department, 'year': year, 'division': division}
+    body = {
+        'view': view,
+        'start_date': start_date,
+        'end_date': end_date,
+        'filters': {k: v for k, v in filters.items() if v},
+        'index_first_date': first_date,
+        'index_last_date': last_date,
+        'partial': not complete,
+        # The build progress is stored with the index, so the token holds no state
+        'continuation': None if complete else encode_continuation({'index_build': True}, query_params)
+    }
+    if not start_date or not end_date:
+        # Nothing has been indexed yet
+        body['totals'] = range_totals(index, None, None, filters)
+        return body
+    
+    body['totals'] = range_totals(index, start_date, end_date, filters)
+    if view == 'compare':
+        compare_start = query_params.get('compare_start_date')
+        compare_end = query_params.get('compare_end_date')
+        if not compare_start or not compare_end:
+            raise ValueError('view=compare requires compare_start_date and compare_end_date')
+        compare_totals = range_totals(index, compare_start, compare_end, filters)
+        body['compare_start_date'] = compare_start
+        body['compare_end_date'] = compare_end
+        body['compare_totals'] = compare_totals
+        body['difference'] = {key: round(body['totals'][key] - compare_totals[key], 2)
+                              for key in body['totals']}
+    return body
+
+def day_number(date):
+    """Return the proleptic ordinal of a YYYY-MM-DD date (raises ValueError)."""
+    return datetime.strptime(date, '%Y-%m-%d').toordinal()
+
+def index_date_bounds(index):
+    """First and last date covered by the index, or (None, None) if empty."""
+    if not index['days']:
+        return None, None
+    first = datetime.fromordinal(index['start_day'])
+    last = datetime.fromordinal(index['start_day'] + index['days'] - 1)
+    return first.strftime('%Y-%m-%d'), last.strftime('%Y-%m-%d')
+
+def range_totals(index, start_date, end_date, filters):
+    """Status totals of a date range (inclusive) over the matching slices."""
+    counts = [0] * len(ANALYTICS_STATUSES)
+    if index['days'] and start_date and end_date:
+        # Clamp to the indexed days; days outside it have no records
+        lo = min(max(day_number(start_date) - index['start_day'], 0), index['days'])
+        hi = min(max(day_number(end_date) - index['start_day'] + 1, lo), index['days'])
+        for slice_key, prefixes in index['slices'].items():
+            if not slice_matches(slice_key, filters):
+                continue
+            for s, prefix in enumerate(prefixes):
+                counts[s] += prefix[hi] - prefix[lo]
+    
+    total = sum(counts)
+    present = counts[ANALYTICS_STATUSES.index('Present')]
+    totals = {status.lower(): count for status, count in zip(ANALYTICS_STATUSES, counts)}
+    totals['total'] = total
+    totals['attendance_percentage'] = round(present / total * 100, 2) if total > 0 else 0
+    return totals
+
+def slice_matches(slice_key, filters):
+    """Whether a (department, year, division) slice passes the query filters."""
+    department, year, division = slice_key
+    return ((not filters.get('department') or filters['department'] == department)
+            and (not filters.get('year') or filters['year'] == year)
+            and (not filters.get('division') or filters['division'] == division))
+
+def get_prefix_index(budget):
+    """
+    Return (index, complete). The container copy is reused while the
+    Analytics_State date versions match; otherwise the stored index is
+    loaded and the changed days are recounted. Without a stored index, the
+    build scan is continued under the request budget; until it finishes the
+    index covers only the records scanned so far and complete is False.
+    """
+    global _prefix_index
+    versions = load_date_versions()
+    index = _prefix_index
+    if index is not None and index['versions'] == versions:
+        return index, True
+    
+    if index is None:
+        index = read_prefix_index()
+    if index is None:
+        index, complete = continue_prefix_index_build(versions, budget)
+        if not complete:
+            return index, False
+        write_prefix_index(index)
+    
+    stale_dates = sorted(date for date in set(versions) | set(index['versions'])
+                         if versions.get(date) != index['versions'].get(date))
+    if stale_dates:
+        print(f"Recounting {len(stale_dates)} changed dates in the prefix index: {stale_dates[:10]}")
+        slice_of = student_slices(fetch_all_students())
+        for date in stale_dates:
+            apply_day_counts(index, day_number(date), count_date_by_slice(date, slice_of))
+        index['versions'] = dict(versions)
+        write_prefix_index(index)
+    
+    _prefix_index = index
+    return index, True
+
+def load_date_versions():
+    """Per-date data versions maintained by process_attendance_upload."""
+    try:
+        response = get_table(ANALYTICS_STATE_TABLE).get_item(Key={'state_key': 'date_versions'})
+    except ClientError as e:
+        print(f"Error loading analytics date versions: {str(e)}")
+        raise
+    item = response.get('Item') or {}
+    return {key[2:]: int(value) for key, value in item.items() if key.startswith('d#')}
+
+def student_slices(all_students):
+    """Map student_id -> (department, year, division) slice key."""
+    return {
+        s['student_id']: (str(s.get('department') or ''), str(s.get('year') or ''), str(s.get('division') or ''))
+        for s in all_students if s.get('student_id')
+    }
+
+def empty_prefix_index():
+    return {'format': PREFIX_INDEX_FORMAT, 'start_day': 0, 'days': 0, 'versions': {}, 'slices': {}}
+
+def continue_prefix_index_build(versions, budget):
+    """
+    Continue the full scan of Final_Attendance that builds the index, from
+    the progress stored by earlier requests, until done or out of budget.
+    Returns (index, complete); an unfinished scan stores its progress
+    (position and daily counts) for the next request.
+    """
+    build = read_prefix_index_build() or {'versions': dict(versions), 'scan_key': None, 'daily': {}}
+    slice_of = student_slices(fetch_all_students())
+    status_index = {status: s for s, status in enumerate(ANALYTICS_STATUSES)}
+    
+    position = {'date': None, 'key': build['scan_key']} if build['scan_key'] else None
+    for items, position in read_attendance_pages(None, None, position, budget):
+        for record in items:
+            s = status_index.get(record.get('status'))
+            if s is None or not record.get('date'):
+                continue
+            day_counts = build['daily'].setdefault(slice_of.get(record.get('student_id'), ('', '', '')), {})
+            day_counts.setdefault(day_number(record['date']), [0] * len(ANALYTICS_STATUSES))[s] += 1
+        if position is not None and budget_exhausted(budget):
+            break
+    
+    # Versions as of the start of the build; days changed meanwhile are recounted once it completes
+    index = prefix_index_from_daily(build['daily'], build['versions'])
+    if position is None:
+        print(f"Built prefix index: {index['days']} days, {len(index['slices'])} slices")
+        delete_prefix_index_build()
+        return index, True
+    build['scan_key'] = position['key']
+    write_prefix_index_build(build)
+    print(f"Prefix index build continues next request: {index['days']} days counted so far")
+    return index, False
+
+def prefix_index_from_daily(daily, versions):
+    """Build an index from {slice_key: {day: status counts}}."""
+    index = empty_prefix_index()
+    index['versions'] = dict(versions)
+    days = [day for day_counts in daily.values() for day in day_counts]
+    if not days:
+        return index
+    
+    first_day = min(days)
+    index['start_day'] = first_day
+    index['days'] = max(days) - first_day + 1
+    for slice_key, day_counts in daily.items():
+        prefixes = []
+        for s in range(len(ANALYTICS_STATUSES)):
+            prefix = [0] * (index['days'] + 1)
+            running = 0
+            for i in range(index['days']):
+                counts = day_counts.get(first_day + i)
+                if counts:
+                    running += counts[s]
+                prefix[i + 1] = running
+            prefixes.append(prefix)
+        index['slices'][slice_key] = prefixes
+    return index
+
+def count_date_by_slice(date, slice_of):
+    """Status counts of one date per slice, via the date index."""
+    counts = defaultdict(lambda: [0] * len(ANALYTICS_STATUSES))
+    status_index = {status: s for s, status in enumerate(ANALYTICS_STATUSES)}
+    for record in query_attendance_items(date):
+        s = status_index.get(record.get('status'))
+        if s is not None:
+            counts[slice_of.get(record.get('student_id'), ('', '', ''))][s] += 1
+    return counts
+
+def read_attendance_page(date=None, exclusive_start_key=None):
+    """
+    One page of Final_Attendance records projected to the analytics fields:
+    the records of a date via the date index, or a page of a full scan.
+    """
+    # Only project what the analytics need so the reads stay cheap
+    request = {
+        'ProjectionExpression': 'student_id, #date, #status, lecture',
+        'ExpressionAttributeNames': {'#date': 'date', '#status': 'status'},
+        'ReturnConsumedCapacity': 'TOTAL'
+    }
+    if exclusive_start_key:
+        request['ExclusiveStartKey'] = exclusive_start_key
+    
+    table = get_table(FINAL_ATTENDANCE_TABLE)
+    if date is None:
+        return table.scan(**request)
+    request.update(
+        IndexName='date-index',
+        KeyConditionExpression='#date = :date_val',
+        ExpressionAttributeValues={':date_val': date}
+    )
+    return table.query(**request)
+
+def query_attendance_items(date):
+    """Yield the Final_Attendance records of one date via the date index."""
+    last_evaluated_key = None
+    while True:
+        response = read_attendance_page(date, last_evaluated_key)
+        yield from response.get('Items', [])
         
-        unique_students.add(record.get('student_id'))
-        unique_dates.add(record.get('date'))
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if not last_evaluated_key:
+            break
+
+def read_attendance_pages(start_date, end_date, position, budget):
+    """
+    Yield (records, next position) page by page, charging every page to the
+    budget. Without dates the table is scanned, otherwise the dates of the
+    range are queried one by one through the date index. A position is
+    {'date': date being queried (None when scanning), 'key': DynamoDB
+    ExclusiveStartKey}; the next position is None after the last page.
+    """
+    date = None
+    if start_date and end_date:
+        date = (position or {}).get('date') or start_date
+        if date > end_date:
+            return
+    key = (position or {}).get('key')
+    
+    while True:
+        page_started = time.monotonic()
+        try:
+            response = read_attendance_page(date, key)
+        except ClientError as e:
+            print(f"Error reading attendance records for analytics: {str(e)}")
+            raise
+        charge_page(budget, response, time.monotonic() - page_started)
+        
+        key = response.get('LastEvaluatedKey')
+        if not key and date is not None and date < end_date:
+            date = (datetime.strptime(date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+        elif not key:
+            yield response.get('Items', []), None
+            return
+        yield response.get('Items', []), {'date': date, 'key': key}
+
+def extend_prefix_index(index, day):
+    """Grow the index so that it covers a day."""
+    if not index['days']:
+        index['start_day'] = day
+        index['days'] = 1
+        for prefixes in index['slices'].values():
+            for prefix in prefixes:
+                prefix[:] = [0, 0]
+        return
+    
+    if day < index['start_day']:
+        # Days before the old start are empty: shift every prefix right
+        grow = index['start_day'] - day
+        for prefixes in index['slices'].values():
+            for prefix in prefixes:
+                prefix[:0] = [0] * grow
+        index['start_day'] = day
+        index['days'] += grow
+    elif day >= index['start_day'] + index['days']:
+        grow = day - (index['start_day'] + index['days']) + 1
+        for prefixes in index['slices'].values():
+            for prefix in prefixes:
+                prefix.extend([prefix[-1]] * grow)
+        index['days'] += grow
+
+def apply_day_counts(index, day, counts_by_slice):
+    """Replace the counts of one day, shifting the later prefix entries by the difference."""
+    extend_prefix_index(index, day)
+    i = day - index['start_day']
+    for slice_key in set(index['slices']) | set(counts_by_slice):
+        prefixes = index['slices'].setdefault(
+            slice_key, [[0] * (index['days'] + 1) for _ in ANALYTICS_STATUSES])
+        new_counts = counts_by_slice.get(slice_key, [0] * len(ANALYTICS_STATUSES))
+        for s, prefix in enumerate(prefixes):
+            delta = new_counts[s] - (prefix[i + 1] - prefix[i])
+            if delta:
+                for j in range(i + 1, len(prefix)):
+                    prefix[j] += delta
+
+def read_prefix_index():
+    """Load the stored index from S3, or None if missing or of another format."""
+    try:
+        response = get_s3_client().get_object(Bucket=ANALYTICS_BUCKET_NAME, Key=ANALYTICS_INDEX_KEY)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+            return None
+        print(f"Error reading prefix index: {str(e)}")
+        return None
+    
+    with gzip.GzipFile(fileobj=response['Body'], mode='rb') as stored:
+        data = json.loads(stored.read())
+    if data.get('format') != PREFIX_INDEX_FORMAT:
+        return None
+    index = empty_prefix_index()
+    index.update(start_day=data['start_day'], days=data['days'], versions=data['versions'])
+    for entry in data['slices']:
+        slice_key = (entry['department'], entry['year'], entry['division'])
+        index['slices'][slice_key] = [entry['prefix'][status] for status in ANALYTICS_STATUSES]
+    return index
+
+def write_prefix_index(index):
+    """Store the index in S3 as gzip-compressed JSON."""
+    data = {
+        'format': PREFIX_INDEX_FORMAT,
+        'start_day': index['start_day'],
+        'days': index['days'],
+        'versions': index['versions'],
+        'slices': [{
+            'department': department,
+            'year': year,
+            'division': division,
+            'prefix': dict(zip(ANALYTICS_STATUSES, prefixes))
+        } for (department, year, division), prefixes in index['slices'].items()]
+    }
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as stored:
+        stored.write(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+    try:
+        get_s3_client().put_object(
+            Bucket=ANALYTICS_BUCKET_NAME,
+            Key=ANALYTICS_INDEX_KEY,
+            Body=buffer.getvalue(),
+            ContentType='application/gzip'
+        )
+    except ClientError as e:
+        # The container copy is still valid; other containers recount the changed days themselves
+        print(f"Error writing prefix index: {str(e)}")
+
+def read_prefix_index_build():
+    """Load the progress of an unfinished index build from S3, or None."""
+    try:
+        response = get_s3_client().get_object(Bucket=ANALYTICS_BUCKET_NAME, Key=f"{ANALYTICS_INDEX_KEY}.build")
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+            print(f"Error reading prefix index build: {str(e)}")
+        return None
     
-    total = len(records)
-    present_count = status_counts['Present']
-    attendance_pct = (present_count / total * 100) if total > 0 else 0
+    with gzip.GzipFile(fileobj=response['Body'], mode='rb') as stored:
+        data = json.loads(stored.read())
+    if data.get('format') != PREFIX_INDEX_FORMAT:
+        return None
+    daily = {}
+    for entry in data['daily']:
+        slice_key = (entry['department'], entry['year'], entry['division'])
+        daily[slice_key] = {int(day): counts for day, counts in entry['days'].items()}
+    return {'versions': data['versions'], 'scan_key': data['scan_key'], 'daily': daily}
+
+def write_prefix_index_build(build):
+    """Store the progress of an unfinished index build in S3 (next to the index)."""
+    data = {
+        'format': PREFIX_INDEX_FORMAT,
+        'versions': build['versions'],
+        'scan_key': build['scan_key'],
+        'daily': [{
+            'department': department,
+            'year': year,
+            'division': division,
+            'days': {str(day): counts for day, counts in day_counts.items()}
+        } for (department, year, division), day_counts in build['daily'].items()]
+    }
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as stored:
+        stored.write(json.dumps(data, separators=(',', ':'), cls=DecimalEncoder).encode('utf-8'))
+    try:
+        get_s3_client().put_object(
+            Bucket=ANALYTICS_BUCKET_NAME,
+            Key=f"{ANALYTICS_INDEX_KEY}.build",
+            Body=buffer.getvalue(),
+            ContentType='application/gzip'
+        )
+    except ClientError as e:
+        # The next request starts the scan over
+        print(f"Error writing prefix index build: {str(e)}")
+
+def delete_prefix_index_build():
+    try:
+        get_s3_client().delete_object(Bucket=ANALYTICS_BUCKET_NAME, Key=f"{ANALYTICS_INDEX_KEY}.build")
+    except ClientError as e:
+        print(f"Error deleting prefix index build: {str(e)}")
+
+# Arrival distribution: handle_entry_log adds every student's first tap of the
+# day to a per-minute histogram per day and per department in Live_Stats.
+# Histograms merge by adding bins, so percentiles over any date range cost one
+# item read per day, however many taps there were.
+
+def get_arrival_view(query_params, department, year, division):
+    """Answer view=arrival by merging the daily arrival histograms of the range."""
+    if year or division:
+        raise ValueError('view=arrival can only be filtered by department')
     
+    # Use IST date (UTC + 5.5 hours)
+    ist_now = datetime.utcnow() + timedelta(hours=5, minutes=30)
+    end_date = query_params.get('end_date') or ist_now.strftime('%Y-%m-%d')
+    start_date = query_params.get('start_date') or (
+        datetime.fromordinal(day_number(end_date) - ARRIVAL_DEFAULT_DAYS + 1).strftime('%Y-%m-%d'))
+    if day_number(start_date) > day_number(end_date):
+        raise ValueError('start_date must not be after end_date')
+    
+    dates = [datetime.fromordinal(day).strftime('%Y-%m-%d')
+             for day in range(day_number(start_date), day_number(end_date) + 1)]
+    scope = f"ARRIVAL#DEPT#{department}" if department else 'ARRIVAL'
+    items = get_live_stats_items([f"{date}#{scope}" for date in dates])
+    
+    merged = defaultdict(int)
+    daily = []
+    for date in dates:
+        bins = arrival_bins(items.get(f"{date}#{scope}", {}))
+        if not bins:
+            continue
+        for minutes, count in bins.items():
+            merged[minutes] += count
+        daily.append({'date': date, **arrival_percentiles(bins)})
+    
+    return {
+        'view': 'arrival',
+        'start_date': start_date,
+        'end_date': end_date,
+        'department': department,
+        'reference_time': ARRIVAL_REFERENCE_TIME,
+        'days': len(daily),
+        **arrival_percentiles(merged),
+        'daily': daily
+    }
+
+def arrival_bins(item):
+    """{minutes: count} from the m<minutes> attributes of an arrival item."""
+    return {int(key[1:]): int(value) for key, value in item.items() if key[:1] == 'm' and key[1:].lstrip('-').isdigit()}
+
+def arrival_percentiles(bins):
+    """Arrivals counted, percentile offsets in minutes and their IST clock times."""
+    total = sum(bins.values())
+    minutes = {}
+    if total:
+        ordered = sorted(bins.items())
+        for percentile in ARRIVAL_PERCENTILES:
+            # Nearest rank: the smallest offset with at least percentile% of the arrivals at or before it
+            rank = max(1, -(-total * percentile // 100))
+            seen = 0
+            for offset, count in ordered:
+                seen += count
+                if seen >= rank:
+                    minutes[f"p{percentile}"] = offset
+                    break
+    
+    reference = int(ARRIVAL_REFERENCE_TIME[:2]) * 60 + int(ARRIVAL_REFERENCE_TIME[3:5])
+    return {
+        'arrivals': total,
+        'minutes_after_reference': minutes,
+        'times': {name: f"{(reference + offset) // 60 % 24:02d}:{(reference + offset) % 60:02d}"
+                  for name, offset in minutes.items()}
+    }
+
+def get_live_stats_items(stat_keys):
+    """Fetch Live_Stats items with BatchGetItem (100 keys per request), keyed by stat_key."""
+    items = {}
+    for i in range(0, len(stat_keys), 100):
+        request = {LIVE_STATS_TABLE: {'Keys': [{'stat_key': key} for key in stat_keys[i:i + 100]]}}
+        try:
+            while request:
+                response = get_dynamodb().batch_get_item(RequestItems=request)
+                for item in response.get('Responses', {}).get(LIVE_STATS_TABLE, []):
+                    items[item['stat_key']] = item
+                request = response.get('UnprocessedKeys') or None
+        except ClientError as e:
+            print(f"Error fetching arrival histograms: {str(e)}")
+            raise
+    return items
+
+# Response cache. process_attendance_upload bumps the Analytics_State version
+# of every date it writes, so an entry is valid while the versions of the dates
+# it covers are unchanged: an upload invalidates exactly the queries whose range
+# contains one of its dates. Ranges ending before today are kept until then;
+# open ones also expire after ANALYTICS_CACHE_TTL_SECONDS, which bounds the
+# staleness of changes that bump no version (Student_Master, calendar).
+
+def open_cache_entry(query_params, period, start_date, end_date):
+    """Cache key, data signature and expiry of a query."""
+    params = {key: value for key, value in query_params.items() if key not in BUDGET_PARAMS and value}
+    params.update(period=period, start_date=start_date, end_date=end_date)
+    key = hashlib.sha1(json.dumps([ANALYTICS_CACHE_FORMAT, params], sort_keys=True).encode('utf-8')).hexdigest()
+    
+    covered = sorted(
+        (date, version) for date, version in load_date_versions().items()
+        if (not start_date or date >= start_date) and (not end_date or date <= end_date)
+    )
+    signature = hashlib.sha1(json.dumps(covered).encode('utf-8')).hexdigest()
+    
+    # Use IST date (UTC + 5.5 hours)
+    today = (datetime.utcnow() + timedelta(hours=5, minutes=30)).strftime('%Y-%m-%d')
+    closed = bool(end_date) and end_date < today
     return {
-        'total_records': total,
-        'present': status_counts['Present'],
-        'absent': status_counts['Absent'],
-        'proxy': status_counts['Proxy'],
-        'bunk': status_counts['Bunk'],
-        'attendance_percentage': round(attendance_pct, 2),
-        'unique_students': len(unique_students),
-        'unique_dates': len(unique_dates)
+        'key': key,
+        'signature': signature,
+        'expires_at': None if closed else int(time.time()) + ANALYTICS_CACHE_TTL_SECONDS,
+        'leased': False
     }
 
+def read_cached_response(entry):
+    """
+    Return the cached response body of the entry, or None once this
+    invocation holds the lease to compute it. While another invocation holds
+    the lease, wait for its result for up to ANALYTICS_CACHE_WAIT_MS.
+    """
+    body = read_memory_cache(entry)
+    if body is not None:
+        return body
+    body = read_shared_cache(entry)
+    if body is not None:
+        return body
+    
+    deadline = time.monotonic() + ANALYTICS_CACHE_WAIT_MS / 1000
+    while not acquire_cache_lease(entry):
+        if time.monotonic() >= deadline:
+            print(f"Gave up waiting for analytics cache entry {entry['key']}, computing it")
+            return None
+        time.sleep(ANALYTICS_CACHE_POLL_SECONDS)
+        body = read_shared_cache(entry)
+        if body is not None:
+            return body
+    return None
+
+def write_cached_response(entry, body):
+    """Store a computed response body in both tiers."""
+    store_memory_cache(entry, body)
+    metadata = {'signature': entry['signature'], 'expires-at': str(entry['expires_at'] or '')}
+    try:
+        get_s3_client().put_object(
+            Bucket=ANALYTICS_BUCKET_NAME,
+            Key=f"{ANALYTICS_CACHE_PREFIX}{entry['key']}.json.gz",
+            Body=gzip.compress(body.encode('utf-8')),
+            ContentType='application/gzip',
+            Metadata=metadata
+        )
+    except ClientError as e:
+        # The container tier still serves it; other containers compute their own
+        print(f"Error writing analytics cache entry: {str(e)}")
+
+def entry_valid(entry, signature, expires_at):
+    """Whether a stored entry matches the current data and has not expired."""
+    return signature == entry['signature'] and (expires_at is None or expires_at > time.time())
+
+def read_memory_cache(entry):
+    """Body from the container tier, moving it to the most recently used end."""
+    cached = _response_cache.get(entry['key'])
+    if cached is None:
+        return None
+    signature, expires_at, body = cached
+    if not entry_valid(entry, signature, expires_at):
+        drop_memory_cache(entry['key'])
+        return None
+    _response_cache.move_to_end(entry['key'])
+    return body
+
+def store_memory_cache(entry, body):
+    """Add a body to the container tier, evicting least recently used entries."""
+    global _response_cache_bytes
+    if len(body) > ANALYTICS_CACHE_MAX_BYTES:
+        return
+    drop_memory_cache(entry['key'])
+    _response_cache[entry['key']] = (entry['signature'], entry['expires_at'], body)
+    _response_cache_bytes += len(body)
+    while len(_response_cache) > ANALYTICS_CACHE_ENTRIES or _response_cache_bytes > ANALYTICS_CACHE_MAX_BYTES:
+        _, (_, _, evicted) = _response_cache.popitem(last=False)
+        _response_cache_bytes -= len(evicted)
+
+def drop_memory_cache(key):
+    """Remove an entry from the container tier."""
+    global _response_cache_bytes
+    cached = _response_cache.pop(key, None)
+    if cached is not None:
+        _response_cache_bytes -= len(cached[2])
+
+def read_shared_cache(entry):
+    """Body from the S3 tier (also copied to the container tier), or None."""
+    try:
+        response = get_s3_client().get_object(
+            Bucket=ANALYTICS_BUCKET_NAME, Key=f"{ANALYTICS_CACHE_PREFIX}{entry['key']}.json.gz")
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+            print(f"Error reading analytics cache entry: {str(e)}")
+        return None
+    metadata = response.get('Metadata') or {}
+    expires_at = metadata.get('expires-at')
+    if not entry_valid(entry, metadata.get('signature'), int(expires_at) if expires_at else None):
+        return None
+    body = gzip.decompress(response['Body'].read()).decode('utf-8')
+    # Keep the stored expiry: the entry may be older than this request
+    store_memory_cache(dict(entry, expires_at=int(expires_at) if expires_at else None), body)
+    return body
+
+def acquire_cache_lease(entry):
+    """
+    Take the lease to compute an entry (an Analytics_State item), so that
+    concurrent misses of the same query run one computation. Leases of
+    invocations that died expire after ANALYTICS_CACHE_LEASE_SECONDS.
+    """
+    now = int(time.time())
+    try:
+        get_table(ANALYTICS_STATE_TABLE).put_item(
+            Item={'state_key': f"lease#{entry['key']}", 'lease_expires_at': now + ANALYTICS_CACHE_LEASE_SECONDS},
+            ConditionExpression='attribute_not_exists(state_key) OR lease_expires_at < :now',
+            ExpressionAttributeValues={':now': now}
+        )
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+            return False
+        # Without the lease this invocation computes like any other miss
+        print(f"Error acquiring analytics cache lease: {str(e)}")
+        return True
+    entry['leased'] = True
+    return True
+
+def release_cache_lease(entry):
+    """Release the lease taken by acquire_cache_lease, if any."""
+    if not entry['leased']:
+        return
+    try:
+        get_table(ANALYTICS_STATE_TABLE).delete_item(Key={'state_key': f"lease#{entry['key']}"})
+    except ClientError as e:
+        print(f"Error releasing analytics cache lease: {str(e)}")
+    entry['leased'] = False
+
+def get_dynamodb():
+    """Return the DynamoDB resource, creating it on first use."""
+    global _dynamodb
+    if _dynamodb is None:
+        import boto3
+        _dynamodb = boto3.resource('dynamodb')
+    return _dynamodb
+
+def get_table(table_name):
+    """Return a DynamoDB Table, creating the resource on first use."""
+    return get_dynamodb().Table(table_name)
+
+def get_s3_client():
+    """Return the S3 client, creating it on first use."""
+    global _s3_client
+    if _s3_client is None:
+        import boto3
+        _s3_client = boto3.client('s3')
+    return _s3_client
@@ -0,0 +1,183 @@
+"""
+Lambda function to list attendance defaulters (students below a threshold).
+Reads the per-student counters of Student_Attendance_Summary maintained by
+process_attendance_upload, so no Final_Attendance records are scanned.
+"""
+
+import json
+import heapq
+import os
+from decimal import Decimal
+from botocore.exceptions import ClientError
+
+# AWS clients are created on first use, keeping module import (cold start) cheap
+_dynamodb = None
+STUDENT_SUMMARY_TABLE = os.environ.get('STUDENT_SUMMARY_TABLE', 'Student_Attendance_Summary')
+
+DEFAULTER_THRESHOLD = float(os.environ.get('DEFAULTER_THRESHOLD', '75'))
+DEFAULTER_LIMIT = int(os.environ.get('DEFAULTER_LIMIT', '10'))
+DEFAULTER_MAX_LIMIT = 100
+
+class DecimalEncoder(json.JSONEncoder):
+    """Helper class to convert Decimal to int/float for JSON serialization."""
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return int(obj) if obj % 1 == 0 else float(obj)
+        return super(DecimalEncoder, self).default(obj)
+
+def lambda_handler(event, context):
+    """
+    Return the bottom-N students below the attendance threshold, per division.
+
+    Query parameters:
+    - department, year, division: Filter (all three select one division via the class index)
+    - subject: Lecture name; percentages use that subject's counters instead of the overall ones
+    - threshold: Attendance percentage below which a student is a defaulter (default: 75)
+    - limit: Students returned per division, lowest percentage first (default: 10, max 100)
+    - min_total: Ignore students with fewer lectures than this (default: 1)
+    """
+    headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Headers': 'Content-Type',
+        'Access-Control-Allow-Methods': 'GET, OPTIONS'
+    }
+
+    try:
+        query_params = event.get('queryStringParameters') or {}
+        department = query_params.get('department')
+        year = query_params.get('year')
+        division = query_params.get('division')
+        subject = query_params.get('subject')
+
+        try:
+            threshold = float(query_params.get('threshold') or DEFAULTER_THRESHOLD)
+            limit = min(int(query_params.get('limit') or DEFAULTER_LIMIT), DEFAULTER_MAX_LIMIT)
+            min_total = int(query_params.get('min_total') or 1)
+        except ValueError:
+            return {
+                'statusCode': 400,
+                'headers': headers,
+                'body': json.dumps({
+                    'error': 'threshold, limit and min_total must be numbers'
+                })
+            }
+
+        present_field = f"present#{subject}" if subject else 'present'
+        total_field = f"total#{subject}" if subject else 'total'
+
+        # Bounded max-heap per division: keeps the `limit` lowest percentages
+        heaps = {}
+        counts = {}
+        for item in fetch_summaries(department, year, division):
+            division_key = (item.get('department'), item.get('year'), item.get('division'))
+            division_counts = counts.setdefault(division_key, {'students': 0, 'defaulters': 0})
+            division_counts['students'] += 1
+
+            total = int(item.get(total_field) or 0)
+            if total < max(min_total, 1):
+                continue
+            present = int(item.get(present_field) or 0)
+            percentage = present / total * 100
+            if percentage >= threshold:
+                continue
+
+            division_counts['defaulters'] += 1
+            heap = heaps.setdefault(division_key, [])
+            entry = (-percentage, item['student_id'], {
+                'student_id': item['student_id'],
+                'name': item.get('name'),
+                'present': present,
+                'total': total,
+                'attendance_percentage': round(percentage, 2)
+            })
+            if len(heap) < limit:
+                heapq.heappush(heap, entry)
+            elif limit:
+                heapq.heappushpop(heap, entry)
+
+        divisions = []
+        for division_key in sorted(counts, key=lambda key: tuple(str(part) for part in key)):
+            ranked = sorted(heaps.get(division_key, []), key=lambda entry: (-entry[0], entry[1]))
+            defaulters = [student for _, _, student in ranked]
+            divisions.append({
+                'department': division_key[0],
+                'year': division_key[1],
+                'division': division_key[2],
+                'students_count': counts[division_key]['students'],
+                'defaulters_count': counts[division_key]['defaulters'],
+                'defaulters': defaulters
+            })
+
+        return {
+            'statusCode': 200,
+            'headers': headers,
+            'body': json.dumps({
+                'threshold': threshold,
+                'subject': subject,
+                'limit': limit,
+                'divisions': divisions
+            }, cls=DecimalEncoder)
+        }
+
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': headers,
+            'body': json.dumps({
+                'error': f'Error retrieving defaulters: {str(e)}'
+            })
+        }
+
+def fetch_summaries(department, year, division):
+    """
+    Yield Student_Attendance_Summary items: one division through the
+    class-index, otherwise a (filtered) scan of the one-item-per-student table.
+    """
+    table = get_table(STUDENT_SUMMARY_TABLE)
+    if department and year and division:
+        request = {
+            'IndexName': 'class-index',
+            'KeyConditionExpression': 'class_key = :class_key',
+            'ExpressionAttributeValues': {':class_key': f"{department}#{year}#{division}"}
+        }
+        read = table.query
+    else:
+        names = {}
+        values = {}
+        conditions = []
+        for field, value in (('department', department), ('year', year), ('division', division)):
+            if value:
+                names[f'#{field}'] = field
+                values[f':{field}'] = value
+                conditions.append(f'#{field} = :{field}')
+        request = {}
+        if conditions:
+            request = {
+                'FilterExpression': ' AND '.join(conditions),
+                'ExpressionAttributeNames': names,
+                'ExpressionAttributeValues': values
+            }
+        read = table.scan
+
+    last_evaluated_key = None
+    while True:
+        if last_evaluated_key:
+            request['ExclusiveStartKey'] = last_evaluated_key
+        try:
+            response = read(**request)
+        except ClientError as e:
+            print(f"Error reading attendance summaries: {str(e)}")
+            raise
+        yield from response.get('Items', [])
+
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if not last_evaluated_key:
+            break
+
+def get_table(table_name):
+    """Return a DynamoDB Table, creating the resource on first use."""
+    global _dynamodb
+    if _dynamodb is None:
+        import boto3
+        _dynamodb = boto3.resource('dynamodb')
+    return _dynamodb.Table(table_name)
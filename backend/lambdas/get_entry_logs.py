@@ -1,19 +1,27 @@
 """
 Lambda function to retrieve entry logs from Entry_Log table.
 Supports filtering by date range and student information.
+Historical dates that have been moved out of Entry_Log by the
+archive_entry_logs job are transparently read back from S3.
 """
 
 import json
-import boto3
+import gzip
 import os
 from decimal import Decimal
 from botocore.exceptions import ClientError
 from datetime import datetime, timedelta
 
-# Initialize DynamoDB client
-dynamodb = boto3.resource('dynamodb')
-entry_log_table = dynamodb.Table(os.environ.get('ENTRY_LOG_TABLE', 'Entry_Log'))
-student_master_table = dynamodb.Table(os.environ.get('STUDENT_MASTER_TABLE', 'Student_Master'))
+# AWS clients are created on first use, keeping module import (cold start) cheap
+_s3_client = None
+_dynamodb = None
+ENTRY_LOG_TABLE = os.environ.get('ENTRY_LOG_TABLE', 'Entry_Log')
+STUDENT_MASTER_TABLE = os.environ.get('STUDENT_MASTER_TABLE', 'Student_Master')
+
+# Must match the settings of the archive_entry_logs job
+ARCHIVE_BUCKET_NAME = os.environ.get('ARCHIVE_BUCKET_NAME', os.environ.get('UPLOAD_BUCKET_NAME', 'attendance-uploads-default'))
+ARCHIVE_PREFIX = os.environ.get('ENTRY_LOG_ARCHIVE_PREFIX', 'entry-logs/')
+RETENTION_DAYS = int(os.environ.get('ENTRY_LOG_RETENTION_DAYS', '30'))
 
 class DecimalEncoder(json.JSONEncoder):
     """Helper class to convert Decimal to float for JSON serialization."""
@@ -67,15 +75,23 @@ def lambda_handler(event, context):
         
         print(f"Date range: {start_date} to {end_date}")
         
-        # Fetch entry logs
-        entry_logs = fetch_entry_logs_by_date_range(start_date, end_date)
-        print(f"Fetched {len(entry_logs)} entry logs from DynamoDB")
-        
         # Fetch all students for filtering and enrichment
         all_students = fetch_all_students()
         print(f"Fetched {len(all_students)} students from Student_Master")
         student_info_map = {s['student_id']: s for s in all_students}
         
+        def matches_filters(log):
+            student_info = student_info_map.get(log.get('student_id'))
+            if not student_info:
+                return not (year or department or division)
+            return ((not year or student_info.get('year') == year) and
+                    (not department or student_info.get('department') == department) and
+                    (not division or student_info.get('division') == division))
+        
+        # Fetch entry logs
+        entry_logs = fetch_entry_logs_by_date_range(start_date, end_date, limit, matches_filters)
+        print(f"Fetched {len(entry_logs)} entry logs")
+        
         # Enrich entry logs with student information and apply filters
         enriched_logs = []
         logs_without_student = 0
@@ -169,80 +185,98 @@ def lambda_handler(event, context):
             })
         }
 
-def fetch_entry_logs_by_date_range(start_date, end_date):
-    """Fetch entry logs for a date range with pagination support."""
+def fetch_entry_logs_by_date_range(start_date, end_date, limit, matches_filters):
+    """
+    Fetch the entry logs of a date range that pass `matches_filters`, newest
+    day first, until at least `limit` are collected. Days inside the
+    retention window are read with one paginated date-index query each;
+    older days come from the S3 archive (or from Entry_Log for a day that
+    was never archived). Each day is read completely and every later day is
+    older, so the most recent logs are complete when reading stops.
+    """
+    # Use IST date (UTC + 5.5 hours) like the archive job
+    ist_now = datetime.utcnow() + timedelta(hours=5, minutes=30)
+    hot_cutoff = (ist_now - timedelta(days=RETENTION_DAYS)).strftime('%Y-%m-%d')
+    # No log is dated after today, so a range into the future costs no queries
+    last_date = min(end_date, ist_now.strftime('%Y-%m-%d'))
+    
+    entry_logs = []
+    queried_days = 0
+    archived_days = 0
+    for date in reversed(list(iterate_dates(start_date, last_date))):
+        if len(entry_logs) >= limit:
+            break
+        day_logs = None
+        if date < hot_cutoff:
+            day_logs = stream_archived_entry_logs(date)
+            archived_days += day_logs is not None
+        if day_logs is None:
+            day_logs = query_entry_logs_for_date(date)
+            queried_days += 1
+        entry_logs.extend(log for log in day_logs if matches_filters(log))
+    
+    print(f"Read {len(entry_logs)} entry logs from {queried_days} date-index queries "
+          f"and {archived_days} archived days ({start_date} to {last_date})")
+    return entry_logs
+
+def query_entry_logs_for_date(date):
+    """Fetch all entry logs of one date from Entry_Log via the date-index, page by page."""
+    logs = []
+    last_evaluated_key = None
     try:
-        all_logs = []
-        last_evaluated_key = None
-        
-        # Scan with pagination to get all records
         while True:
+            query_kwargs = {
+                'IndexName': 'date-index',
+                'KeyConditionExpression': '#date = :date_val',
+                'ExpressionAttributeNames': {'#date': 'date'},
+                'ExpressionAttributeValues': {':date_val': date}
+            }
             if last_evaluated_key:
-                response = entry_log_table.scan(ExclusiveStartKey=last_evaluated_key)
-            else:
-                response = entry_log_table.scan()
+                query_kwargs['ExclusiveStartKey'] = last_evaluated_key
             
-            items = response.get('Items', [])
-            all_logs.extend(items)
+            response = get_table(ENTRY_LOG_TABLE).query(**query_kwargs)
+            logs.extend(response.get('Items', []))
             
-            # Check if there are more pages
             last_evaluated_key = response.get('LastEvaluatedKey')
             if not last_evaluated_key:
-                break
-        
-        print(f"Total logs scanned: {len(all_logs)}")
-        
-        # Filter logs in date range
-        filtered_logs = []
-        logs_without_date = []
-        
-        for log in all_logs:
-            log_date = log.get('date')
-            
-            # If log has a valid date, check if it's in range
-            if log_date:
-                try:
-                    if start_date <= log_date <= end_date:
-                        filtered_logs.append(log)
-                except Exception as e:
-                    print(f"Error comparing date {log_date}: {e}")
-                    # Include logs with invalid date format to avoid data loss
-                    logs_without_date.append(log)
-            else:
-                # Log doesn't have a date field - try to extract from timestamp or created_at
-                timestamp = log.get('timestamp') or log.get('created_at')
-                if timestamp:
-                    try:
-                        # Extract date from timestamp (format: YYYY-MM-DDTHH:MM:SSZ)
-                        extracted_date = timestamp[:10]  # Get YYYY-MM-DD part
-                        if start_date <= extracted_date <= end_date:
-                            filtered_logs.append(log)
-                        print(f"Log {log.get('log_id')} missing 'date' field, extracted from timestamp: {extracted_date}")
-                    except Exception as e:
-                        print(f"Error extracting date from timestamp {timestamp}: {e}")
-                        logs_without_date.append(log)
-                else:
-                    print(f"Warning: Log {log.get('log_id')} has no date, timestamp, or created_at field")
-                    logs_without_date.append(log)
-        
-        # Include logs without dates in the result (to avoid data loss)
-        # These will appear as "Unknown" date in frontend
-        if logs_without_date:
-            print(f"Warning: {len(logs_without_date)} logs don't have valid dates, including them anyway")
-            filtered_logs.extend(logs_without_date)
-        
-        print(f"Filtered logs for date range {start_date} to {end_date}: {len(filtered_logs)} (including {len(logs_without_date)} without valid dates)")
-        return filtered_logs
+                return logs
     except ClientError as e:
-        print(f"Error fetching entry logs by date range: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
-        return []
-    except Exception as e:
-        print(f"Unexpected error in fetch_entry_logs_by_date_range: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
-        return []
+        print(f"Error fetching entry logs for {date}: {str(e)}")
+        raise
+
+def iterate_dates(start_date, end_date):
+    """Yield every date (YYYY-MM-DD) from start_date to end_date inclusive."""
+    try:
+        current = datetime.strptime(start_date, '%Y-%m-%d')
+        last = datetime.strptime(end_date, '%Y-%m-%d')
+    except ValueError as e:
+        print(f"Invalid date range {start_date} to {end_date}: {e}")
+        return
+    while current <= last:
+        yield current.strftime('%Y-%m-%d')
+        current += timedelta(days=1)
+
+def stream_archived_entry_logs(date):
+    """
+    Stream archived entry logs for one date from S3, or return None if the
+    date has no archive. The gzip body is decompressed and parsed line by
+    line, so memory use does not grow with the size of the archived day.
+    """
+    key = f"{ARCHIVE_PREFIX}date={date}/entry_logs.jsonl.gz"
+    try:
+        response = get_s3_client().get_object(Bucket=ARCHIVE_BUCKET_NAME, Key=key)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+            print(f"Error reading archived entry logs for {date}: {str(e)}")
+        return None
+    return parse_archived_entry_logs(response['Body'])
+
+def parse_archived_entry_logs(body):
+    """Yield the logs of a gzip JSON-lines archive body."""
+    with gzip.GzipFile(fileobj=body, mode='rb') as archive:
+        for line in archive:
+            if line.strip():
+                yield json.loads(line)
 
 def fetch_all_students():
     """Fetch all students from Student_Master table with pagination."""
@@ -253,9 +287,9 @@ def fetch_all_students():
         # Scan with pagination to get all students
         while True:
             if last_evaluated_key:
-                response = student_master_table.scan(ExclusiveStartKey=last_evaluated_key)
+                response = get_table(STUDENT_MASTER_TABLE).scan(ExclusiveStartKey=last_evaluated_key)
             else:
-                response = student_master_table.scan()
+                response = get_table(STUDENT_MASTER_TABLE).scan()
             
             items = response.get('Items', [])
             all_students.extend(items)
@@ -272,3 +306,18 @@ def fetch_all_students():
         print(traceback.format_exc())
         return []
 
+def get_table(table_name):
+    """Return a DynamoDB Table, creating the resource on first use."""
+    global _dynamodb
+    if _dynamodb is None:
+        import boto3
+        _dynamodb = boto3.resource('dynamodb')
+    return _dynamodb.Table(table_name)
+
+def get_s3_client():
+    """Return the S3 client, creating it on first use."""
+    global _s3_client
+    if _s3_client is None:
+        import boto3
+        _s3_client = boto3.client('s3')
+    return _s3_client
@@ -0,0 +1,136 @@
+"""
+Lambda function to retrieve real-time entry statistics.
+Reads the per-day counters maintained by handle_entry_log from the
+Live_Stats table, without touching the Entry_Log table.
+"""
+
+import json
+import os
+from decimal import Decimal
+from botocore.exceptions import ClientError
+from datetime import datetime, timedelta
+
+# AWS clients are created on first use, keeping module import (cold start) cheap
+_dynamodb = None
+LIVE_STATS_TABLE = os.environ.get('LIVE_STATS_TABLE', 'Live_Stats')
+
+class DecimalEncoder(json.JSONEncoder):
+    """Helper class to convert Decimal to int/float for JSON serialization."""
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return int(obj) if obj % 1 == 0 else float(obj)
+        return super(DecimalEncoder, self).default(obj)
+
+def lambda_handler(event, context):
+    """
+    Retrieve live counters for a day.
+
+    Query parameters:
+    - date: YYYY-MM-DD (optional, defaults to today in IST)
+    - department: Return counters for one department only (optional)
+    """
+    headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Headers': 'Content-Type',
+        'Access-Control-Allow-Methods': 'GET, OPTIONS'
+    }
+
+    try:
+        query_params = event.get('queryStringParameters') or {}
+        date = query_params.get('date')
+        department = query_params.get('department')
+
+        if not date:
+            # Use IST date (UTC + 5.5 hours)
+            utc_now = datetime.utcnow()
+            ist_now = utc_now + timedelta(hours=5, minutes=30)
+            date = ist_now.strftime('%Y-%m-%d')
+
+        if department:
+            counter = get_counter(f"{date}#DEPT#{department}")
+            body = {
+                'date': date,
+                'department': department,
+                **format_counter(counter)
+            }
+        else:
+            day_counter = get_counter(f"{date}#ALL")
+            departments = sorted(day_counter.get('departments') or [])
+            department_counters = get_counters([f"{date}#DEPT#{dept}" for dept in departments])
+
+            body = {
+                'date': date,
+                **format_counter(day_counter),
+                'departments': [
+                    {
+                        'department': dept,
+                        **format_counter(department_counters.get(f"{date}#DEPT#{dept}", {}))
+                    }
+                    for dept in departments
+                ]
+            }
+
+        return {
+            'statusCode': 200,
+            'headers': headers,
+            'body': json.dumps(body, cls=DecimalEncoder)
+        }
+
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': headers,
+            'body': json.dumps({
+                'error': f'Error retrieving live stats: {str(e)}'
+            })
+        }
+
+def get_counter(stat_key):
+    """Fetch a single counter item, or an empty dict if it does not exist yet."""
+    try:
+        response = get_table(LIVE_STATS_TABLE).get_item(Key={'stat_key': stat_key})
+        return response.get('Item', {})
+    except ClientError as e:
+        print(f"Error fetching live counter {stat_key}: {str(e)}")
+        return {}
+
+def get_counters(stat_keys):
+    """Fetch several counter items with BatchGetItem (100 keys per request)."""
+    counters = {}
+    for i in range(0, len(stat_keys), 100):
+        request = {LIVE_STATS_TABLE: {'Keys': [{'stat_key': key} for key in stat_keys[i:i + 100]]}}
+        try:
+            while request:
+                response = get_dynamodb().batch_get_item(RequestItems=request)
+                for item in response.get('Responses', {}).get(LIVE_STATS_TABLE, []):
+                    counters[item['stat_key']] = item
+                request = response.get('UnprocessedKeys') or None
+        except ClientError as e:
+            print(f"Error fetching live counters: {str(e)}")
+    return counters
+
+def format_counter(counter):
+    """Convert a counter item into the response shape."""
+    hourly = []
+    for hour in range(24):
+        count = counter.get(f"hour_{hour:02d}")
+        if count:
+            hourly.append({'hour': f"{hour:02d}:00", 'count': count})
+
+    return {
+        'total_logs': counter.get('total_taps', 0),
+        'unique_students': counter.get('unique_students', 0),
+        'hourly': hourly
+    }
+
+def get_dynamodb():
+    """Return the DynamoDB resource, creating it on first use."""
+    global _dynamodb
+    if _dynamodb is None:
+        import boto3
+        _dynamodb = boto3.resource('dynamodb')
+    return _dynamodb
+
+def get_table(table_name):
+    """Return a DynamoDB Table, creating the resource on first use."""
+    return get_dynamodb().Table(table_name)
@@ -4,16 +4,15 @@ Supports filtering by date, year, department, division, and status.
 """
 
 import json
-import boto3
 import os
 from decimal import Decimal
 from botocore.exceptions import ClientError
 from datetime import datetime, timedelta
 
-# Initialize DynamoDB client
-dynamodb = boto3.resource('dynamodb')
-final_attendance_table = dynamodb.Table(os.environ.get('FINAL_ATTENDANCE_TABLE', 'Final_Attendance'))
-student_master_table = dynamodb.Table(os.environ.get('STUDENT_MASTER_TABLE', 'Student_Master'))
+# AWS clients are created on first use, keeping module import (cold start) cheap
+_dynamodb = None
+FINAL_ATTENDANCE_TABLE = os.environ.get('FINAL_ATTENDANCE_TABLE', 'Final_Attendance')
+STUDENT_MASTER_TABLE = os.environ.get('STUDENT_MASTER_TABLE', 'Student_Master')
 
 class DecimalEncoder(json.JSONEncoder):
     """Helper class to convert Decimal to float for JSON serialization."""
@@ -62,7 +61,7 @@ def lambda_handler(event, context):
             # This allows users to see all uploaded data
             print("No date filter specified, fetching ALL attendance records")
             try:
-                response = final_attendance_table.scan()
+                response = get_table(FINAL_ATTENDANCE_TABLE).scan()
                 attendance_records = response.get('Items', [])
                 print(f"Found {len(attendance_records)} total records (no date filter)")
             except ClientError as e:
@@ -138,7 +137,7 @@ def lambda_handler(event, context):
 def fetch_attendance_by_date(date):
     """Fetch attendance records for a specific date."""
     try:
-        response = final_attendance_table.scan(
+        response = get_table(FINAL_ATTENDANCE_TABLE).scan(
             FilterExpression='#date = :date_val',
             ExpressionAttributeNames={'#date': 'date'},
             ExpressionAttributeValues={':date_val': date}
@@ -152,7 +151,7 @@ def fetch_attendance_by_date_range(start_date, end_date):
     """Fetch attendance records for a date range."""
     try:
         # Scan all records and filter by date range
-        response = final_attendance_table.scan()
+        response = get_table(FINAL_ATTENDANCE_TABLE).scan()
         all_records = response.get('Items', [])
         
         # Filter records in date range
@@ -170,7 +169,7 @@ def fetch_attendance_by_date_range(start_date, end_date):
 def fetch_all_students():
     """Fetch all students from Student_Master table."""
     try:
-        response = student_master_table.scan()
+        response = get_table(STUDENT_MASTER_TABLE).scan()
         return response.get('Items', [])
     except ClientError as e:
         print(f"Error fetching students: {str(e)}")
@@ -214,3 +213,10 @@ def calculate_summary(records):
         'attendance_percentage': round(attendance_percentage, 2)
     }
 
+def get_table(table_name):
+    """Return a DynamoDB Table, creating the resource on first use."""
+    global _dynamodb
+    if _dynamodb is None:
+        import boto3
+        _dynamodb = boto3.resource('dynamodb')
+    return _dynamodb.Table(table_name)
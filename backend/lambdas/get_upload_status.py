@@ -0,0 +1,119 @@
+"""
+Lambda function to report the processing status of an uploaded attendance file.
+Reads the Processed_Uploads ledger written by process_attendance_upload,
+so the Upload page can poll progress of large, chunked uploads.
+"""
+
+import json
+import os
+from decimal import Decimal
+from botocore.exceptions import ClientError
+
+# AWS clients are created on first use, keeping module import (cold start) cheap
+_dynamodb = None
+PROCESSED_UPLOADS_TABLE = os.environ.get('PROCESSED_UPLOADS_TABLE', 'Processed_Uploads')
+
+class DecimalEncoder(json.JSONEncoder):
+    """Helper class to convert Decimal to int/float for JSON serialization."""
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return int(obj) if obj % 1 == 0 else float(obj)
+        return super(DecimalEncoder, self).default(obj)
+
+def lambda_handler(event, context):
+    """
+    Retrieve the processing status of an upload.
+
+    Query parameters:
+    - file_name: S3 key returned by generate_presigned_url (required)
+
+    Status values: PENDING (not picked up yet), PROCESSING, COMPLETED,
+    FAILED, DUPLICATE (identical content was already processed),
+    REJECTED (unusable file, e.g. wrong template; see error).
+    """
+    headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Headers': 'Content-Type',
+        'Access-Control-Allow-Methods': 'GET, OPTIONS'
+    }
+
+    try:
+        query_params = event.get('queryStringParameters') or {}
+        file_name = query_params.get('file_name')
+
+        if not file_name:
+            return {
+                'statusCode': 400,
+                'headers': headers,
+                'body': json.dumps({
+                    'error': 'Missing required query parameter: file_name'
+                })
+            }
+
+        try:
+            response = get_table(PROCESSED_UPLOADS_TABLE).query(
+                IndexName='file-name-index',
+                KeyConditionExpression='file_name = :file_name',
+                ExpressionAttributeValues={':file_name': file_name}
+            )
+            items = response.get('Items', [])
+        except ClientError as e:
+            print(f"Error fetching upload status for {file_name}: {str(e)}")
+            raise
+
+        if not items:
+            body = {'file_name': file_name, 'status': 'PENDING'}
+        else:
+            # The real outcome beats a DUPLICATE marker, then the latest attempt
+            # wins if the same key was processed more than once
+            item = max(items, key=lambda i: (i.get('status') != 'DUPLICATE',
+                                             i.get('started_at') or i.get('finished_at') or ''))
+            chunks_total = item.get('chunks_total') or 0
+            chunks_committed = item.get('chunks_committed') or 0
+            sheets_total = item.get('sheets_total') or 0
+            sheets_completed = item.get('sheets_completed') or 0
+            if sheets_total:
+                # Multi-sheet workbook: progress is counted in completed sheets
+                progress = round(sheets_completed / sheets_total * 100, 2)
+            else:
+                progress = round(chunks_committed / chunks_total * 100, 2) if chunks_total else None
+            body = {
+                'file_name': file_name,
+                'status': item.get('status'),
+                'date': item.get('date'),
+                'lecture': item.get('lecture'),
+                'rows_total': item.get('rows_total'),
+                'chunks_total': chunks_total,
+                'chunks_committed': chunks_committed,
+                'sheets_total': sheets_total or None,
+                'sheets_completed': sheets_completed if sheets_total else None,
+                'progress_percentage': progress,
+                'records_processed': item.get('records_processed'),
+                'error': item.get('error_message'),
+                'duplicate_of': item.get('duplicate_of'),
+                'started_at': item.get('started_at'),
+                'finished_at': item.get('finished_at')
+            }
+
+        return {
+            'statusCode': 200,
+            'headers': headers,
+            'body': json.dumps(body, cls=DecimalEncoder)
+        }
+
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': headers,
+            'body': json.dumps({
+                'error': f'Error retrieving upload status: {str(e)}'
+            })
+        }
+
+def get_table(table_name):
+    """Return a DynamoDB Table, creating the resource on first use."""
+    global _dynamodb
+    if _dynamodb is None:
+        import boto3
+        _dynamodb = boto3.resource('dynamodb')
+    return _dynamodb.Table(table_name)
@@ -2,19 +2,32 @@
 Lambda function to handle IoT entry logs from ESP32 RFID scanner.
 Receives POST requests with RFID UID, timestamp, and date.
 Validates and stores entry logs in DynamoDB.
+Maintains real-time per-day and per-department counters in Live_Stats,
+plus arrival-time histograms of each student's first tap of the day.
 """
 
 import json
-import boto3
 import os
-from datetime import datetime
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
 from decimal import Decimal
 from botocore.exceptions import ClientError
 
-# Initialize DynamoDB client
-dynamodb = boto3.resource('dynamodb')
-entry_log_table = dynamodb.Table(os.environ.get('ENTRY_LOG_TABLE', 'Entry_Log'))
-student_master_table = dynamodb.Table(os.environ.get('STUDENT_MASTER_TABLE', 'Student_Master'))
+# AWS clients are created on first use, keeping module import (cold start) cheap
+_dynamodb = None
+ENTRY_LOG_TABLE = os.environ.get('ENTRY_LOG_TABLE', 'Entry_Log')
+STUDENT_MASTER_TABLE = os.environ.get('STUDENT_MASTER_TABLE', 'Student_Master')
+LIVE_STATS_TABLE = os.environ.get('LIVE_STATS_TABLE', 'Live_Stats')
+
+# Presence markers only need to outlive the day they belong to
+PRESENCE_TTL_DAYS = int(os.environ.get('LIVE_STATS_PRESENCE_TTL_DAYS', '2'))
+
+# Arrival times are binned per minute relative to the first lecture (IST HH:MM);
+# offsets outside the range are clamped into its first or last bin
+ARRIVAL_REFERENCE_TIME = os.environ.get('ARRIVAL_REFERENCE_TIME', '09:00')
+ARRIVAL_MIN_MINUTES = -180
+ARRIVAL_MAX_MINUTES = 600
 
 def lambda_handler(event, context):
     """
@@ -56,6 +69,10 @@ def lambda_handler(event, context):
         
         print(f"DEBUG: Parsed body: {json.dumps(body)}")
         
+        # Batched taps (e.g. a device flushing its offline buffer)
+        if isinstance(body.get('entries'), list):
+            return handle_entry_batch(body['entries'])
+        
         # Extract required fields
         rfid_uid = body.get('rfid_uid', '').strip() if body.get('rfid_uid') else ''
         timestamp = body.get('timestamp', '')
@@ -79,7 +96,7 @@ def lambda_handler(event, context):
         
         # Verify student exists in Student_Master
         try:
-            response = student_master_table.scan(
+            response = get_table(STUDENT_MASTER_TABLE).scan(
                 FilterExpression='rfid_uid = :uid',
                 ExpressionAttributeValues={':uid': rfid_uid}
             )
@@ -128,7 +145,10 @@ def lambda_handler(event, context):
         
         # Store in DynamoDB
         try:
-            entry_log_table.put_item(Item=entry_log_item)
+            # A re-sent tap (device retry) has the same log_id and is not counted again
+            duplicate = not store_entry_log(entry_log_item)
+            if not duplicate:
+                update_live_counters([(entry_log_item, student)])
             
             return {
                 'statusCode': 200,
@@ -138,8 +158,9 @@ def lambda_handler(event, context):
                     'Access-Control-Allow-Methods': 'POST, OPTIONS'
                 },
                 'body': json.dumps({
-                    'message': 'Entry log recorded successfully',
+                    'message': 'Entry log already recorded' if duplicate else 'Entry log recorded successfully',
                     'log_id': log_id,
+                    'duplicate': duplicate,
                     'student_id': student_id,
                     'student_name': student.get('name', 'Unknown')
                 })
@@ -184,3 +205,242 @@ def lambda_handler(event, context):
             })
         }
 
+
+def handle_entry_batch(entries):
+    """
+    Store a batch of entry logs and update the live counters once per batch.
+    Each entry has the same shape as a single request body.
+    
+    Results are reported per entry. Logs are written with a condition on
+    their log_id (student and timestamp), so after a failure the device can
+    re-send the whole batch: entries stored by the first attempt come back
+    as duplicates and are not counted twice.
+    """
+    headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Headers': 'Content-Type',
+        'Access-Control-Allow-Methods': 'POST, OPTIONS'
+    }
+    
+    stored = []
+    duplicates = []
+    rejected = []
+    failed = []
+    students_by_rfid = {}
+    
+    for entry in entries:
+        rfid_uid = str(entry.get('rfid_uid') or '').strip()
+        timestamp = entry.get('timestamp', '')
+        date = entry.get('date', '')
+        
+        if not rfid_uid or not timestamp or not date:
+            rejected.append({'entry': entry, 'error': 'Missing required fields'})
+            continue
+        
+        try:
+            # Look up each card once per batch
+            if rfid_uid not in students_by_rfid:
+                response = get_table(STUDENT_MASTER_TABLE).scan(
+                    FilterExpression='rfid_uid = :uid',
+                    ExpressionAttributeValues={':uid': rfid_uid}
+                )
+                items = response.get('Items', [])
+                students_by_rfid[rfid_uid] = items[0] if items else None
+            
+            student = students_by_rfid[rfid_uid]
+            if not student:
+                rejected.append({'entry': entry, 'error': f'Student with RFID UID {rfid_uid} not found in database'})
+                continue
+            
+            student_id = student['student_id']
+            entry_log_item = {
+                'log_id': f"{student_id}_{timestamp.replace(':', '-').replace('.', '-')}",
+                'rfid_uid': rfid_uid,
+                'student_id': student_id,
+                'timestamp': timestamp,
+                'date': date,
+                'created_at': datetime.utcnow().isoformat() + 'Z'
+            }
+            if store_entry_log(entry_log_item):
+                stored.append((entry_log_item, student))
+            else:
+                duplicates.append(entry_log_item['log_id'])
+        except ClientError as e:
+            print(f"Error storing entry log for {rfid_uid}: {str(e)}")
+            failed.append({'entry': entry, 'error': str(e)})
+    
+    update_live_counters(stored)
+    
+    # Failed entries can be retried by re-sending the batch
+    return {
+        'statusCode': 500 if failed else 200,
+        'headers': headers,
+        'body': json.dumps({
+            'message': f'{len(stored)} entry logs recorded successfully',
+            'stored': len(stored),
+            'log_ids': [log['log_id'] for log, _ in stored],
+            'duplicates': duplicates,
+            'rejected': rejected,
+            'failed': failed
+        })
+    }
+
+def store_entry_log(entry_log_item):
+    """
+    Write an entry log unless one with the same log_id exists.
+    Returns False for such a duplicate (a re-sent tap), which must not be
+    counted again.
+    """
+    try:
+        get_table(ENTRY_LOG_TABLE).put_item(
+            Item=entry_log_item,
+            ConditionExpression='attribute_not_exists(log_id)'
+        )
+        return True
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+            return False
+        raise
+
+def get_ist_hour(timestamp):
+    """Return the IST hour (00-23) of a UTC ISO timestamp, or None if unparseable."""
+    try:
+        utc_time = datetime.strptime(timestamp[:19], '%Y-%m-%dT%H:%M:%S')
+    except (TypeError, ValueError):
+        return None
+    ist_time = utc_time + timedelta(hours=5, minutes=30)
+    return ist_time.strftime('%H')
+
+def get_arrival_minutes(timestamp):
+    """
+    Minutes between ARRIVAL_REFERENCE_TIME and the IST time of a UTC ISO
+    timestamp (negative when early), clamped; None if unparseable.
+    """
+    try:
+        utc_time = datetime.strptime(timestamp[:19], '%Y-%m-%dT%H:%M:%S')
+    except (TypeError, ValueError):
+        return None
+    ist_time = utc_time + timedelta(hours=5, minutes=30)
+    reference = int(ARRIVAL_REFERENCE_TIME[:2]) * 60 + int(ARRIVAL_REFERENCE_TIME[3:5])
+    minutes = ist_time.hour * 60 + ist_time.minute - reference
+    return max(ARRIVAL_MIN_MINUTES, min(ARRIVAL_MAX_MINUTES, minutes))
+
+def record_first_tap(date, student_id, department, minutes):
+    """
+    Record a student's first tap of the day in one transaction: the presence
+    marker (conditional, so concurrent taps are counted once), the unique
+    student counters of the day and department, and the arrival bins.
+    Returns False if the student had already tapped in on that date. Either
+    all of these writes are applied or none, so a failure never leaves a
+    marker without its count.
+    """
+    table = LIVE_STATS_TABLE
+    one = {':one': {'N': '1'}}
+    items = [{
+        'Put': {
+            'TableName': table,
+            'Item': {
+                'stat_key': {'S': f"{date}#PRESENCE#{student_id}"},
+                'expires_at': {'N': str(int(time.time()) + PRESENCE_TTL_DAYS * 86400)}
+            },
+            'ConditionExpression': 'attribute_not_exists(stat_key)'
+        }
+    }]
+    for stat_key in (f"{date}#ALL", f"{date}#DEPT#{department}"):
+        items.append({'Update': {
+            'TableName': table,
+            'Key': {'stat_key': {'S': stat_key}},
+            'UpdateExpression': 'ADD unique_students :one',
+            'ExpressionAttributeValues': one
+        }})
+    if minutes is not None:
+        for stat_key in (f"{date}#ARRIVAL", f"{date}#ARRIVAL#DEPT#{department}"):
+            # Bin names such as m-5 need attribute name placeholders
+            items.append({'Update': {
+                'TableName': table,
+                'Key': {'stat_key': {'S': stat_key}},
+                'UpdateExpression': 'ADD #bin :one',
+                'ExpressionAttributeNames': {'#bin': f"m{minutes}"},
+                'ExpressionAttributeValues': one
+            }})
+    
+    try:
+        get_dynamodb().meta.client.transact_write_items(TransactItems=items)
+        return True
+    except ClientError as e:
+        reasons = e.response.get('CancellationReasons') or [{}]
+        if reasons[0].get('Code') == 'ConditionalCheckFailed':
+            return False
+        raise
+
+def update_live_counters(entries):
+    """
+    Update per-day and per-department counters for stored entry logs.
+    
+    entries: list of (entry_log_item, student) tuples.
+    Tap and hour increments for the same counter item are coalesced so a
+    batch costs one atomic ADD update per counter item instead of one per
+    tap. A student's first tap of the day goes through record_first_tap,
+    which also adds it to the per-minute arrival bins of the day and of the
+    department ('<date>#ARRIVAL', '<date>#ARRIVAL#DEPT#<department>',
+    attributes m<minutes>). Bins of any set of days or departments merge by
+    addition, which is what get_analytics view=arrival does.
+    Counter failures are logged and never fail the tap itself.
+    """
+    counters = defaultdict(lambda: {'taps': 0, 'hours': defaultdict(int)})
+    departments_by_date = defaultdict(set)
+    seen_students = set()
+    
+    # In timestamp order, so a buffered batch counts each student's earliest tap as the arrival
+    for log, student in sorted(entries, key=lambda entry: str(entry[0].get('timestamp') or '')):
+        date = log['date']
+        department = student.get('department') or 'Unknown'
+        hour = get_ist_hour(log.get('timestamp'))
+        
+        presence_key = (date, log['student_id'])
+        if presence_key not in seen_students:
+            seen_students.add(presence_key)
+            try:
+                record_first_tap(date, log['student_id'], department, get_arrival_minutes(log.get('timestamp')))
+            except ClientError as e:
+                print(f"Error recording first tap of {log['student_id']} on {date}: {str(e)}")
+        
+        for stat_key in (f"{date}#ALL", f"{date}#DEPT#{department}"):
+            counter = counters[stat_key]
+            counter['taps'] += 1
+            if hour is not None:
+                counter['hours'][hour] += 1
+        departments_by_date[date].add(department)
+    
+    try:
+        for stat_key, counter in counters.items():
+            add_clauses = ['total_taps :taps']
+            values = {':taps': counter['taps']}
+            for hour, count in counter['hours'].items():
+                add_clauses.append(f"hour_{hour} :h{hour}")
+                values[f":h{hour}"] = count
+            
+            date, scope = stat_key.split('#', 1)
+            if scope == 'ALL':
+                add_clauses.append('departments :departments')
+                values[':departments'] = departments_by_date[date]
+            
+            get_table(LIVE_STATS_TABLE).update_item(
+                Key={'stat_key': stat_key},
+                UpdateExpression='ADD ' + ', '.join(add_clauses),
+                ExpressionAttributeValues=values
+            )
+    except ClientError as e:
+        print(f"Error updating live counters: {str(e)}")
+
+def get_dynamodb():
+    """Return the DynamoDB resource, creating it on first use."""
+    global _dynamodb
+    if _dynamodb is None:
+        import boto3
+        _dynamodb = boto3.resource('dynamodb')
+    return _dynamodb
+
+def get_table(table_name):
+    """Return a DynamoDB Table, creating the resource on first use."""
+    return get_dynamodb().Table(table_name)
@@ -6,21 +6,79 @@ Computes attendance status: Present, Absent, Proxy, Bunk.
 """
 
 import json
-import boto3
+import sys
 import os
-import pandas as pd
 import io
+import csv
+import gzip
+import struct
+import zlib
+from array import array
+import hashlib
+import re
+import time
+import threading
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from decimal import Decimal
 from botocore.exceptions import ClientError
 
-# Initialize AWS clients
-s3_client = boto3.client('s3')
-dynamodb = boto3.resource('dynamodb')
+# AWS clients are created on first use, keeping module import (cold start)
+# cheap. Clients are thread-safe; DynamoDB resources are created per worker
+# thread, see get_table. The worker pool lives as long as the container, so
+# warm invocations reuse its threads and their resources.
+_s3_client = None
+_s3_client_lock = threading.Lock()
+_thread_local = threading.local()
+_upload_executor = None
+_upload_executor_lock = threading.Lock()
 
-entry_log_table = dynamodb.Table(os.environ.get('ENTRY_LOG_TABLE', 'Entry_Log'))
-student_master_table = dynamodb.Table(os.environ.get('STUDENT_MASTER_TABLE', 'Student_Master'))
-final_attendance_table = dynamodb.Table(os.environ.get('FINAL_ATTENDANCE_TABLE', 'Final_Attendance'))
+ENTRY_LOG_TABLE = os.environ.get('ENTRY_LOG_TABLE', 'Entry_Log')
+STUDENT_MASTER_TABLE = os.environ.get('STUDENT_MASTER_TABLE', 'Student_Master')
+FINAL_ATTENDANCE_TABLE = os.environ.get('FINAL_ATTENDANCE_TABLE', 'Final_Attendance')
+PROCESSED_UPLOADS_TABLE = os.environ.get('PROCESSED_UPLOADS_TABLE', 'Processed_Uploads')
+ANALYTICS_STATE_TABLE = os.environ.get('ANALYTICS_STATE_TABLE', 'Analytics_State')
+STUDENT_SUMMARY_TABLE = os.environ.get('STUDENT_SUMMARY_TABLE', 'Student_Attendance_Summary')
+
+# Entry logs past the retention window live in the archive written by the
+# archive_entry_logs job; these must match its settings
+ARCHIVE_BUCKET_NAME = os.environ.get('ARCHIVE_BUCKET_NAME', os.environ.get('UPLOAD_BUCKET_NAME', 'attendance-uploads-default'))
+ARCHIVE_PREFIX = os.environ.get('ENTRY_LOG_ARCHIVE_PREFIX', 'entry-logs/')
+RETENTION_DAYS = int(os.environ.get('ENTRY_LOG_RETENTION_DAYS', '30'))
+
+# Maximum number of S3 records processed concurrently per invocation
+UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', '4'))
+
+# Chunked, checkpointed processing of large sheets
+UPLOAD_CHUNK_ROWS = int(os.environ.get('UPLOAD_CHUNK_ROWS', '500'))
+UPLOAD_CHUNK_EXECUTOR = os.environ.get('UPLOAD_CHUNK_EXECUTOR', 'serial')
+UPLOAD_CHUNK_WORKERS = int(os.environ.get('UPLOAD_CHUNK_WORKERS', str(os.cpu_count() or 2)))
+# Worksheets of a multi-sheet workbook are parsed on a process pool with
+# UPLOAD_SHEET_EXECUTOR=process (falls back to serial where unsupported)
+UPLOAD_SHEET_EXECUTOR = os.environ.get('UPLOAD_SHEET_EXECUTOR', 'serial')
+# Hand off to a new invocation when less than this much time is left
+UPLOAD_TIME_MARGIN_MS = int(os.environ.get('UPLOAD_TIME_MARGIN_MS', '30000'))
+# An upload stuck in PROCESSING longer than this can be claimed again
+UPLOAD_LEASE_SECONDS = int(os.environ.get('UPLOAD_LEASE_SECONDS', '960'))
+
+# Rows scanned for the header (title/banner/blank rows may sit above it)
+UPLOAD_HEADER_SCAN_ROWS = int(os.environ.get('UPLOAD_HEADER_SCAN_ROWS', '20'))
+
+# Files at least this large are validated with ranged reads before the full
+# download; unusable ones are rejected without downloading them
+UPLOAD_PREFLIGHT_MIN_BYTES = int(os.environ.get('UPLOAD_PREFLIGHT_MIN_BYTES', str(1024 * 1024)))
+UPLOAD_MAX_ROWS = int(os.environ.get('UPLOAD_MAX_ROWS', '100000'))
+PREFLIGHT_BLOCK_BYTES = 64 * 1024
+
+# Parsed identifier lists are stored as compact sidecar objects under this
+# prefix, so reprocessing an upload does not re-download and re-parse it
+UPLOAD_SIDECAR_PREFIX = os.environ.get('UPLOAD_SIDECAR_PREFIX', 'parsed/')
+
+# Division rosters built from Student_Master, cached per container
+ROSTER_CACHE_TTL_SECONDS = int(os.environ.get('ROSTER_CACHE_TTL_SECONDS', '300'))
+_roster_index = None
+_roster_index_built_at = 0
 
 def lambda_handler(event, context):
     """
@@ -31,220 +89,73 @@ def lambda_handler(event, context):
         "Records": [{
             "s3": {
                 "bucket": {"name": "bucket-name"},
-                "object": {"key": "path/to/file.xlsx"}
+                "object": {"key": "path/to/file.xlsx", "eTag": "..."}
             }
         }]
     }
     
     Excel file format:
-    - Must contain columns: student_id or rfid_uid, lecture (optional)
+    - Must contain columns: student_id or rfid_uid, lecture (optional);
+      the header may follow title or blank rows (UPLOAD_HEADER_SCAN_ROWS)
     - May contain: name, date (if not in filename)
     """
     try:
-        # Process each S3 record
+        uploads = []
         for record in event.get('Records', []):
             bucket_name = record['s3']['bucket']['name']
             object_key = record['s3']['object']['key']
+            etag = record['s3']['object'].get('eTag')
             
             # Skip if not an Excel/CSV file
             if not (object_key.endswith('.xlsx') or object_key.endswith('.xls') or object_key.endswith('.csv')):
                 print(f"Skipping non-Excel file: {object_key}")
                 continue
             
-            # Download file from S3
-            try:
-                response = s3_client.get_object(Bucket=bucket_name, Key=object_key)
-                file_content = response['Body'].read()
-            except ClientError as e:
-                print(f"Error downloading file from S3: {str(e)}")
-                continue
-            
-            # Parse Excel/CSV file
+            uploads.append((bucket_name, object_key, etag))
+        
+        # Process the files on a bounded worker pool (a single file in-line).
+        # The student directory and each date's entry logs are fetched once
+        # and shared by all files.
+        cache = InvocationCache()
+        records_processed = 0
+        errors = []
+        if len(uploads) == 1:
+            bucket_name, object_key, etag = uploads[0]
             try:
-                if object_key.endswith('.csv'):
-                    df = pd.read_csv(io.BytesIO(file_content))
-                else:
-                    df = pd.read_excel(io.BytesIO(file_content), engine='openpyxl')
+                records_processed += process_upload(bucket_name, object_key, etag, cache, context)
             except Exception as e:
-                print(f"Error parsing file: {str(e)}")
-                continue
-            
-            # Extract date from filename or use today's date
-            date = extract_date_from_filename(object_key)
-            if not date:
-                # Use IST date (UTC + 5.5 hours) for default date
-                utc_now = datetime.utcnow()
-                ist_now = utc_now + timedelta(hours=5, minutes=30)
-                date = ist_now.strftime('%Y-%m-%d')
-                print(f"WARNING: Could not extract date from filename '{object_key}', using today's date: {date}")
-            else:
-                print(f"SUCCESS: Extracted date '{date}' from filename '{object_key}'")
-            
-            # Extract lecture from filename or use default (must be done before using it)
-            lecture = extract_lecture_from_filename(object_key)
-            if not lecture:
-                # Use IST time for lecture naming
-                utc_now = datetime.utcnow()
-                ist_now = utc_now + timedelta(hours=5, minutes=30)
-                lecture = f"Lecture_{ist_now.strftime('%H:%M')}"
-            
-            print(f"Processing attendance for date: {date}, lecture: {lecture}, file: {object_key}")
-            
-            # Normalize column names (case-insensitive, strip whitespace)
-            df.columns = df.columns.str.strip().str.lower()
-            
-            # Identify student identifier column
-            student_id_col = None
-            rfid_uid_col = None
-            
-            for col in df.columns:
-                if col in ['student_id', 'studentid']:
-                    student_id_col = col
-                elif col in ['rfid_uid', 'rfid', 'rfiduid']:
-                    rfid_uid_col = col
-            
-            if not student_id_col and not rfid_uid_col:
-                print("Error: Excel file must contain 'student_id' or 'rfid_uid' column")
-                continue
-            
-            # Fetch all entry logs for the date
-            entry_logs = fetch_entry_logs_for_date(date)
-            entry_rfid_uids = set(log['rfid_uid'] for log in entry_logs)
-            rfid_to_student_id = {log['rfid_uid']: log.get('student_id') for log in entry_logs}
-            
-            # Fetch all students from master table
-            all_students = fetch_all_students()
-            student_id_to_info = {s['student_id']: s for s in all_students}
-            rfid_to_student_info = {s['rfid_uid']: s for s in all_students}
-            
-            # Process each student in Excel
-            attendance_results = []
-            
-            for _, row in df.iterrows():
-                student_id = None
-                rfid_uid = None
-                
-                if student_id_col:
-                    student_id = str(row[student_id_col]).strip()
-                elif rfid_uid_col:
-                    rfid_uid = str(row[rfid_uid_col]).strip()
-                    # Find student_id from rfid_uid
-                    student_info = rfid_to_student_info.get(rfid_uid)
-                    if student_info:
-                        student_id = student_info['student_id']
-                
-                if not student_id:
-                    print(f"Warning: Could not find student_id for row: {row.to_dict()}")
-                    continue
-                
-                # Determine attendance status
-                student_info = student_id_to_info.get(student_id)
-                if not student_info:
-                    print(f"Warning: Student {student_id} not found in Student_Master")
-                    continue
-                
-                student_rfid = student_info['rfid_uid']
-                
-                # Check if student was scanned (in entry logs)
-                was_scanned = student_rfid in entry_rfid_uids
-                
-                # Check if student is in Excel (they are, since we're processing them)
-                in_excel = True
-                
-                # Determine status
-                if was_scanned and in_excel:
-                    status = "Present"
-                elif not was_scanned and in_excel:
-                    status = "Proxy"  # In Excel but not scanned
-                elif was_scanned and not in_excel:
-                    status = "Bunk"  # Scanned but not in Excel (shouldn't happen in this flow)
-                else:
-                    status = "Absent"
-                
-                # Create attendance record
-                attendance_id = f"{student_id}_{date}_{lecture.replace(' ', '_')}"
-                
-                attendance_record = {
-                    'attendance_id': attendance_id,
-                    'student_id': student_id,
-                    'rfid_uid': student_rfid,
-                    'date': date,  # This is the date extracted from filename
-                    'lecture': lecture,
-                    'status': status,
-                    'uploaded_file': object_key,
-                    'processed_at': datetime.utcnow().isoformat() + 'Z'
-                }
-                
-                # Log the date being stored for each record
-                print(f"Storing record for student {student_id} with date: {date}, status: {status}")
-                
-                attendance_results.append(attendance_record)
-            
-            # Also check for "Bunk" cases: students who were scanned but not in Excel
-            scanned_students_not_in_excel = []
-            
-            excel_student_ids = set()
-            for _, row in df.iterrows():
-                if student_id_col:
-                    excel_student_ids.add(str(row[student_id_col]).strip())
-                elif rfid_uid_col:
-                    rfid = str(row[rfid_uid_col]).strip()
-                    if rfid in rfid_to_student_info:
-                        excel_student_ids.add(rfid_to_student_info[rfid]['student_id'])
-            
-            for log in entry_logs:
-                student_id_from_log = log.get('student_id')
-                if student_id_from_log and student_id_from_log not in excel_student_ids:
-                    # Student was scanned but not in Excel - this is a "Bunk"
-                    attendance_id = f"{student_id_from_log}_{date}_{lecture.replace(' ', '_')}_bunk"
-                    
-                    attendance_record = {
-                        'attendance_id': attendance_id,
-                        'student_id': student_id_from_log,
-                        'rfid_uid': log['rfid_uid'],
-                        'date': date,
-                        'lecture': lecture,
-                        'status': 'Bunk',
-                        'uploaded_file': object_key,
-                        'processed_at': datetime.utcnow().isoformat() + 'Z'
-                    }
-                    
-                    scanned_students_not_in_excel.append(attendance_record)
-            
-            attendance_results.extend(scanned_students_not_in_excel)
-            
-            # Store all attendance records in DynamoDB
-            dates_stored = {}
-            for record in attendance_results:
+                print(f"Error processing {object_key}: {str(e)}")
+                errors.append(e)
+        else:
+            executor = get_upload_executor()
+            futures = {
+                executor.submit(process_upload, bucket_name, object_key, etag, cache, context): object_key
+                for bucket_name, object_key, etag in uploads
+            }
+            for future, object_key in futures.items():
                 try:
-                    # Convert Python types to DynamoDB-compatible types
-                    dynamo_item = json.loads(json.dumps(record), parse_float=Decimal)
-                    record_date = record.get('date', 'unknown')
-                    dates_stored[record_date] = dates_stored.get(record_date, 0) + 1
-                    final_attendance_table.put_item(Item=dynamo_item)
-                    print(f"✅ Stored record {record['attendance_id']} with date: {record_date}")
-                except ClientError as e:
-                    print(f"❌ Error storing attendance record {record['attendance_id']}: {str(e)}")
-            
-            # Log summary of dates stored
-            print(f"Successfully processed {len(attendance_results)} attendance records from {object_key}")
-            print(f"Dates stored in DynamoDB: {dates_stored}")
-            if len(dates_stored) > 1:
-                print(f"⚠️ WARNING: Multiple dates found in records: {list(dates_stored.keys())}")
-            elif len(dates_stored) == 1:
-                stored_date = list(dates_stored.keys())[0]
-                print(f"✅ All records stored with date: {stored_date}")
+                    records_processed += future.result()
+                except Exception as e:
+                    print(f"Error processing {object_key}: {str(e)}")
+                    errors.append(e)
+        
+        if errors:
+            raise errors[0]
         
         return {
             'statusCode': 200,
             'body': json.dumps({
                 'message': 'Attendance processing completed successfully',
-                'records_processed': len(attendance_results) if 'attendance_results' in locals() else 0
+                'records_processed': records_processed
             })
         }
     
     except Exception as e:
         print(f"Error processing attendance upload: {str(e)}")
+        # S3 events and hand-offs are asynchronous invocations: raising makes
+        # Lambda retry them, and the retry resumes from the ledger checkpoint
+        if event.get('Records'):
+            raise
         return {
             'statusCode': 500,
             'body': json.dumps({
@@ -252,6 +163,897 @@ def lambda_handler(event, context):
             })
         }
 
+def get_table(table_name):
+    """
+    Return a DynamoDB Table for the current thread (boto3 resources are not
+    thread-safe). The main thread and the long-lived upload workers each
+    build their resource once per container.
+    """
+    dynamodb = getattr(_thread_local, 'dynamodb', None)
+    if dynamodb is None:
+        import boto3
+        dynamodb = boto3.session.Session().resource('dynamodb')
+        _thread_local.dynamodb = dynamodb
+    return dynamodb.Table(table_name)
+
+def get_upload_executor():
+    """Return the container's upload worker pool, creating it on first use."""
+    global _upload_executor
+    if _upload_executor is None:
+        with _upload_executor_lock:
+            if _upload_executor is None:
+                _upload_executor = ThreadPoolExecutor(max_workers=max(1, UPLOAD_WORKERS),
+                                                      thread_name_prefix='upload')
+    return _upload_executor
+
+def get_s3_client():
+    """Return the shared S3 client, creating it on first use."""
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                import boto3
+                _s3_client = boto3.client('s3')
+    return _s3_client
+
+class InvocationCache:
+    """
+    Memoizes expensive lookups for the duration of one invocation.
+    Concurrent requests for the same key wait for a single load.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+    
+    def get(self, key, loader):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {'lock': threading.Lock(), 'loaded': False, 'value': None}
+        with entry['lock']:
+            if not entry['loaded']:
+                entry['value'] = loader()
+                entry['loaded'] = True
+        return entry['value']
+
+def process_upload(bucket_name, object_key, etag=None, cache=None, context=None):
+    """
+    Process one uploaded attendance file.
+    Returns the number of attendance records stored.
+    
+    Exact duplicates (same content for the same date and lecture) are
+    detected through the Processed_Uploads ledger and skipped before the
+    file is downloaded. The ledger item doubles as the progress checkpoint:
+    rows are reconciled and written in chunks, and a re-invocation after a
+    timeout or failure resumes from the last committed chunk.
+    """
+    cache = cache or InvocationCache()
+    
+    # Extract date from filename or use today's date
+    date = extract_date_from_filename(object_key)
+    if not date:
+        # Use IST date (UTC + 5.5 hours) for default date
+        utc_now = datetime.utcnow()
+        ist_now = utc_now + timedelta(hours=5, minutes=30)
+        date = ist_now.strftime('%Y-%m-%d')
+        print(f"WARNING: Could not extract date from filename '{object_key}', using today's date: {date}")
+    else:
+        print(f"SUCCESS: Extracted date '{date}' from filename '{object_key}'")
+    
+    # Extract lecture from filename or use default (must be done before using it)
+    filename_lecture = extract_lecture_from_filename(object_key)
+    lecture = filename_lecture
+    if not lecture:
+        # Use IST time for lecture naming
+        utc_now = datetime.utcnow()
+        ist_now = utc_now + timedelta(hours=5, minutes=30)
+        lecture = f"Lecture_{ist_now.strftime('%H:%M')}"
+    
+    # A single-part upload's ETag is the MD5 of its content, so duplicates can
+    # be rejected before downloading. Multipart ETags are not content hashes;
+    # those uploads are claimed by SHA-256 after the download instead.
+    etag = (etag or '').strip('"')
+    upload_key = None
+    ledger_item = None
+    head = None
+    if etag and '-' not in etag:
+        # The target class (object metadata) scopes the latest-upload pointer
+        try:
+            head = get_s3_client().head_object(Bucket=bucket_name, Key=object_key)
+        except ClientError as e:
+            print(f"Error reading {object_key} from S3: {str(e)}")
+            return 0
+        roster = get_roster_from_metadata(head.get('Metadata') or {})
+        upload_key = build_upload_key(f"md5:{etag}", date, filename_lecture)
+        ledger_item = claim_upload(upload_key, object_key, date, lecture,
+                                   build_scope_key(date, filename_lecture, roster))
+        if not ledger_item:
+            return 0
+        # A re-upload of older content is processed under its own ledger item
+        upload_key = ledger_item['upload_key']
+    
+    try:
+        # An earlier attempt (hand-off, retry, backfill) may have stored the
+        # parsed identifiers of this exact object; otherwise download it and
+        # parse it as a row stream (csv module / openpyxl read-only mode),
+        # keeping only the identifier column.
+        parsed = load_parsed_upload(bucket_name, object_key, etag) if etag else None
+        if parsed:
+            sidecar, sheets = parsed
+            roster = tuple(sidecar['roster']) if sidecar.get('roster') else None
+            content_sha256 = sidecar['sha256']
+            print(f"Loaded parsed identifiers of {object_key} from {sidecar_key(object_key)}")
+        else:
+            content_hash = hashlib.sha256()
+            try:
+                rejection = preflight_s3_object(bucket_name, object_key, head['ContentLength'] if head else None)
+                if rejection:
+                    reject_upload(upload_key, object_key, date, lecture, rejection)
+                    return 0
+                
+                response = get_s3_client().get_object(Bucket=bucket_name, Key=object_key)
+                # Optional target class, set as object metadata by generate_presigned_url
+                roster = get_roster_from_metadata(response.get('Metadata') or {})
+                
+                if object_key.endswith('.csv'):
+                    sheets = [(None, *read_csv_identifiers(response['Body'], content_hash))]
+                else:
+                    file_content = response['Body'].read()
+                    content_hash.update(file_content)
+                    sheets = read_excel_sheets(file_content)
+            except ClientError as e:
+                print(f"Error downloading file from S3: {str(e)}")
+                release_upload(upload_key, 'FAILED', error=f'Download failed: {str(e)}')
+                return 0
+            except Exception as e:
+                print(f"Error parsing file: {str(e)}")
+                release_upload(upload_key, 'FAILED', error=f'Parse failed: {str(e)}')
+                return 0
+            
+            content_sha256 = content_hash.hexdigest()
+            write_parsed_upload(bucket_name, object_key, {
+                'etag': etag,
+                'sha256': content_sha256,
+                'date': date,
+                'lecture': filename_lecture,
+                'roster': list(roster) if roster else None
+            }, sheets)
+        
+        if not upload_key:
+            upload_key = build_upload_key(f"sha256:{content_sha256}", date, filename_lecture)
+            ledger_item = claim_upload(upload_key, object_key, date, lecture,
+                                       build_scope_key(date, filename_lecture, roster))
+            if not ledger_item:
+                return 0
+            upload_key = ledger_item['upload_key']
+        
+        # A resumed upload keeps the lecture name chosen by the first attempt
+        lecture = ledger_item.get('lecture') or lecture
+        
+        # Sheets without an identifier header (notes, summaries) are ignored
+        sheets = [sheet for sheet in sheets if sheet[1]]
+        if not sheets:
+            reject_upload(upload_key, object_key, date, lecture, MISSING_HEADER_ERROR.format(rows=UPLOAD_HEADER_SCAN_ROWS))
+            return 0
+        
+        upload = {
+            'bucket_name': bucket_name,
+            'object_key': object_key,
+            'etag': etag,
+            'upload_key': upload_key,
+            'ledger_key': upload_key,
+            'date': date,
+            'lecture': lecture,
+            'roster': roster
+        }
+        if len(sheets) > 1:
+            return reconcile_sheets(upload, sheets, cache, context)
+        
+        print(f"Processing attendance for date: {date}, lecture: {lecture}, file: {object_key}")
+        _, id_kind, identifiers = sheets[0]
+        return reconcile_upload(upload, id_kind, identifiers, ledger_item, cache, context)
+    except Exception as e:
+        release_upload(upload_key, 'FAILED', error=str(e))
+        raise
+
+# Accepted header names (lower-case) of the identifier columns
+STUDENT_ID_ALIASES = ('student_id', 'studentid')
+RFID_UID_ALIASES = ('rfid_uid', 'rfid', 'rfiduid')
+
+def find_identifier_column(header):
+    """
+    Return (id_kind, column_index) for a header row, preferring student_id
+    over rfid_uid, or (None, None) if neither column is present.
+    Headers are compared case-insensitively with spaces/hyphens read as
+    underscores, so "Student ID" matches student_id.
+    """
+    columns = [re.sub(r'[\s\-]+', '_', str(cell).strip().lower()) if cell is not None else '' for cell in header]
+    for id_kind, aliases in (('student_id', STUDENT_ID_ALIASES), ('rfid_uid', RFID_UID_ALIASES)):
+        for index, column in enumerate(columns):
+            if column in aliases:
+                return id_kind, index
+    return None, None
+
+def normalize_identifier(value):
+    """Return a cell value as an identifier string, or None for empty cells."""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        # Numeric ids typed into Excel come back as floats (101.0)
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+def read_identifier_rows(rows, header_scan_rows=None):
+    """
+    Find the header within the first rows of a row stream and return
+    (id_kind, identifiers) from the identifier column below it.
+    Rows are consumed in a single pass: rows above the header (titles,
+    merged banners, blanks) are skipped, and after the header is found only
+    the identifier cell of each row is looked at.
+    """
+    header_scan_rows = header_scan_rows or UPLOAD_HEADER_SCAN_ROWS
+    rows = iter(rows)
+    id_kind, column = None, None
+    for row_number, row in enumerate(rows, start=1):
+        id_kind, column = find_identifier_column(row)
+        if id_kind:
+            break
+        if row_number >= header_scan_rows:
+            break
+    if not id_kind:
+        return None, []
+    
+    identifiers = []
+    for row in rows:
+        if column < len(row):
+            identifier = normalize_identifier(row[column])
+            if identifier:
+                identifiers.append(identifier)
+    return id_kind, identifiers
+
+MISSING_HEADER_ERROR = "Missing 'student_id' or 'rfid_uid' column (header must be within the first {rows} rows)"
+
+class RangedReader(io.RawIOBase):
+    """
+    Seekable read-only stream over an object fetched on demand in fixed-size
+    blocks with fetch_range(start, end) (inclusive byte offsets).
+    zipfile/openpyxl only touch the parts they need, so the central
+    directory, sharedStrings.xml and the first sheet rows can be read
+    without downloading the whole file.
+    """
+    def __init__(self, size, fetch_range, block_size=PREFLIGHT_BLOCK_BYTES):
+        self.size = size
+        self.requests = 0
+        self.bytes_fetched = 0
+        self._fetch_range = fetch_range
+        self._block_size = block_size
+        self._blocks = {}
+        self._position = 0
+    
+    def readable(self):
+        return True
+    
+    def seekable(self):
+        return True
+    
+    def tell(self):
+        return self._position
+    
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError('negative seek position')
+        self._position = offset
+        return offset
+    
+    def _block(self, index):
+        block = self._blocks.get(index)
+        if block is None:
+            start = index * self._block_size
+            block = self._fetch_range(start, min(start + self._block_size, self.size) - 1)
+            self._blocks[index] = block
+            self.requests += 1
+            self.bytes_fetched += len(block)
+        return block
+    
+    def readinto(self, buffer):
+        view = memoryview(buffer).cast('B')
+        filled = 0
+        while filled < len(view) and self._position < self.size:
+            block_index, offset = divmod(self._position, self._block_size)
+            data = self._block(block_index)[offset:offset + len(view) - filled]
+            view[filled:filled + len(data)] = data
+            filled += len(data)
+            self._position += len(data)
+        return filled
+
+def s3_range_fetcher(bucket_name, object_key):
+    """Return a fetch_range function reading byte ranges of an S3 object."""
+    def fetch_range(start, end):
+        response = get_s3_client().get_object(Bucket=bucket_name, Key=object_key, Range=f"bytes={start}-{end}")
+        return response['Body'].read()
+    return fetch_range
+
+def local_range_fetcher(path):
+    """Return a fetch_range function reading byte ranges of a local file (stand-in for S3)."""
+    def fetch_range(start, end):
+        with open(path, 'rb') as f:
+            f.seek(start)
+            return f.read(end - start + 1)
+    return fetch_range
+
+def preflight_s3_object(bucket_name, object_key, size=None):
+    """
+    Validate an upload with a few ranged reads before the full download.
+    Returns a rejection reason, or None if the file looks usable (or is
+    small enough that downloading it is cheaper than checking).
+    """
+    if size is None:
+        size = get_s3_client().head_object(Bucket=bucket_name, Key=object_key)['ContentLength']
+    if size < UPLOAD_PREFLIGHT_MIN_BYTES:
+        return None
+    
+    reader = RangedReader(size, s3_range_fetcher(bucket_name, object_key))
+    rejection = preflight_upload(reader, object_key)
+    print(f"Pre-flight of {object_key}: {reader.requests} ranged reads, "
+          f"{reader.bytes_fetched} of {size} bytes, {rejection or 'OK'}")
+    return rejection
+
+def preflight_upload(reader, object_key):
+    """Return a rejection reason for an unusable upload, or None."""
+    if object_key.endswith('.csv'):
+        return preflight_csv(reader)
+    return preflight_workbook(reader)
+
+def preflight_csv(reader):
+    """Check that a CSV has an identifier header and rows, from its first block."""
+    data = reader.read(PREFLIGHT_BLOCK_BYTES)
+    complete = reader.tell() >= reader.size
+    lines = data.decode('utf-8-sig', errors='replace').splitlines()
+    if not complete:
+        lines = lines[:-1]  # the last line may be cut off
+    
+    rows = list(csv.reader(lines))
+    for row_number, row in enumerate(rows[:UPLOAD_HEADER_SCAN_ROWS], start=1):
+        id_kind, column = find_identifier_column(row)
+        if id_kind:
+            has_rows = any(column < len(r) and r[column].strip() for r in rows[row_number:])
+            if complete and not has_rows:
+                return 'No attendance rows below the header'
+            return None
+    
+    if complete or len(rows) >= UPLOAD_HEADER_SCAN_ROWS:
+        return MISSING_HEADER_ERROR.format(rows=UPLOAD_HEADER_SCAN_ROWS)
+    return None
+
+def preflight_workbook(reader):
+    """
+    Check that a workbook opens, has a sheet with an identifier header in
+    its first rows, has student rows below it and is within UPLOAD_MAX_ROWS.
+    Only the zip directory, workbook parts, shared strings and the first
+    rows of each sheet are read.
+    """
+    # Imported lazily: only needed for Excel files
+    from openpyxl import load_workbook
+    
+    try:
+        workbook = load_workbook(reader, read_only=True, data_only=True)
+    except Exception as e:
+        return f"Not a readable .xlsx workbook ({str(e)})"
+    
+    try:
+        found_header = False
+        for worksheet in workbook.worksheets:
+            # Row count from the sheet's <dimension>, when it is present
+            declared_rows = worksheet.max_row
+            worksheet.reset_dimensions()
+            
+            rows = worksheet.iter_rows(values_only=True)
+            header_row = column = None
+            for row_number, row in enumerate(rows, start=1):
+                if row_number > UPLOAD_HEADER_SCAN_ROWS:
+                    break
+                id_kind, column = find_identifier_column(row)
+                if id_kind:
+                    header_row = row_number
+                    break
+            if header_row is None:
+                continue
+            found_header = True
+            
+            if declared_rows and declared_rows - header_row > UPLOAD_MAX_ROWS:
+                return (f"Sheet '{worksheet.title}' has {declared_rows - header_row} rows, "
+                        f"more than the limit of {UPLOAD_MAX_ROWS}")
+            
+            # A usable sheet has an identifier within the next few rows
+            for row_number, row in enumerate(rows, start=1):
+                if column < len(row) and normalize_identifier(row[column]):
+                    return None
+                if row_number >= UPLOAD_HEADER_SCAN_ROWS:
+                    break
+        
+        if not found_header:
+            return MISSING_HEADER_ERROR.format(rows=UPLOAD_HEADER_SCAN_ROWS)
+        return 'No attendance rows below the header'
+    finally:
+        workbook.close()
+
+class HashingReader(io.RawIOBase):
+    """Read-only stream over an S3 body that hashes the bytes as they are read."""
+    def __init__(self, body, hasher):
+        self._body = body
+        self._hasher = hasher
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        data = self._body.read(len(buffer))
+        self._hasher.update(data)
+        buffer[:len(data)] = data
+        return len(data)
+
+def read_csv_identifiers(body, hasher):
+    """
+    Stream a CSV S3 body and return (id_kind, identifiers).
+    Only one row is held in memory at a time; the raw bytes are fed to the
+    hasher while streaming.
+    """
+    text = io.TextIOWrapper(io.BufferedReader(HashingReader(body, hasher)), encoding='utf-8-sig', newline='')
+    id_kind, identifiers = read_identifier_rows(csv.reader(text))
+    
+    # Drain the stream so the content hash covers the whole file
+    for _ in text:
+        pass
+    return id_kind, identifiers
+
+def read_sheet_identifiers(worksheet):
+    """Stream one worksheet and return (title, id_kind, identifiers)."""
+    # Some exporters write a wrong <dimension>; read until the sheet data ends
+    worksheet.reset_dimensions()
+    id_kind, identifiers = read_identifier_rows(worksheet.iter_rows(values_only=True))
+    return worksheet.title, id_kind, identifiers
+
+# Per-process workbook for the process-pool sheet executor
+_sheet_worker_workbook = None
+
+def _init_sheet_worker(file_content):
+    global _sheet_worker_workbook
+    from openpyxl import load_workbook
+    _sheet_worker_workbook = load_workbook(io.BytesIO(file_content), read_only=True, data_only=True)
+
+def _read_sheet(index):
+    return read_sheet_identifiers(_sheet_worker_workbook.worksheets[index])
+
+def read_excel_sheets(file_content):
+    """
+    Stream every worksheet of an Excel file and return a list of
+    (title, id_kind, identifiers), in workbook order.
+    The workbook is opened once in openpyxl's read-only mode, so the shared
+    strings table is loaded a single time and each sheet is parsed from its
+    XML as a row stream. With UPLOAD_SHEET_EXECUTOR=process, sheets are
+    parsed in parallel by worker processes that each open the workbook from
+    the file's bytes.
+    """
+    # Imported lazily: only needed for Excel files
+    from openpyxl import load_workbook
+    
+    workbook = load_workbook(io.BytesIO(file_content), read_only=True, data_only=True)
+    try:
+        worksheets = workbook.worksheets
+        if UPLOAD_SHEET_EXECUTOR == 'process' and len(worksheets) > 1:
+            try:
+                from concurrent.futures import ProcessPoolExecutor
+                with ProcessPoolExecutor(max_workers=min(UPLOAD_CHUNK_WORKERS, len(worksheets)),
+                                         mp_context=get_process_context(),
+                                         initializer=_init_sheet_worker, initargs=(file_content,)) as executor:
+                    return list(executor.map(_read_sheet, range(len(worksheets))))
+            except (OSError, ValueError, NotImplementedError) as e:
+                # e.g. no /dev/shm semaphores on Lambda
+                print(f"Process pool unavailable ({str(e)}), parsing sheets serially")
+        return [read_sheet_identifiers(ws) for ws in worksheets]
+    finally:
+        workbook.close()
+
+def reconcile_sheets(upload, sheets, cache, context=None):
+    """
+    Reconcile a multi-sheet workbook, one (date, lecture) unit per sheet
+    with the lecture taken from the sheet name.
+    The file's ledger item holds the claim and lease; each sheet keeps its
+    own checkpoint item, so a resumed upload skips completed sheets and
+    continues the current one after its last committed chunk.
+    """
+    ledger_key = upload['ledger_key']
+    update_upload_progress(ledger_key, sheets_total=len(sheets))
+    print(f"Processing {len(sheets)} sheets for date: {upload['date']}, file: {upload['object_key']}")
+    
+    records_processed = 0
+    sheets_completed = 0
+    for title, id_kind, identifiers in sheets:
+        sheet_key = f"{ledger_key}#sheet#{title}"
+        checkpoint = get_upload_checkpoint(sheet_key)
+        if checkpoint.get('status') != 'COMPLETED':
+            sheet_upload = dict(upload, upload_key=sheet_key, lecture=title)
+            print(f"Processing sheet '{title}' as lecture: {title}")
+            count = reconcile_upload(sheet_upload, id_kind, identifiers, checkpoint, cache, context)
+            if sheet_upload.get('handed_off'):
+                return records_processed + count
+            checkpoint = {'records_processed': count}
+        
+        records_processed += int(checkpoint.get('records_processed') or 0)
+        sheets_completed += 1
+        update_upload_progress(ledger_key, sheets_completed=sheets_completed)
+    
+    release_upload(ledger_key, 'COMPLETED', records_processed=records_processed)
+    return records_processed
+
+# Sidecar format: magic, format version, then a zlib-compressed payload of a
+# length-prefixed JSON header followed by one column per sheet (identifier
+# count, typecode and lengths array, UTF-8 blob). Bump PARSER_VERSION when
+# the parsing rules change so older sidecars are ignored.
+SIDECAR_MAGIC = b'ATID'
+SIDECAR_FORMAT_VERSION = 1
+PARSER_VERSION = 1
+
+def sidecar_key(object_key):
+    """Return the S3 key of an upload's parsed-identifier sidecar."""
+    return f"{UPLOAD_SIDECAR_PREFIX}{object_key}.ids"
+
+def encode_parsed_upload(header, sheets):
+    """Encode sheets [(title, id_kind, identifiers)] and a metadata header as sidecar bytes."""
+    header = dict(header, parser_version=PARSER_VERSION,
+                  sheets=[{'title': title, 'id_kind': id_kind, 'count': len(identifiers)}
+                          for title, id_kind, identifiers in sheets])
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    parts = [struct.pack('<I', len(header_bytes)), header_bytes]
+    for _, _, identifiers in sheets:
+        encoded = [identifier.encode('utf-8') for identifier in identifiers]
+        lengths = [len(value) for value in encoded]
+        typecode = 'H' if max(lengths, default=0) < 0x10000 else 'I'
+        column = array(typecode, lengths)
+        if sys.byteorder == 'big':
+            column.byteswap()
+        blob = b''.join(encoded)
+        parts.extend([struct.pack('<cI', typecode.encode('ascii'), len(blob)), column.tobytes(), blob])
+    return SIDECAR_MAGIC + struct.pack('<B', SIDECAR_FORMAT_VERSION) + zlib.compress(b''.join(parts), 6)
+
+def decode_parsed_upload(data):
+    """Decode sidecar bytes into (header, sheets), or raise ValueError."""
+    if data[:4] != SIDECAR_MAGIC or data[4] != SIDECAR_FORMAT_VERSION:
+        raise ValueError('Not a parsed-upload sidecar of a supported version')
+    payload = memoryview(zlib.decompress(data[5:]))
+    (header_length,) = struct.unpack_from('<I', payload, 0)
+    offset = 4 + header_length
+    header = json.loads(bytes(payload[4:offset]).decode('utf-8'))
+    
+    sheets = []
+    for sheet in header['sheets']:
+        typecode, blob_length = struct.unpack_from('<cI', payload, offset)
+        offset += struct.calcsize('<cI')
+        column = array(typecode.decode('ascii'))
+        column.frombytes(payload[offset:offset + column.itemsize * sheet['count']])
+        if sys.byteorder == 'big':
+            column.byteswap()
+        offset += column.itemsize * sheet['count']
+        blob = bytes(payload[offset:offset + blob_length])
+        offset += blob_length
+        
+        identifiers = []
+        position = 0
+        for length in column:
+            identifiers.append(blob[position:position + length].decode('utf-8'))
+            position += length
+        sheets.append((sheet['title'], sheet['id_kind'], identifiers))
+    return header, sheets
+
+def write_parsed_upload(bucket_name, object_key, header, sheets):
+    """Store the parsed identifiers of an upload as its sidecar (best effort)."""
+    header = dict(header, object_key=object_key, created_at=datetime.utcnow().isoformat() + 'Z')
+    try:
+        body = encode_parsed_upload(header, sheets)
+        get_s3_client().put_object(Bucket=bucket_name, Key=sidecar_key(object_key), Body=body,
+                                   ContentType='application/octet-stream')
+    except ClientError as e:
+        print(f"Error storing parsed identifiers of {object_key}: {str(e)}")
+
+def load_parsed_upload(bucket_name, object_key, etag):
+    """
+    Load the sidecar of an upload as (header, sheets), or None if there is
+    none, it was written for a different version of the object (ETag) or
+    by older parsing rules.
+    """
+    try:
+        response = get_s3_client().get_object(Bucket=bucket_name, Key=sidecar_key(object_key))
+        header, sheets = decode_parsed_upload(response['Body'].read())
+    except ClientError:
+        return None
+    except (ValueError, KeyError, struct.error, zlib.error) as e:
+        print(f"Ignoring unreadable sidecar of {object_key}: {str(e)}")
+        return None
+    if header.get('etag') != etag or header.get('parser_version') != PARSER_VERSION:
+        return None
+    return header, sheets
+
+def reconcile_upload(upload, id_kind, identifiers, ledger_item, cache, context=None):
+    """
+    Reconcile the sheet identifiers with the entry logs and store the results.
+    
+    Rows are processed in chunks of UPLOAD_CHUNK_ROWS; after each chunk's
+    writes are committed the ledger checkpoint is advanced. If the Lambda is
+    about to time out, processing is handed off to a fresh invocation which
+    resumes after the last committed chunk. Bunk/Absent records and deletes
+    are written once all sheet rows are done.
+    """
+    date = upload['date']
+    lecture = upload['lecture']
+    object_key = upload['object_key']
+    upload_key = upload['upload_key']
+    
+    # Fetch all entry logs for the date
+    entry_logs = cache.get(('entry_logs', date), lambda: fetch_entry_logs_for_date(date))
+    entry_rfid_uids = set(log['rfid_uid'] for log in entry_logs)
+    
+    # Fetch all students from master table
+    all_students, student_id_to_info, rfid_to_student_info = cache.get('student_directory', load_student_directory)
+    
+    # Existing records for this date/lecture, so only changes are written
+    # (e.g. a corrected sheet re-uploaded by the teacher)
+    existing_by_id = {r['attendance_id']: r for r in fetch_attendance_for_lecture(date, lecture)}
+    existing_count = len(existing_by_id)
+    
+    chunks = [(start, min(start + UPLOAD_CHUNK_ROWS, len(identifiers)))
+              for start in range(0, len(identifiers), UPLOAD_CHUNK_ROWS)]
+    start_chunk = int(ledger_item.get('chunks_committed') or 0)
+    update_upload_progress(upload_key, rows_total=len(identifiers), chunks_total=len(chunks))
+    if start_chunk:
+        print(f"Resuming {object_key} at chunk {start_chunk + 1}/{len(chunks)}")
+    
+    chunk_state = {
+        'identifiers': identifiers,
+        'id_kind': id_kind,
+        'student_id_to_info': student_id_to_info,
+        'rfid_to_student_info': rfid_to_student_info,
+        'entry_rfid_uids': entry_rfid_uids,
+        'date': date,
+        'lecture': lecture,
+        'object_key': object_key
+    }
+    
+    records_written = 0
+    for chunk_index, records in iterate_reconciled_chunks(chunks, start_chunk, chunk_state):
+        if context and context.get_remaining_time_in_millis() < UPLOAD_TIME_MARGIN_MS:
+            hand_off_upload(upload, context)
+            return records_written
+        
+        to_write = changed_records(existing_by_id, records)
+        write_attendance_changes(to_write, [])
+        update_student_summaries(summary_deltas(existing_by_id, to_write, []), student_id_to_info)
+        # A student listed again in a later chunk must diff against this write
+        existing_by_id.update((record['attendance_id'], record) for record in to_write)
+        records_written += len(to_write)
+        update_upload_progress(upload_key, chunks_committed=chunk_index + 1)
+        print(f"Committed chunk {chunk_index + 1}/{len(chunks)} of {object_key}: {len(to_write)} changed records")
+    
+    # Students present in the sheet (cheap, no writes), needed for Bunk/Absent
+    excel_student_ids = resolve_student_ids(identifiers, id_kind, rfid_to_student_info)
+    keep_ids = set(f"{student_id}_{date}_{lecture.replace(' ', '_')}"
+                   for student_id in excel_student_ids if student_id in student_id_to_info)
+    
+    # With a target class, only its members can be Bunk or Absent
+    roster_ids = None
+    if upload['roster']:
+        roster_ids = get_roster_index(all_students).get(upload['roster'], ())
+        print(f"Target roster {upload['roster']}: {len(roster_ids)} students")
+    
+    tail_records = build_tail_records(entry_logs, excel_student_ids, student_id_to_info, roster_ids,
+                                      date, lecture, object_key)
+    keep_ids.update(record['attendance_id'] for record in tail_records)
+    to_write = changed_records(existing_by_id, tail_records)
+    # Records of other divisions sharing the date and lecture name belong to
+    # their own uploads and are left alone
+    to_delete = [attendance_id for attendance_id, record in existing_by_id.items()
+                 if attendance_id not in keep_ids and in_delete_scope(record, roster_ids, object_key)]
+    write_attendance_changes(to_write, to_delete)
+    update_student_summaries(summary_deltas(existing_by_id, to_write, to_delete), student_id_to_info)
+    records_written += len(to_write)
+    
+    # A resumed upload may have written chunks in an earlier invocation
+    if records_written or to_delete or start_chunk:
+        bump_date_version(date)
+    
+    print(f"Diff for {date}/{lecture}: {len(keep_ids)} records, {existing_count} existing, "
+          f"{records_written} written, {len(to_delete)} deleted")
+    print(f"Successfully processed {len(keep_ids)} attendance records from {object_key}")
+    
+    release_upload(upload_key, 'COMPLETED', records_processed=len(keep_ids))
+    return len(keep_ids)
+
+def build_tail_records(entry_logs, excel_student_ids, student_id_to_info, roster_ids,
+                       date, lecture, object_key):
+    """
+    Build the Bunk and Absent records of a lecture (no I/O).
+    roster_ids is the sorted target roster, or None when the upload has no
+    target class (then nobody is Absent and any scanned student can be Bunk).
+    """
+    # "Bunk": students who were scanned but not in Excel
+    tail_records = []
+    
+    for log in entry_logs:
+        student_id_from_log = log.get('student_id')
+        if roster_ids is not None and not roster_contains(roster_ids, student_id_from_log):
+            continue
+        if student_id_from_log and student_id_from_log not in excel_student_ids:
+            # Student was scanned but not in Excel - this is a "Bunk"
+            attendance_id = f"{student_id_from_log}_{date}_{lecture.replace(' ', '_')}_bunk"
+            
+            attendance_record = {
+                'attendance_id': attendance_id,
+                'student_id': student_id_from_log,
+                'rfid_uid': log['rfid_uid'],
+                'date': date,
+                'lecture': lecture,
+                'status': 'Bunk',
+                'uploaded_file': object_key,
+                'processed_at': datetime.utcnow().isoformat() + 'Z'
+            }
+            
+            tail_records.append(attendance_record)
+    
+    # "Absent": on the roster, not in Excel and never scanned
+    if roster_ids is not None:
+        scanned_student_ids = set(log.get('student_id') for log in entry_logs)
+        absent_count = 0
+        for student_id in roster_ids:
+            if student_id in excel_student_ids or student_id in scanned_student_ids:
+                continue
+            tail_records.append({
+                'attendance_id': f"{student_id}_{date}_{lecture.replace(' ', '_')}",
+                'student_id': student_id,
+                'rfid_uid': student_id_to_info[student_id].get('rfid_uid'),
+                'date': date,
+                'lecture': lecture,
+                'status': 'Absent',
+                'uploaded_file': object_key,
+                'processed_at': datetime.utcnow().isoformat() + 'Z'
+            })
+            absent_count += 1
+        print(f"Marked {absent_count} roster students Absent")
+    
+    return tail_records
+
+def reconcile_identifiers(identifiers, id_kind, student_id_to_info, rfid_to_student_info,
+                          entry_rfid_uids, date, lecture, object_key):
+    """Reconcile a slice of sheet identifiers into attendance records (no I/O)."""
+    attendance_results = []
+    
+    for identifier in identifiers:
+        student_id = None
+        
+        if id_kind == 'student_id':
+            student_id = identifier
+        else:
+            # Find student_id from rfid_uid
+            student_info = rfid_to_student_info.get(identifier)
+            if student_info:
+                student_id = student_info['student_id']
+        
+        if not student_id:
+            print(f"Warning: Could not find student_id for {id_kind}: {identifier}")
+            continue
+        
+        # Determine attendance status
+        student_info = student_id_to_info.get(student_id)
+        if not student_info:
+            print(f"Warning: Student {student_id} not found in Student_Master")
+            continue
+        
+        student_rfid = student_info['rfid_uid']
+        
+        # Check if student was scanned (in entry logs); students reached
+        # here are in the Excel sheet, so they are Present or Proxy
+        was_scanned = student_rfid in entry_rfid_uids
+        status = "Present" if was_scanned else "Proxy"
+        
+        # Create attendance record
+        attendance_id = f"{student_id}_{date}_{lecture.replace(' ', '_')}"
+        
+        attendance_results.append({
+            'attendance_id': attendance_id,
+            'student_id': student_id,
+            'rfid_uid': student_rfid,
+            'date': date,  # This is the date extracted from filename
+            'lecture': lecture,
+            'status': status,
+            'uploaded_file': object_key,
+            'processed_at': datetime.utcnow().isoformat() + 'Z'
+        })
+    
+    return attendance_results
+
+def resolve_student_ids(identifiers, id_kind, rfid_to_student_info):
+    """Return the set of student_ids listed in the sheet."""
+    if id_kind == 'student_id':
+        return set(identifiers)
+    return set(rfid_to_student_info[rfid]['student_id'] for rfid in identifiers if rfid in rfid_to_student_info)
+
+# Per-process state for the process-pool chunk executor
+_chunk_worker_state = None
+
+def _init_chunk_worker(state):
+    global _chunk_worker_state
+    _chunk_worker_state = state
+
+def _reconcile_chunk(bounds):
+    start, end = bounds
+    state = _chunk_worker_state
+    return reconcile_identifiers(state['identifiers'][start:end], state['id_kind'],
+                                 state['student_id_to_info'], state['rfid_to_student_info'],
+                                 state['entry_rfid_uids'], state['date'], state['lecture'],
+                                 state['object_key'])
+
+def iterate_reconciled_chunks(chunks, start_chunk, state):
+    """
+    Yield (chunk_index, records) for chunks[start_chunk:] in order.
+    
+    UPLOAD_CHUNK_EXECUTOR=process reconciles chunks in parallel on a local
+    process pool (a stand-in for fanning chunks out to worker Lambdas, which
+    have no multiprocessing support); the default reconciles them in-line.
+    """
+    pending = list(enumerate(chunks))[start_chunk:]
+    if UPLOAD_CHUNK_EXECUTOR != 'process' or len(pending) < 2:
+        _init_chunk_worker(state)
+        for chunk_index, bounds in pending:
+            yield chunk_index, _reconcile_chunk(bounds)
+        return
+    
+    # Only imported when configured; multiprocessing is costly to load
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=UPLOAD_CHUNK_WORKERS, mp_context=get_process_context(),
+                             initializer=_init_chunk_worker, initargs=(state,)) as executor:
+        results = executor.map(_reconcile_chunk, [bounds for _, bounds in pending])
+        for (chunk_index, _), records in zip(pending, results):
+            yield chunk_index, records
+
+def get_process_context():
+    """
+    Multiprocessing context for the local process pools. Pools are started
+    from upload worker threads, and forking a multithreaded process can
+    deadlock on locks held by other threads (boto3, logging), so workers are
+    started by a fork server (or spawned) instead of forked.
+    """
+    import multiprocessing
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+def hand_off_upload(upload, context):
+    """
+    Stop before the Lambda times out and continue in a new invocation.
+    The lease is released so the continuation can claim the upload and
+    resume after the last committed chunk.
+    """
+    print(f"Less than {UPLOAD_TIME_MARGIN_MS} ms left, handing off {upload['object_key']} to a new invocation")
+    upload['handed_off'] = True
+    update_upload_progress(upload['ledger_key'], lease_expires_at=0)
+    
+    continuation_event = {
+        'Records': [{
+            's3': {
+                'bucket': {'name': upload['bucket_name']},
+                'object': {'key': upload['object_key'], 'eTag': upload['etag']}
+            }
+        }]
+    }
+    import boto3
+    boto3.client('lambda').invoke(
+        FunctionName=context.function_name,
+        InvocationType='Event',
+        Payload=json.dumps(continuation_event).encode('utf-8')
+    )
+
 def extract_date_from_filename(filename):
     """Extract date from filename if present (format: YYYY-MM-DD or similar).
     
@@ -297,6 +1099,12 @@ def extract_date_from_filename(filename):
 def extract_lecture_from_filename(filename):
     """Extract lecture name from filename if present."""
     import re
+    # Keys generated by generate_presigned_url: uploads/<date>_<lecture>_<millis>.<ext>
+    # Use the lecture part without the upload timestamp so re-uploads of the
+    # same lecture resolve to the same lecture name
+    match = re.search(r'uploads/\d{4}-\d{2}-\d{2}_(.+)_\d{10,}\.\w+$', filename)
+    if match and match.group(1) != 'upload':
+        return match.group(1)
     # Look for patterns like "Lecture_1", "Lec1", "Math", etc.
     lecture_patterns = [
         r'[Ll]ecture[_\s]*(\w+)',
@@ -309,24 +1117,488 @@ def extract_lecture_from_filename(filename):
             return match.group(1) if len(match.groups()) > 0 else match.group(0)
     return None
 
-def fetch_entry_logs_for_date(date):
-    """Fetch all entry logs for a specific date."""
+def build_upload_key(content_hash, date, lecture):
+    """Build the Processed_Uploads ledger key for a file's content, date and lecture."""
+    return f"{content_hash}#{date}#{(lecture or 'unspecified').replace(' ', '_')}"
+
+def build_scope_key(date, lecture, roster):
+    """Processed_Uploads key of the latest-upload pointer of a date, lecture and target class."""
+    target = '#'.join(roster) if roster else 'all'
+    return f"latest#{date}#{(lecture or 'unspecified').replace(' ', '_')}#{target}"
+
+def claim_upload(upload_key, object_key, date, lecture, scope_key):
+    """
+    Claim an upload in the Processed_Uploads ledger with a conditional write.
+    Returns the ledger item (including any checkpoint of a previous attempt),
+    or None if the same content is the latest upload processed (or being
+    processed under a live lease) for this date, lecture and target class.
+    Failed uploads, uploads whose lease expired and retries of the object
+    holding the lease can claim it again and resume where they stopped;
+    rejected uploads can be claimed again (e.g. after a config change).
+    A completed claim of the same object is an S3 redelivery of this very
+    upload, not a duplicate, and leaves the ledger untouched. Content
+    that was replaced by another upload since (e.g. A, then a corrected B,
+    then A again to revert) is processed again under a ledger item of its
+    own, upload_key#object_key.
+    """
+    ledger_item = claim_ledger_item(upload_key, object_key, date, lecture)
+    if ledger_item:
+        mark_latest_upload(scope_key, ledger_item, upload_key, object_key)
+        return ledger_item
+    
+    claimed = get_upload_checkpoint(upload_key)
+    if claimed.get('file_name') == object_key:
+        print(f"Skipping redelivered upload {object_key}: already {claimed.get('status')} ({upload_key})")
+        return None
+    
+    latest = get_upload_checkpoint(scope_key)
+    if latest.get('content_key') == upload_key and latest.get('object_key') != object_key:
+        print(f"Skipping duplicate upload {object_key}: identical content already processed for {date} ({upload_key})")
+        record_duplicate_upload(upload_key, object_key, date, lecture)
+        return None
+    
+    revision_key = f"{upload_key}#{object_key}"
+    ledger_item = claim_ledger_item(revision_key, object_key, date, lecture)
+    if ledger_item:
+        print(f"Processing {object_key} again: its content was replaced by {latest.get('object_key')} since {upload_key}")
+        mark_latest_upload(scope_key, ledger_item, upload_key, object_key)
+        return ledger_item
+    
+    claimed = get_upload_checkpoint(revision_key)
+    print(f"Skipping redelivered upload {object_key}: already {claimed.get('status')} ({revision_key})")
+    return None
+
+def claim_ledger_item(ledger_key, object_key, date, lecture):
+    """
+    Conditionally claim one ledger item; returns it, or None if it is done or
+    held by another object. A live lease of the same object is taken over:
+    Lambda retries a timed-out or failed invocation well within the lease.
+    """
+    now = int(time.time())
+    try:
+        response = get_table(PROCESSED_UPLOADS_TABLE).update_item(
+            Key={'upload_key': ledger_key},
+            UpdateExpression=('SET #status = :processing, file_name = :file_name, #date = :date, '
+                              'lecture = if_not_exists(lecture, :lecture), '
+                              'started_at = if_not_exists(started_at, :started_at), '
+                              'lease_expires_at = :lease REMOVE error_message'),
+            ConditionExpression=('attribute_not_exists(upload_key) OR #status IN (:failed, :rejected) OR '
+                                 '(#status = :processing AND (lease_expires_at < :now OR file_name = :file_name))'),
+            ExpressionAttributeNames={'#status': 'status', '#date': 'date'},
+            ExpressionAttributeValues={
+                ':processing': 'PROCESSING',
+                ':failed': 'FAILED',
+                ':rejected': 'REJECTED',
+                ':file_name': object_key,
+                ':date': date,
+                ':lecture': lecture,
+                ':started_at': datetime.utcnow().isoformat() + 'Z',
+                ':lease': now + UPLOAD_LEASE_SECONDS,
+                ':now': now
+            },
+            ReturnValues='ALL_NEW'
+        )
+        return response['Attributes']
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+            raise
+    return None
+
+def mark_latest_upload(scope_key, ledger_item, content_key, object_key):
+    """
+    Point the date/lecture/target class at this upload, unless an upload
+    started later already took over (e.g. when an older upload resumes).
+    """
+    try:
+        get_table(PROCESSED_UPLOADS_TABLE).update_item(
+            Key={'upload_key': scope_key},
+            UpdateExpression=('SET ledger_key = :ledger_key, content_key = :content_key, '
+                              'object_key = :object_key, started_at = :started_at'),
+            ConditionExpression='attribute_not_exists(started_at) OR started_at <= :started_at',
+            ExpressionAttributeValues={
+                ':ledger_key': ledger_item['upload_key'],
+                ':content_key': content_key,
+                ':object_key': object_key,
+                ':started_at': ledger_item['started_at']
+            }
+        )
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+            print(f"Error updating latest upload {scope_key}: {str(e)}")
+
+def record_duplicate_upload(upload_key, object_key, date, lecture):
+    """Record a skipped duplicate so the upload status endpoint can report it."""
     try:
-        response = entry_log_table.scan(
-            FilterExpression='#date = :date_val',
-            ExpressionAttributeNames={'#date': 'date'},
-            ExpressionAttributeValues={':date_val': date}
+        get_table(PROCESSED_UPLOADS_TABLE).put_item(Item={
+            'upload_key': f"duplicate#{object_key}",
+            'file_name': object_key,
+            'date': date,
+            'lecture': lecture,
+            'status': 'DUPLICATE',
+            'duplicate_of': upload_key,
+            'finished_at': datetime.utcnow().isoformat() + 'Z'
+        })
+    except ClientError as e:
+        print(f"Error recording duplicate upload {object_key}: {str(e)}")
+
+def reject_upload(upload_key, object_key, date, lecture, reason):
+    """
+    Record an unusable upload (wrong template, no rows, ...) as REJECTED so
+    the upload status endpoint can report the reason.
+    """
+    print(f"Rejected upload {object_key}: {reason}")
+    if upload_key:
+        release_upload(upload_key, 'REJECTED', error=reason)
+        return
+    # Not claimed yet (multipart upload rejected before its content hash is known)
+    try:
+        get_table(PROCESSED_UPLOADS_TABLE).put_item(Item={
+            'upload_key': f"rejected#{object_key}",
+            'file_name': object_key,
+            'date': date,
+            'lecture': lecture,
+            'status': 'REJECTED',
+            'error_message': reason,
+            'finished_at': datetime.utcnow().isoformat() + 'Z'
+        })
+    except ClientError as e:
+        print(f"Error recording rejected upload {object_key}: {str(e)}")
+
+def update_upload_progress(upload_key, **fields):
+    """Update checkpoint/progress fields of a claimed upload."""
+    if not upload_key or not fields:
+        return
+    names = {f"#{name}": name for name in fields}
+    values = {f":{name}": value for name, value in fields.items()}
+    try:
+        get_table(PROCESSED_UPLOADS_TABLE).update_item(
+            Key={'upload_key': upload_key},
+            UpdateExpression='SET ' + ', '.join(f"#{name} = :{name}" for name in fields),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values
+        )
+    except ClientError as e:
+        print(f"Error updating upload progress for {upload_key}: {str(e)}")
+
+def get_upload_checkpoint(upload_key):
+    """Fetch a ledger/checkpoint item, or an empty dict if it does not exist yet."""
+    try:
+        response = get_table(PROCESSED_UPLOADS_TABLE).get_item(Key={'upload_key': upload_key})
+        return response.get('Item', {})
+    except ClientError as e:
+        print(f"Error fetching upload checkpoint {upload_key}: {str(e)}")
+        return {}
+
+def release_upload(upload_key, status, records_processed=None, error=None):
+    """Record the final status of a claimed upload in the ledger."""
+    if not upload_key:
+        return
+    update_expression = 'SET #status = :status, finished_at = :finished_at'
+    values = {':status': status, ':finished_at': datetime.utcnow().isoformat() + 'Z'}
+    if records_processed is not None:
+        update_expression += ', records_processed = :records_processed'
+        values[':records_processed'] = records_processed
+    if error:
+        update_expression += ', error_message = :error'
+        values[':error'] = error
+    update_expression += ' REMOVE lease_expires_at'
+    try:
+        get_table(PROCESSED_UPLOADS_TABLE).update_item(
+            Key={'upload_key': upload_key},
+            UpdateExpression=update_expression,
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues=values
         )
-        return response.get('Items', [])
     except ClientError as e:
-        print(f"Error fetching entry logs: {str(e)}")
-        return []
+        print(f"Error updating upload ledger for {upload_key}: {str(e)}")
+
+# Fields that define an attendance record's content; bookkeeping fields such
+# as processed_at and uploaded_file do not make a record "changed"
+ATTENDANCE_DIFF_FIELDS = ('student_id', 'rfid_uid', 'date', 'lecture', 'status')
+
+def fetch_attendance_for_lecture(date, lecture):
+    """Fetch the stored Final_Attendance records for a date and lecture via the date index."""
+    try:
+        records = []
+        last_evaluated_key = None
+        while True:
+            query_kwargs = {
+                'IndexName': 'date-index',
+                'KeyConditionExpression': '#date = :date_val',
+                'FilterExpression': 'lecture = :lecture',
+                'ExpressionAttributeNames': {'#date': 'date'},
+                'ExpressionAttributeValues': {':date_val': date, ':lecture': lecture}
+            }
+            if last_evaluated_key:
+                query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+            
+            response = get_table(FINAL_ATTENDANCE_TABLE).query(**query_kwargs)
+            records.extend(response.get('Items', []))
+            
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            if not last_evaluated_key:
+                break
+        return records
+    except ClientError as e:
+        print(f"Error fetching existing attendance for {date}/{lecture}: {str(e)}")
+        raise
+
+def changed_records(existing_by_id, new_records):
+    """Return the new records that are missing from, or differ from, the stored ones."""
+    to_write = {}
+    for record in new_records:
+        existing = existing_by_id.get(record['attendance_id'])
+        if existing is None or any(existing.get(f) != record.get(f) for f in ATTENDANCE_DIFF_FIELDS):
+            to_write[record['attendance_id']] = record
+    return list(to_write.values())
+
+def write_attendance_changes(to_write, to_delete, log_records=True):
+    """Apply an attendance diff with batched writes (25 items per BatchWriteItem)."""
+    with get_table(FINAL_ATTENDANCE_TABLE).batch_writer(overwrite_by_pkeys=['attendance_id']) as batch:
+        for record in to_write:
+            # Convert Python types to DynamoDB-compatible types
+            batch.put_item(Item=json.loads(json.dumps(record), parse_float=Decimal))
+        for attendance_id in to_delete:
+            batch.delete_item(Key={'attendance_id': attendance_id})
+    
+    if not log_records:
+        return
+    for record in to_write:
+        print(f"✅ Stored record {record['attendance_id']} with date: {record.get('date')}, status: {record.get('status')}")
+    for attendance_id in to_delete:
+        print(f"🗑️ Deleted record {attendance_id} (no longer in upload)")
+
+def summary_deltas(existing_by_id, to_write, to_delete):
+    """
+    Changes of the per-student counters caused by an attendance diff:
+    {student_id: {lecture: [present_delta, total_delta]}}.
+    """
+    deltas = {}
+    def add(record, sign):
+        counts = deltas.setdefault(record['student_id'], {}).setdefault(record['lecture'], [0, 0])
+        counts[0] += sign if record.get('status') == 'Present' else 0
+        counts[1] += sign
+    
+    for record in to_write:
+        existing = existing_by_id.get(record['attendance_id'])
+        if existing:
+            add(existing, -1)
+        add(record, 1)
+    for attendance_id in to_delete:
+        add(existing_by_id[attendance_id], -1)
+    
+    return {
+        student_id: {lecture: counts for lecture, counts in by_lecture.items() if counts != [0, 0]}
+        for student_id, by_lecture in deltas.items()
+        if any(counts != [0, 0] for counts in by_lecture.values())
+    }
+
+def update_student_summaries(deltas, student_id_to_info):
+    """
+    Apply counter deltas to Student_Attendance_Summary with atomic ADD updates
+    (one UpdateItem per student). Overall counters are 'present'/'total',
+    per-subject counters 'present#<lecture>'/'total#<lecture>'.
+    """
+    now = datetime.utcnow().isoformat() + 'Z'
+    for student_id, by_lecture in deltas.items():
+        info = student_id_to_info.get(student_id, {})
+        names = {'#present': 'present', '#total': 'total', '#department': 'department',
+                 '#year': 'year', '#division': 'division', '#class_key': 'class_key'}
+        values = {
+            ':present': sum(counts[0] for counts in by_lecture.values()),
+            ':total': sum(counts[1] for counts in by_lecture.values()),
+            ':department': info.get('department') or 'Unknown',
+            ':year': str(info.get('year') or 'Unknown'),
+            ':division': info.get('division') or 'Unknown',
+            ':now': now
+        }
+        values[':class_key'] = f"{values[':department']}#{values[':year']}#{values[':division']}"
+        add_clauses = ['#present :present', '#total :total']
+        for i, (lecture, counts) in enumerate(sorted(by_lecture.items())):
+            names[f'#lp{i}'] = f"present#{lecture}"
+            names[f'#lt{i}'] = f"total#{lecture}"
+            values[f':lp{i}'] = counts[0]
+            values[f':lt{i}'] = counts[1]
+            add_clauses.extend([f'#lp{i} :lp{i}', f'#lt{i} :lt{i}'])
+        if info.get('name'):
+            names['#name'] = 'name'
+            values[':name'] = info['name']
+        
+        set_clauses = ['#department = :department', '#year = :year', '#division = :division',
+                       '#class_key = :class_key', 'updated_at = :now']
+        if ':name' in values:
+            set_clauses.append('#name = :name')
+        try:
+            get_table(STUDENT_SUMMARY_TABLE).update_item(
+                Key={'student_id': student_id},
+                UpdateExpression='ADD ' + ', '.join(add_clauses) + ' SET ' + ', '.join(set_clauses),
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values
+            )
+        except ClientError as e:
+            print(f"Error updating attendance summary of {student_id}: {str(e)}")
+
+def bump_date_version(date):
+    """
+    Increment the data version of a date in Analytics_State, so analytics
+    indexes built from Final_Attendance know the day has to be recounted.
+    """
+    try:
+        get_table(ANALYTICS_STATE_TABLE).update_item(
+            Key={'state_key': 'date_versions'},
+            UpdateExpression='ADD #date :one',
+            ExpressionAttributeNames={'#date': f"d#{date}"},
+            ExpressionAttributeValues={':one': 1}
+        )
+    except ClientError as e:
+        print(f"Error updating analytics date version for {date}: {str(e)}")
+
+class EntryLogsUnavailable(Exception):
+    """The entry logs of a date cannot be read, so it must not be reconciled."""
+
+def fetch_entry_logs_for_date(date):
+    """
+    Fetch all entry logs for a specific date: every date-index page of
+    Entry_Log, plus the S3 archive for dates past the retention window
+    (archived logs are deleted from Entry_Log by TTL). Raises rather than
+    returning partial logs, since reconciling against missing logs would
+    turn every Present into Proxy and drop the Bunk records.
+    """
+    logs = {}
+    try:
+        last_evaluated_key = None
+        while True:
+            query_kwargs = {
+                'IndexName': 'date-index',
+                'KeyConditionExpression': '#date = :date_val',
+                'ExpressionAttributeNames': {'#date': 'date'},
+                'ExpressionAttributeValues': {':date_val': date}
+            }
+            if last_evaluated_key:
+                query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+            
+            response = get_table(ENTRY_LOG_TABLE).query(**query_kwargs)
+            for log in response.get('Items', []):
+                logs[log['log_id']] = log
+            
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            if not last_evaluated_key:
+                break
+    except ClientError as e:
+        print(f"Error fetching entry logs for {date}: {str(e)}")
+        raise
+    
+    # Use IST date (UTC + 5.5 hours) like the archive job
+    ist_now = datetime.utcnow() + timedelta(hours=5, minutes=30)
+    cutoff_date = (ist_now - timedelta(days=RETENTION_DAYS)).strftime('%Y-%m-%d')
+    if date < cutoff_date:
+        archived = read_archived_entry_logs(date)
+        # Logs still in Entry_Log without an archive were never archived (and never expired)
+        if archived is None and not logs:
+            raise EntryLogsUnavailable(
+                f"Entry logs of {date} are past the {RETENTION_DAYS}-day retention window and "
+                f"s3://{ARCHIVE_BUCKET_NAME}/{archive_key_for_date(date)} does not exist")
+        for log in archived or []:
+            logs.setdefault(log['log_id'], log)
+        print(f"Read {len(archived or [])} archived entry logs for {date}")
+    
+    return list(logs.values())
+
+def archive_key_for_date(date):
+    """Return the S3 key of the entry log archive object for a date (YYYY-MM-DD)."""
+    return f"{ARCHIVE_PREFIX}date={date}/entry_logs.jsonl.gz"
+
+def read_archived_entry_logs(date):
+    """Read the archived entry logs of a date, or None if there is no archive object."""
+    try:
+        response = get_s3_client().get_object(Bucket=ARCHIVE_BUCKET_NAME, Key=archive_key_for_date(date))
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+            return None
+        print(f"Error reading archived entry logs for {date}: {str(e)}")
+        raise
+    
+    with gzip.GzipFile(fileobj=response['Body'], mode='rb') as archive:
+        return [json.loads(line) for line in archive if line.strip()]
+
+def load_student_directory():
+    """Fetch Student_Master once and index it by student_id and rfid_uid."""
+    all_students = fetch_all_students()
+    student_id_to_info = {s['student_id']: s for s in all_students}
+    rfid_to_student_info = {s['rfid_uid']: s for s in all_students}
+    return all_students, student_id_to_info, rfid_to_student_info
+
+def get_roster_from_metadata(metadata):
+    """Return the (department, year, division) target roster from S3 object metadata, or None."""
+    department = (metadata.get('department') or '').strip()
+    year = (metadata.get('year') or '').strip()
+    division = (metadata.get('division') or '').strip()
+    if not (department and year and division):
+        return None
+    return (department, year, division)
+
+def get_roster_index(all_students):
+    """
+    Return the division roster index: (department, year, division) -> sorted
+    tuple of student_ids. Built from Student_Master once and cached for the
+    life of the container (refreshed after ROSTER_CACHE_TTL_SECONDS).
+    """
+    global _roster_index, _roster_index_built_at
+    
+    if _roster_index is not None and time.time() - _roster_index_built_at < ROSTER_CACHE_TTL_SECONDS:
+        return _roster_index
+    
+    rosters = {}
+    for student in all_students:
+        key = (str(student.get('department', '')).strip(),
+               str(student.get('year', '')).strip(),
+               str(student.get('division', '')).strip())
+        rosters.setdefault(key, []).append(student['student_id'])
+    
+    _roster_index = {key: tuple(sorted(ids)) for key, ids in rosters.items()}
+    _roster_index_built_at = time.time()
+    print(f"Built roster index: {len(_roster_index)} divisions, {len(all_students)} students")
+    return _roster_index
+
+def roster_contains(roster_ids, student_id):
+    """Binary search membership test on a sorted roster tuple."""
+    if not student_id:
+        return False
+    i = bisect_left(roster_ids, student_id)
+    return i < len(roster_ids) and roster_ids[i] == student_id
+
+def in_delete_scope(record, roster_ids, object_key):
+    """
+    Whether an upload may delete a stored record of its date and lecture that
+    it no longer produces. With a target class, records of that division's
+    students. Without one the division is unknown (lecture names are shared
+    across divisions), so only records written by this same file, e.g. when
+    it is processed again.
+    """
+    if roster_ids is None:
+        return record.get('uploaded_file') == object_key
+    return roster_contains(roster_ids, record.get('student_id'))
 
 def fetch_all_students():
-    """Fetch all students from Student_Master table."""
+    """Fetch all students from Student_Master table with pagination."""
     try:
-        response = student_master_table.scan()
-        return response.get('Items', [])
+        all_students = []
+        last_evaluated_key = None
+        
+        # Scan with pagination so rosters are complete
+        while True:
+            if last_evaluated_key:
+                response = get_table(STUDENT_MASTER_TABLE).scan(ExclusiveStartKey=last_evaluated_key)
+            else:
+                response = get_table(STUDENT_MASTER_TABLE).scan()
+            
+            all_students.extend(response.get('Items', []))
+            
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            if not last_evaluated_key:
+                break
+        
+        return all_students
     except ClientError as e:
         print(f"Error fetching students: {str(e)}")
         return []
\ No newline at end of file
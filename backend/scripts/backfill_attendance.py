@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Recompute Final_Attendance for a date range from the uploads already in S3.
+Uses the reconciliation code of process_attendance_upload, so a fix to
+Student_Master data or to the reconciliation rules can be applied to
+historical days without re-uploading files.
+
+Uploads are enumerated in S3 (or read from a local directory), their
+identifiers are loaded from the parsed-upload sidecars (or parsed and the
+sidecars written), each day is reconciled on a process pool that shares one
+Student_Master snapshot, and only changed records are written with batched,
+rate-limited writes.
+
+With --rebuild-summaries, Student_Attendance_Summary is instead rebuilt
+from all of Final_Attendance (e.g. to seed it for data stored before the
+summary table existed).
+
+Usage: python scripts/backfill_attendance.py --start-date 2025-11-01 --end-date 2025-11-30 [options]
+       python scripts/backfill_attendance.py --rebuild-summaries [--dry-run]
+Example (local files, DynamoDB Local, no writes):
+  AWS_ENDPOINT_URL_DYNAMODB=http://localhost:8000 \\
+  python scripts/backfill_attendance.py --start-date 2025-11-01 --end-date 2025-11-07 --local-dir ./uploads --dry-run
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'lambdas'))
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'python'))
+
+import process_attendance_upload as upload_processing  # noqa: E402
+
+UPLOAD_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+WRITE_BATCH_SIZE = 25
+
+class RateLimiter:
+    """Token bucket limiting write units per second (0 disables limiting)."""
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def acquire(self, units):
+        if not self.rate:
+            return
+        while True:
+            now = time.monotonic()
+            # Allow bursts of one batch even when the rate is below the batch size
+            capacity = max(self.rate, units)
+            self.tokens = min(capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= units:
+                self.tokens -= units
+                return
+            time.sleep((units - self.tokens) / self.rate)
+
+def list_s3_uploads(bucket_name, prefix, start_date, end_date):
+    """List uploads in S3 whose file name date is within the range."""
+    s3_client = upload_processing.get_s3_client()
+    paginator = s3_client.get_paginator('list_objects_v2')
+    uploads = []
+    # Keys from generate_presigned_url start with uploads/<date>_, so the
+    # listing can start at the first day of the range
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix, StartAfter=f"{prefix}{start_date}"):
+        for obj in page.get('Contents', []):
+            key = obj['Key']
+            if not key.endswith(UPLOAD_EXTENSIONS):
+                continue
+            date = upload_processing.extract_date_from_filename(key)
+            if date and start_date <= date <= end_date:
+                uploads.append({
+                    'object_key': key,
+                    'etag': obj.get('ETag', '').strip('"'),
+                    'date': date,
+                    'last_modified': obj.get('LastModified')
+                })
+    return uploads
+
+def list_local_uploads(local_dir, prefix, start_date, end_date):
+    """List uploads in a local directory (stand-in for the S3 bucket)."""
+    uploads = []
+    for filename in sorted(os.listdir(local_dir)):
+        if not filename.endswith(UPLOAD_EXTENSIONS):
+            continue
+        key = f"{prefix}{filename}"
+        date = upload_processing.extract_date_from_filename(key)
+        if date and start_date <= date <= end_date:
+            path = os.path.join(local_dir, filename)
+            uploads.append({
+                'object_key': key,
+                'path': path,
+                'date': date,
+                'last_modified': os.path.getmtime(path)
+            })
+    return uploads
+
+def load_upload(upload, bucket_name, write_sidecars):
+    """Return (sheets, roster) of an upload, from its sidecar when possible."""
+    object_key = upload['object_key']
+
+    if 'path' in upload:
+        with open(upload['path'], 'rb') as f:
+            if object_key.endswith('.csv'):
+                return [(None, *upload_processing.read_csv_identifiers(f, hashlib.sha256()))], None
+            return upload_processing.read_excel_sheets(f.read()), None
+
+    parsed = upload_processing.load_parsed_upload(bucket_name, object_key, upload['etag'])
+    if parsed:
+        header, sheets = parsed
+        return sheets, tuple(header['roster']) if header.get('roster') else None
+
+    response = upload_processing.get_s3_client().get_object(Bucket=bucket_name, Key=object_key)
+    roster = upload_processing.get_roster_from_metadata(response.get('Metadata') or {})
+    content_hash = hashlib.sha256()
+    if object_key.endswith('.csv'):
+        sheets = [(None, *upload_processing.read_csv_identifiers(response['Body'], content_hash))]
+    else:
+        file_content = response['Body'].read()
+        content_hash.update(file_content)
+        sheets = upload_processing.read_excel_sheets(file_content)
+
+    if write_sidecars:
+        upload_processing.write_parsed_upload(bucket_name, object_key, {
+            'etag': upload['etag'],
+            'sha256': content_hash.hexdigest(),
+            'date': upload['date'],
+            'lecture': upload_processing.extract_lecture_from_filename(object_key),
+            'roster': list(roster) if roster else None
+        }, sheets)
+    return sheets, roster
+
+def lookup_ledger_lecture(object_key):
+    """Lecture name the original processing stored for a file without one in its name."""
+    try:
+        response = upload_processing.get_table(upload_processing.PROCESSED_UPLOADS_TABLE).query(
+            IndexName='file-name-index',
+            KeyConditionExpression='file_name = :file_name',
+            ExpressionAttributeValues={':file_name': object_key}
+        )
+    except upload_processing.ClientError as e:
+        print(f"Error looking up ledger lecture for {object_key}: {str(e)}")
+        return None
+    lectures = [item.get('lecture') for item in response.get('Items', []) if item.get('status') == 'COMPLETED']
+    return lectures[0] if lectures else None
+
+def build_units(upload, sheets, roster):
+    """Split an upload into (date, lecture) units the same way process_upload does."""
+    sheets = [sheet for sheet in sheets if sheet[1]]
+    if not sheets:
+        print(f"Skipping {upload['object_key']}: no identifier column")
+        return []
+
+    if len(sheets) > 1:
+        lectures = [title for title, _, _ in sheets]
+    else:
+        lecture = (upload_processing.extract_lecture_from_filename(upload['object_key'])
+                   or lookup_ledger_lecture(upload['object_key']))
+        if not lecture:
+            print(f"Skipping {upload['object_key']}: lecture name unknown")
+            return []
+        lectures = [lecture]
+
+    return [{
+        'object_key': upload['object_key'],
+        'date': upload['date'],
+        'lecture': lecture,
+        'id_kind': id_kind,
+        'identifiers': identifiers,
+        'roster': roster,
+        'last_modified': upload['last_modified']
+    } for lecture, (_, id_kind, identifiers) in zip(lectures, sheets)]
+
+# Per-process Student_Master snapshot for the reconciliation pool
+_worker_directory = None
+
+def _init_worker(directory):
+    global _worker_directory
+    _worker_directory = directory
+
+def _reconcile_day(task):
+    """Reconcile every unit of one day (runs in a worker process, no I/O)."""
+    date, entry_logs, units = task
+    all_students, student_id_to_info, rfid_to_student_info = _worker_directory
+    entry_rfid_uids = set(log['rfid_uid'] for log in entry_logs)
+
+    results = []
+    for unit in units:
+        lecture = unit['lecture']
+        records = upload_processing.reconcile_identifiers(
+            unit['identifiers'], unit['id_kind'], student_id_to_info, rfid_to_student_info,
+            entry_rfid_uids, date, lecture, unit['object_key'])
+        excel_student_ids = upload_processing.resolve_student_ids(
+            unit['identifiers'], unit['id_kind'], rfid_to_student_info)
+        roster_ids = None
+        if unit['roster']:
+            roster_ids = upload_processing.get_roster_index(all_students).get(tuple(unit['roster']), ())
+        records.extend(upload_processing.build_tail_records(
+            entry_logs, excel_student_ids, student_id_to_info, roster_ids, date, lecture, unit['object_key']))
+        results.append((date, lecture, unit['object_key'], records, roster_ids))
+    return results
+
+def write_unit(date, lecture, object_key, records, roster_ids, student_id_to_info, limiter, dry_run):
+    """Diff one lecture against Final_Attendance and write the changes. Returns (written, deleted)."""
+    existing_by_id = {r['attendance_id']: r for r in upload_processing.fetch_attendance_for_lecture(date, lecture)}
+    keep_ids = set(record['attendance_id'] for record in records)
+    to_write = upload_processing.changed_records(existing_by_id, records)
+    # Like process_attendance_upload: only the target class's records (or
+    # without one, this file's records) are replaced
+    to_delete = [attendance_id for attendance_id, record in existing_by_id.items()
+                 if attendance_id not in keep_ids
+                 and upload_processing.in_delete_scope(record, roster_ids, object_key)]
+
+    if not dry_run:
+        for i in range(0, len(to_write), WRITE_BATCH_SIZE):
+            batch = to_write[i:i + WRITE_BATCH_SIZE]
+            limiter.acquire(len(batch))
+            upload_processing.write_attendance_changes(batch, [], log_records=False)
+        for i in range(0, len(to_delete), WRITE_BATCH_SIZE):
+            batch = to_delete[i:i + WRITE_BATCH_SIZE]
+            limiter.acquire(len(batch))
+            upload_processing.write_attendance_changes([], batch, log_records=False)
+        # Keep the per-student counters of Student_Attendance_Summary in step
+        deltas = upload_processing.summary_deltas(existing_by_id, to_write, to_delete)
+        limiter.acquire(len(deltas))
+        upload_processing.update_student_summaries(deltas, student_id_to_info)
+        if to_write or to_delete:
+            upload_processing.bump_date_version(date)
+    return len(to_write), len(to_delete)
+
+def summary_item(student_id, by_lecture, info, now):
+    """Student_Attendance_Summary item with the counters update_student_summaries maintains."""
+    department = info.get('department') or 'Unknown'
+    year = str(info.get('year') or 'Unknown')
+    division = info.get('division') or 'Unknown'
+    item = {
+        'student_id': student_id,
+        'present': sum(counts[0] for counts in by_lecture.values()),
+        'total': sum(counts[1] for counts in by_lecture.values()),
+        'department': department,
+        'year': year,
+        'division': division,
+        'class_key': f"{department}#{year}#{division}",
+        'updated_at': now
+    }
+    for lecture, counts in by_lecture.items():
+        item[f"present#{lecture}"] = counts[0]
+        item[f"total#{lecture}"] = counts[1]
+    if info.get('name'):
+        item['name'] = info['name']
+    return item
+
+def scan_items(table, kwargs):
+    """Yield every item of a paginated scan."""
+    while True:
+        response = table.scan(**kwargs)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def rebuild_summaries(student_id_to_info, limiter, dry_run):
+    """
+    Recompute Student_Attendance_Summary from all of Final_Attendance, writing
+    absolute counters instead of deltas and deleting summaries of students
+    without records. Uploads processed meanwhile would be overwritten, so run
+    it while no uploads are being processed. Returns (written, deleted).
+    """
+    counters = {}
+    attendance_table = upload_processing.get_table(upload_processing.FINAL_ATTENDANCE_TABLE)
+    for record in scan_items(attendance_table, {'ProjectionExpression': 'student_id, lecture, #status',
+                                               'ExpressionAttributeNames': {'#status': 'status'}}):
+        if not record.get('student_id') or not record.get('lecture'):
+            continue
+        counts = counters.setdefault(record['student_id'], {}).setdefault(record['lecture'], [0, 0])
+        counts[0] += 1 if record.get('status') == 'Present' else 0
+        counts[1] += 1
+
+    summary_table = upload_processing.get_table(upload_processing.STUDENT_SUMMARY_TABLE)
+    stale_ids = [item['student_id'] for item in scan_items(summary_table, {'ProjectionExpression': 'student_id'})
+                 if item['student_id'] not in counters]
+
+    if not dry_run:
+        now = datetime.utcnow().isoformat() + 'Z'
+        with summary_table.batch_writer() as batch:
+            for student_id, by_lecture in counters.items():
+                limiter.acquire(1)
+                batch.put_item(Item=summary_item(student_id, by_lecture, student_id_to_info.get(student_id, {}), now))
+            for student_id in stale_ids:
+                limiter.acquire(1)
+                batch.delete_item(Key={'student_id': student_id})
+    return len(counters), len(stale_ids)
+
+def main():
+    parser = argparse.ArgumentParser(description='Recompute Final_Attendance for a date range.')
+    parser.add_argument('--start-date', help='First date (YYYY-MM-DD)')
+    parser.add_argument('--end-date', help='Last date (YYYY-MM-DD)')
+    parser.add_argument('--bucket', default=os.environ.get('UPLOAD_BUCKET_NAME'), help='Upload bucket (default: $UPLOAD_BUCKET_NAME)')
+    parser.add_argument('--prefix', default='uploads/', help='Key prefix of the uploads')
+    parser.add_argument('--local-dir', help='Read uploads from a local directory instead of S3')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='Reconciliation processes')
+    parser.add_argument('--io-workers', type=int, default=8, help='Threads loading/parsing uploads')
+    parser.add_argument('--max-wcu', type=float, default=25, help='Write units per second (0 = unlimited)')
+    parser.add_argument('--no-sidecars', action='store_true', help='Do not write parsed-upload sidecars')
+    parser.add_argument('--dry-run', action='store_true', help='Compute the diff without writing')
+    parser.add_argument('--rebuild-summaries', action='store_true',
+                        help='Rebuild Student_Attendance_Summary from Final_Attendance instead')
+    args = parser.parse_args()
+
+    if args.rebuild_summaries:
+        started = time.perf_counter()
+        directory = upload_processing.load_student_directory()
+        written, deleted = rebuild_summaries(directory[1], RateLimiter(args.max_wcu), args.dry_run)
+        print(f"{'Dry run: ' if args.dry_run else ''}Rebuilt {written} student summaries, "
+              f"deleted {deleted} stale ones in {time.perf_counter() - started:.1f} s")
+        return
+
+    if not args.start_date or not args.end_date:
+        parser.error('--start-date and --end-date are required unless --rebuild-summaries is given')
+    for value in (args.start_date, args.end_date):
+        datetime.strptime(value, '%Y-%m-%d')
+    if not args.local_dir and not args.bucket:
+        parser.error('--bucket (or UPLOAD_BUCKET_NAME) is required unless --local-dir is given')
+
+    started = time.perf_counter()
+    if args.local_dir:
+        uploads = list_local_uploads(args.local_dir, args.prefix, args.start_date, args.end_date)
+    else:
+        uploads = list_s3_uploads(args.bucket, args.prefix, args.start_date, args.end_date)
+    print(f"Found {len(uploads)} uploads between {args.start_date} and {args.end_date}")
+
+    # Load identifiers (sidecars, or download + parse) on a thread pool
+    write_sidecars = not (args.no_sidecars or args.dry_run)
+    with ThreadPoolExecutor(max_workers=max(1, args.io_workers)) as executor:
+        loaded = list(executor.map(lambda upload: load_upload(upload, args.bucket, write_sidecars), uploads))
+    parsed_at = time.perf_counter()
+
+    # The latest upload of a (date, lecture) wins, like a corrected re-upload
+    # within its target class. Uploads without one cannot be told apart by
+    # division, so each of them is replayed, in upload order.
+    units_by_scope = {}
+    for upload, (sheets, roster) in sorted(zip(uploads, loaded), key=lambda item: item[0]['last_modified']):
+        for unit in build_units(upload, sheets, roster):
+            units_by_scope[(unit['date'], unit['lecture'], roster or unit['object_key'])] = unit
+    units_by_date = {}
+    for unit in sorted(units_by_scope.values(), key=lambda unit: (unit['date'], unit['last_modified'])):
+        units_by_date.setdefault(unit['date'], []).append(unit)
+    rows = sum(len(unit['identifiers']) for unit in units_by_scope.values())
+
+    # One Student_Master snapshot and one entry log fetch per day. Days whose
+    # logs cannot be read (past retention without an archive) are skipped
+    # rather than recomputed against missing logs.
+    directory = upload_processing.load_student_directory()
+    tasks = []
+    skipped_dates = []
+    for date, units in sorted(units_by_date.items()):
+        try:
+            tasks.append((date, upload_processing.fetch_entry_logs_for_date(date), units))
+        except upload_processing.EntryLogsUnavailable as e:
+            print(f"Skipping {date}: {str(e)}")
+            skipped_dates.append(date)
+    fetched_at = time.perf_counter()
+
+    limiter = RateLimiter(args.max_wcu)
+    records_total = written = deleted = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.workers), initializer=_init_worker,
+                             initargs=(directory,)) as executor:
+        for results in executor.map(_reconcile_day, tasks):
+            for date, lecture, object_key, records, roster_ids in results:
+                unit_written, unit_deleted = write_unit(date, lecture, object_key, records, roster_ids, directory[1],
+                                                        limiter, args.dry_run)
+                records_total += len(records)
+                written += unit_written
+                deleted += unit_deleted
+                print(f"{date}/{lecture} ({object_key}): {len(records)} records, "
+                      f"{unit_written} written, {unit_deleted} deleted")
+    finished = time.perf_counter()
+
+    elapsed = finished - started
+    print("")
+    print(f"{'Dry run: ' if args.dry_run else ''}{len(units_by_scope)} lectures on {len(units_by_date)} days "
+          f"from {len(uploads)} uploads in {elapsed:.1f} s")
+    print(f"  load/parse uploads:   {parsed_at - started:.1f} s")
+    print(f"  directory + logs:     {fetched_at - parsed_at:.1f} s")
+    print(f"  reconcile + write:    {finished - fetched_at:.1f} s")
+    print(f"  rows: {rows} ({rows / elapsed:.0f}/s), records: {records_total} ({records_total / elapsed:.0f}/s), "
+          f"written: {written}, deleted: {deleted} ({(written + deleted) / elapsed:.1f} writes/s)")
+    if skipped_dates:
+        print(f"  skipped (entry logs unavailable): {', '.join(skipped_dates)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Build the "reader-core" Lambda layer from the vendored openpyxl in backend/python.
+Attendance ingestion only reads workbooks, so chart, chartsheet, pivot, drawing
+and comment packages are replaced with small stub modules and the builtin named
+styles are cut down to "Normal". An import graph check then verifies that the
+trimmed tree still resolves every import and that
+load_workbook(read_only=True) reads the same rows as the full library.
+
+Usage: python scripts/build_reader_layer.py [--output build/reader-core-layer] [--compile] [--no-zip]
+"""
+
+import argparse
+import ast
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import zipfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DIR = os.path.join(BACKEND_DIR, 'python')
+DEFAULT_OUTPUT_DIR = os.path.join(BACKEND_DIR, 'build', 'reader-core-layer')
+
+# Packages the readers never need; modules still imported by the kept code are stubbed
+STUBBED_PACKAGES = (
+    'openpyxl.chart',
+    'openpyxl.chartsheet',
+    'openpyxl.pivot',
+    'openpyxl.drawing',
+    'openpyxl.comments',
+)
+
+STUB_MODULE = '''# Generated by scripts/build_reader_layer.py - not part of the reader-core layer.
+# Names imported from this module resolve to placeholders that fail on use.
+
+__reader_core_stub__ = True
+
+
+class _UnavailableMeta(type):
+    def __getattr__(cls, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        raise AttributeError(
+            f"{cls.__module__}.{cls.__qualname__}.{name} is not available in the reader-core openpyxl layer"
+        )
+
+    def __call__(cls, *args, **kwargs):
+        raise NotImplementedError(
+            f"{cls.__module__}.{cls.__qualname__} is not available in the reader-core openpyxl layer"
+        )
+
+    def __bool__(cls):
+        return False
+
+
+def __getattr__(name):
+    if name.startswith('__'):
+        raise AttributeError(name)
+    placeholder = _UnavailableMeta(name, (), {'__module__': __name__})
+    globals()[name] = placeholder
+    return placeholder
+'''
+
+BUILTINS_MODULE = '''# Generated by scripts/build_reader_layer.py - reader-core layer.
+# Only the "Normal" builtin named style is kept; it is the default applied
+# to workbooks that do not define any named styles.
+
+from collections import OrderedDict
+
+from .named_styles import NamedStyle
+from openpyxl.xml.functions import fromstring
+
+normal = {normal!r}
+
+styles = OrderedDict(
+    [
+        ('Normal', NamedStyle.from_tree(fromstring(normal))),
+    ]
+)
+'''
+
+def copy_source(output_python_dir):
+    """Copy the vendored packages, skipping caches."""
+    if os.path.exists(output_python_dir):
+        shutil.rmtree(output_python_dir)
+    shutil.copytree(
+        SOURCE_DIR, output_python_dir,
+        ignore=shutil.ignore_patterns('__pycache__', '*.pyc', 'RECORD')
+    )
+
+def module_path(root, module):
+    """Return the file of a module under root (package __init__ or .py), or None."""
+    base = os.path.join(root, *module.split('.'))
+    for candidate in (os.path.join(base, '__init__.py'), base + '.py'):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+def iter_modules(root, package):
+    """Yield (module_name, path) for every module of a package under root."""
+    package_dir = os.path.join(root, package)
+    for dirpath, _, filenames in os.walk(package_dir):
+        for filename in sorted(filenames):
+            if not filename.endswith('.py'):
+                continue
+            rel = os.path.relpath(os.path.join(dirpath, filename), root)[:-3].split(os.sep)
+            if rel[-1] == '__init__':
+                rel = rel[:-1]
+            yield '.'.join(rel), os.path.join(dirpath, filename)
+
+def is_stubbed(module):
+    return any(module == p or module.startswith(p + '.') for p in STUBBED_PACKAGES)
+
+def optional_import_nodes(tree):
+    """Return import nodes guarded by `try: ... except ImportError`."""
+    optional = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Try):
+            continue
+        guarded = any(
+            handler.type is not None and 'ImportError' in ast.dump(handler.type)
+            for handler in node.handlers
+        )
+        if guarded:
+            optional.update(id(child) for stmt in node.body for child in ast.walk(stmt))
+    return optional
+
+def resolve_imports(module, path, tree, include_optional=True):
+    """Return the absolute module names imported by a module (names may be submodules)."""
+    is_package = path.endswith('__init__.py')
+    skipped = set() if include_optional else optional_import_nodes(tree)
+    imported = []
+    for node in ast.walk(tree):
+        if id(node) in skipped:
+            continue
+        if isinstance(node, ast.Import):
+            imported.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                parts = module.split('.')
+                if not is_package:
+                    parts = parts[:-1]
+                parts = parts[:len(parts) - (node.level - 1)]
+                base = '.'.join(parts + ([node.module] if node.module else []))
+            else:
+                base = node.module
+            imported.append(base)
+            imported.extend(f"{base}.{alias.name}" for alias in node.names if alias.name != '*')
+    return imported
+
+def required_stub_modules(root):
+    """Find the stubbed-package modules that kept openpyxl modules import."""
+    required = set()
+    for module, path in iter_modules(root, 'openpyxl'):
+        if is_stubbed(module):
+            continue
+        with open(path, encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename=path)
+        for name in resolve_imports(module, path, tree):
+            if is_stubbed(name) and module_path(root, name):
+                required.add(name)
+    # Parent packages must exist for their submodules to import
+    for name in list(required):
+        parts = name.split('.')
+        for i in range(2, len(parts)):
+            required.add('.'.join(parts[:i]))
+    return required
+
+def write_stubs(root, required):
+    """Replace the stubbed packages with stub modules for the required names only."""
+    for package in STUBBED_PACKAGES:
+        package_dir = os.path.join(root, *package.split('.'))
+        if os.path.isdir(package_dir):
+            shutil.rmtree(package_dir)
+
+    for name in sorted(required | set(STUBBED_PACKAGES)):
+        package_dir = os.path.join(root, *name.split('.'))
+        is_package = name in STUBBED_PACKAGES or any(r.startswith(name + '.') for r in required)
+        if is_package:
+            os.makedirs(package_dir, exist_ok=True)
+            path = os.path.join(package_dir, '__init__.py')
+        else:
+            os.makedirs(os.path.dirname(package_dir), exist_ok=True)
+            path = package_dir + '.py'
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(STUB_MODULE)
+
+def trim_builtin_styles(root):
+    """Keep only the "Normal" builtin named style."""
+    path = os.path.join(root, 'openpyxl', 'styles', 'builtins.py')
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    normal = next(
+        node.value.value for node in tree.body
+        if isinstance(node, ast.Assign) and any(getattr(t, 'id', None) == 'normal' for t in node.targets)
+    )
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(BUILTINS_MODULE.format(normal=normal))
+
+# Source patches applied to kept modules: (file, original, replacement)
+SOURCE_PATCHES = (
+    (
+        os.path.join('openpyxl', 'reader', 'excel.py'),
+        """            if "chartsheet" in rel.Type:
+                self.read_chartsheet(sheet, rel)
+                continue
+""",
+        """            if "chartsheet" in rel.Type:
+                # reader-core layer: chartsheets hold no cell data and are skipped
+                continue
+""",
+    ),
+)
+
+def apply_source_patches(root):
+    """Patch kept modules that would otherwise reach stubbed code while reading."""
+    for relative_path, original, replacement in SOURCE_PATCHES:
+        path = os.path.join(root, relative_path)
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        if original not in source:
+            raise RuntimeError(f"Patch for {relative_path} no longer applies; update SOURCE_PATCHES")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(source.replace(original, replacement))
+
+def check_import_graph(root):
+    """Return unresolved openpyxl/et_xmlfile imports in the trimmed tree."""
+    missing = []
+    for package in ('openpyxl', 'et_xmlfile'):
+        for module, path in iter_modules(root, package):
+            with open(path, encoding='utf-8') as f:
+                tree = ast.parse(f.read(), filename=path)
+            for name in resolve_imports(module, path, tree, include_optional=False):
+                if name.split('.')[0] not in ('openpyxl', 'et_xmlfile') or is_stubbed(name):
+                    continue
+                # "from pkg import name" may import an attribute rather than a module
+                if not module_path(root, name) and not module_path(root, name.rsplit('.', 1)[0]):
+                    missing.append(f"{module}: {name}")
+    return sorted(set(missing))
+
+# Runs under the full vendored library: writes the sample workbooks
+SAMPLE_WRITER = '''
+import sys
+from openpyxl import Workbook
+from openpyxl.chart import BarChart, Reference
+from openpyxl.comments import Comment
+
+plain, rich = sys.argv[1], sys.argv[2]
+
+wb = Workbook()
+ws = wb.active
+ws.title = "Attendance"
+ws.append(["CSE 3rd year - Lecture 2"])
+ws.append([])
+ws.append(["Student ID", "Name", "RFID UID"])
+for i in range(1, 201):
+    ws.append([f"STU{i:03d}", f"Student {i}", f"{i:08X}"])
+wb.save(plain)
+
+ws["A3"].comment = Comment("Roll numbers", "Faculty")
+ws.merge_cells("A1:C1")
+stats = wb.create_sheet("Stats")
+for i in range(1, 6):
+    stats.append([i, i * i])
+chart = BarChart()
+chart.add_data(Reference(stats, min_col=2, min_row=1, max_row=5))
+stats.add_chart(chart, "D2")
+wb.create_chartsheet("Chart").add_chart(BarChart())
+wb.save(rich)
+'''
+
+# Runs under a given layer: reads every sheet read-only and reports rows + stubs
+SAMPLE_READER = '''
+import json
+import sys
+from openpyxl import load_workbook
+
+result = {}
+for path in sys.argv[1:]:
+    wb = load_workbook(path, read_only=True, data_only=True)
+    result[path] = {
+        ws.title: [list(row) for row in ws.iter_rows(values_only=True)]
+        for ws in wb.worksheets
+    }
+    wb.close()
+
+stubs = sorted(name for name, module in sys.modules.items()
+               if getattr(module, '__reader_core_stub__', False))
+print(json.dumps({'rows': result, 'stubs': stubs}))
+'''
+
+def run_with_layer(layer_dir, code, *args):
+    """Run code in an isolated interpreter that only sees the given layer directory."""
+    bootstrap = f"import sys; sys.path.insert(0, {layer_dir!r}); exec(compile({code!r}, '<layer-check>', 'exec'))"
+    return subprocess.run(
+        [sys.executable, '-I', '-c', bootstrap, *args],
+        capture_output=True, text=True
+    )
+
+def check_read_only_load(layer_dir):
+    """Compare read-only workbook loading between the full and the trimmed tree."""
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = os.path.join(tmp, 'plain.xlsx')
+        rich = os.path.join(tmp, 'rich.xlsx')
+        result = run_with_layer(SOURCE_DIR, SAMPLE_WRITER, plain, rich)
+        if result.returncode != 0:
+            return [f"could not write sample workbooks: {result.stderr.strip().splitlines()[-1]}"]
+
+        problems = []
+        outputs = {}
+        for label, directory in (('full', SOURCE_DIR), ('trimmed', layer_dir)):
+            result = run_with_layer(directory, SAMPLE_READER, plain, rich)
+            if result.returncode != 0:
+                problems.append(f"{label} layer failed to read samples: {result.stderr.strip().splitlines()[-1]}")
+                continue
+            outputs[label] = json.loads(result.stdout)
+
+        if len(outputs) == 2:
+            # The rich sample has comments, merged cells, a chart and a chartsheet
+            for path in (plain, rich):
+                if outputs['full']['rows'][path] != outputs['trimmed']['rows'][path]:
+                    problems.append(f"trimmed layer read different rows from {os.path.basename(path)}")
+            if not outputs['trimmed']['stubs']:
+                problems.append("no stub modules were loaded; stubbing is not in effect")
+        return problems
+
+def measure_import_ms(layer_dir, runs=5):
+    """Median time to import load_workbook from a layer, in milliseconds."""
+    code = "import time; t = time.perf_counter(); from openpyxl import load_workbook; print((time.perf_counter() - t) * 1000)"
+    timings = []
+    for _ in range(runs):
+        result = run_with_layer(layer_dir, code)
+        if result.returncode == 0:
+            timings.append(float(result.stdout.strip()))
+    return round(statistics.median(timings), 1) if timings else None
+
+def tree_stats(directory):
+    """Return (file count, total bytes) of a directory."""
+    files = 0
+    size = 0
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames[:] = [d for d in dirnames if d != '__pycache__']
+        for filename in filenames:
+            if filename.endswith('.pyc'):
+                continue
+            files += 1
+            size += os.path.getsize(os.path.join(dirpath, filename))
+    return files, size
+
+def write_zip(layer_root, zip_path):
+    """Zip the layer with the python/ prefix Lambda layers expect."""
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=9) as archive:
+        for dirpath, _, filenames in os.walk(layer_root):
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                archive.write(path, os.path.relpath(path, layer_root))
+    return os.path.getsize(zip_path)
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the trimmed reader-core openpyxl Lambda layer.')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_DIR, help='Layer output directory')
+    parser.add_argument('--compile', action='store_true',
+                        help='Ship precompiled bytecode (build with the same Python version as the Lambda runtime)')
+    parser.add_argument('--no-zip', action='store_true', help='Skip writing the layer zip')
+    args = parser.parse_args()
+
+    layer_root = os.path.abspath(args.output)
+    layer_python = os.path.join(layer_root, 'python')
+
+    print(f"Building reader-core layer in {layer_root}")
+    copy_source(layer_python)
+    required = required_stub_modules(layer_python)
+    write_stubs(layer_python, required)
+    trim_builtin_styles(layer_python)
+    apply_source_patches(layer_python)
+    print(f"Stubbed {len(required | set(STUBBED_PACKAGES))} modules: {', '.join(sorted(required | set(STUBBED_PACKAGES)))}")
+
+    missing = check_import_graph(layer_python)
+    problems = [f"unresolved import {name}" for name in missing]
+    problems.extend(check_read_only_load(layer_python))
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        sys.exit(1)
+    print("✅ Import graph resolves and load_workbook(read_only=True) matches the full library")
+
+    if args.compile:
+        import compileall
+        compileall.compile_dir(layer_python, quiet=1, optimize=0)
+
+    full_files, full_size = tree_stats(SOURCE_DIR)
+    trimmed_files, trimmed_size = tree_stats(layer_python)
+    print(f"Files: {full_files} -> {trimmed_files}")
+    print(f"Unzipped size: {full_size / 1024:.0f} KB -> {trimmed_size / 1024:.0f} KB")
+    print(f"Import load_workbook: {measure_import_ms(SOURCE_DIR)} ms -> {measure_import_ms(layer_python)} ms")
+
+    if not args.no_zip:
+        zip_path = layer_root.rstrip(os.sep) + '.zip'
+        zip_size = write_zip(layer_root, zip_path)
+        print(f"Layer zip: {zip_path} ({zip_size / 1024:.0f} KB)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Measure the import-time (cold start) cost of every Lambda handler.
+Runs each handler module in a fresh interpreter with `-X importtime`,
+reports the slowest top-level imports and checks the totals against
+the per-function budget in backend/cold_start_budget.json.
+
+Usage: python scripts/measure_cold_start.py [--runs 3] [--top 5] [--json] [function ...]
+Example: python scripts/measure_cold_start.py process_attendance_upload
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAMBDAS_DIR = os.path.join(BACKEND_DIR, 'lambdas')
+LAYER_DIR = os.path.join(BACKEND_DIR, 'python')
+DEFAULT_BUDGET_FILE = os.path.join(BACKEND_DIR, 'cold_start_budget.json')
+
+def discover_functions():
+    """Return the module names of all Lambda handlers."""
+    return sorted(
+        name[:-3] for name in os.listdir(LAMBDAS_DIR)
+        if name.endswith('.py') and not name.startswith('_')
+    )
+
+def run_importtime(statement):
+    """
+    Run a statement in a fresh interpreter with -X importtime.
+    Returns (entries, error) where entries is a list of
+    (module, self_us, cumulative_us, depth) in import order.
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [LAMBDAS_DIR, LAYER_DIR, env.get('PYTHONPATH')]))
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=LAMBDAS_DIR, env=env, capture_output=True, text=True
+    )
+
+    entries = []
+    other_lines = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            other_lines.append(line)
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            depth = (len(name) - len(name.lstrip())) // 2
+            entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+        except ValueError:
+            continue  # header line
+
+    error = None
+    if result.returncode != 0:
+        error = other_lines[-1] if other_lines else f"exit code {result.returncode}"
+    return entries, error
+
+def measure(statement, baseline_modules):
+    """
+    Measure one statement; modules loaded at interpreter startup are ignored.
+    Returns (total_us, top, error) where top lists the modules imported
+    directly by the handler with their cumulative cost.
+    """
+    entries, error = run_importtime(statement)
+    entries = [e for e in entries if e[0] not in baseline_modules]
+    total_us = sum(self_us for _, self_us, _, _ in entries)
+
+    # Direct imports of the measured modules (the handler itself is one level up)
+    min_depth = min((depth for _, _, _, depth in entries), default=0)
+    statement_modules = {part.split()[-1] for part in statement.split(';')}
+    top = [
+        (name, cumulative_us) for name, _, cumulative_us, depth in entries
+        if depth == min_depth + 1 or (depth == min_depth and name not in statement_modules)
+    ]
+    return total_us, top, error
+
+def measure_function(function, budget, runs, top_n, baseline_modules):
+    """Measure the handler import and, if configured, its first-use imports."""
+    totals = []
+    top = []
+    error = None
+    for _ in range(runs):
+        total_us, top, error = measure(f"import {function}", baseline_modules)
+        if error:
+            break
+        totals.append(total_us)
+
+    report = {
+        'function': function,
+        'import_ms': round(statistics.median(totals) / 1000, 1) if totals else None,
+        'budget_ms': budget.get('max_import_ms'),
+        'top_imports': [
+            {'module': name, 'cumulative_ms': round(us / 1000, 1)}
+            for name, us in sorted(top, key=lambda t: t[1], reverse=True)[:top_n]
+        ],
+        'error': error
+    }
+
+    # Deferred imports still cost time on the first request that needs them
+    first_use = budget.get('first_use_imports') or []
+    if first_use and not error:
+        statement = f"import {function}; " + '; '.join(f"import {module}" for module in first_use)
+        first_use_totals = []
+        for _ in range(runs):
+            total_us, _, first_use_error = measure(statement, baseline_modules)
+            if first_use_error:
+                report['first_use_error'] = first_use_error
+                break
+            first_use_totals.append(total_us)
+        if first_use_totals:
+            report['first_use_imports'] = first_use
+            report['first_use_ms'] = round(statistics.median(first_use_totals) / 1000, 1)
+            report['first_use_budget_ms'] = budget.get('max_first_use_ms')
+
+    report['over_budget'] = bool(
+        (report['budget_ms'] is not None and report['import_ms'] is not None
+         and report['import_ms'] > report['budget_ms'])
+        or (report.get('first_use_budget_ms') is not None and report.get('first_use_ms') is not None
+            and report['first_use_ms'] > report['first_use_budget_ms'])
+    )
+    return report
+
+def print_report(report):
+    """Print a human readable report for one function."""
+    if report['error']:
+        print(f"❌ {report['function']}: import failed ({report['error']})")
+        return
+
+    status = '❌ over budget' if report['over_budget'] else '✅'
+    budget = f" / budget {report['budget_ms']} ms" if report['budget_ms'] is not None else ''
+    print(f"{status} {report['function']}: {report['import_ms']} ms{budget}")
+    for entry in report['top_imports']:
+        print(f"     {entry['cumulative_ms']:>8} ms  {entry['module']}")
+
+    if 'first_use_ms' in report:
+        budget = f" / budget {report['first_use_budget_ms']} ms" if report['first_use_budget_ms'] is not None else ''
+        print(f"     first use ({', '.join(report['first_use_imports'])}): {report['first_use_ms']} ms{budget}")
+    elif report.get('first_use_error'):
+        print(f"     first use imports failed: {report['first_use_error']}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure Lambda cold-start import cost.')
+    parser.add_argument('functions', nargs='*', help='Handler modules to measure (default: all)')
+    parser.add_argument('--budget', default=DEFAULT_BUDGET_FILE, help='Budget JSON file')
+    parser.add_argument('--runs', type=int, default=3, help='Runs per function (median is reported)')
+    parser.add_argument('--top', type=int, default=5, help='Number of slowest imports to show')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+
+    budgets = {}
+    if os.path.exists(args.budget):
+        with open(args.budget) as f:
+            budgets = json.load(f).get('functions', {})
+
+    functions = args.functions or discover_functions()
+    baseline_modules = {name for name, _, _, _ in run_importtime('pass')[0]}
+
+    reports = [
+        measure_function(function, budgets.get(function, {}), max(args.runs, 1), args.top, baseline_modules)
+        for function in functions
+    ]
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        for report in reports:
+            print_report(report)
+
+    failed = [r for r in reports if r['over_budget'] or r['error']]
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -18,8 +18,23 @@ ChartJS.register(
   Legend
 )
 
-export default function PerformanceHeatmap({ data }) {
-  if (!data || data.length === 0) {
+// Department x year cells of a get_analytics view=dept_year_matrix response
+const matrixCells = (matrix) => {
+  const cells = new Map()
+  matrix.rows.forEach((dept, i) => {
+    matrix.columns.forEach((year, j) => {
+      if (matrix.total[i][j] > 0) {
+        cells.set(`${dept}-${year}`, { dept, year, present: matrix.present[i][j], total: matrix.total[i][j] })
+      }
+    })
+  })
+  return cells
+}
+
+export default function PerformanceHeatmap({ data, matrix }) {
+  // Prefer the server-side matrix: its size does not depend on the record count
+  const hasMatrix = matrix && matrix.rows?.length > 0
+  if (!hasMatrix && (!data || data.length === 0)) {
     return (
       <Card className="border-0 shadow-lg">
         <CardContent className="p-6">
@@ -32,8 +47,8 @@ export default function PerformanceHeatmap({ data }) {
   }
 
   // Group by department and year from records
-  const heatmapData = new Map()
-  data.forEach(item => {
+  const heatmapData = hasMatrix ? matrixCells(matrix) : new Map()
+  if (!hasMatrix) data.forEach(item => {
     // Handle both analytics format (with present/total) and records format (with status)
     const dept = item.department || 'Unknown'
     const year = item.year || 'Unknown'
@@ -58,8 +73,8 @@ export default function PerformanceHeatmap({ data }) {
     }
   })
 
-  const departments = Array.from(new Set(Array.from(heatmapData.values()).map(v => v.dept)))
-  const years = Array.from(new Set(Array.from(heatmapData.values()).map(v => v.year)))
+  const departments = hasMatrix ? matrix.rows : Array.from(new Set(Array.from(heatmapData.values()).map(v => v.dept)))
+  const years = hasMatrix ? matrix.columns : Array.from(new Set(Array.from(heatmapData.values()).map(v => v.year)))
 
   const getColor = (percentage) => {
     if (percentage >= 80) return 'bg-green-500'
@@ -17,6 +17,9 @@ import { slideInUp, fadeIn, cardHover, springTransition } from '@/utils/animatio
 import { Users, CheckCircle, XCircle, AlertCircle, TrendingUp, Activity, Target, Award } from 'lucide-react'
 import { format, startOfWeek, startOfMonth, parseISO } from 'date-fns'
 
+// Daily trends longer than this are downsampled by get_analytics (max_points)
+const TREND_MAX_POINTS = 180
+
 // Helper function to calculate analytics from results data
 const calculateAnalyticsFromResults = (records, period = 'daily') => {
   if (!records || records.length === 0) {
@@ -105,6 +108,7 @@ const calculateAnalyticsFromResults = (records, period = 'daily') => {
 export default function Dashboard() {
   const [resultsData, setResultsData] = useState(null)
   const [analyticsData, setAnalyticsData] = useState(null)
+  const [deptYearMatrix, setDeptYearMatrix] = useState(null)
   const [loading, setLoading] = useState(true)
   const [filters, setFilters] = useState({})
   const [period, setPeriod] = useState('daily')
@@ -160,6 +164,26 @@ export default function Dashboard() {
         })
       }
 
+      // Department x year matrix for the heatmap, precomputed by get_analytics
+      try {
+        const matrixParams = {
+          view: 'dept_year_matrix',
+          ...(filters.department ? { department: filters.department } : {}),
+          ...(filters.year ? { year: filters.year } : {}),
+          ...(filters.division ? { division: filters.division } : {}),
+          ...(filters.start_date && filters.end_date
+            ? { start_date: filters.start_date, end_date: filters.end_date }
+            : filters.date
+            ? { start_date: filters.date, end_date: filters.date }
+            : {}),
+        }
+        const matrixResponse = await getAnalytics(matrixParams)
+        setDeptYearMatrix(matrixResponse?.analytics || null)
+      } catch (error) {
+        console.warn('Error fetching department/year matrix:', error)
+        setDeptYearMatrix(null)
+      }
+
       // Calculate analytics from fetched results data (CRITICAL: Use fetchedResults, not resultsData state)
       if (fetchedResults?.records && fetchedResults.records.length > 0) {
         console.log('📊 Calculating analytics from results data...', {
@@ -184,6 +208,7 @@ export default function Dashboard() {
             ...(filters.start_date && filters.end_date
               ? { start_date: filters.start_date, end_date: filters.end_date }
               : {}),
+            ...(period === 'daily' ? { max_points: TREND_MAX_POINTS } : {}),
           }
           
           const analyticsResponse = await getAnalytics(analyticsParams)
@@ -567,7 +592,7 @@ export default function Dashboard() {
         <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-4">
           {/* Performance Heatmap - Large */}
           <div className="lg:col-span-4">
-            <PerformanceHeatmap data={resultsData?.records || []} />
+            <PerformanceHeatmap matrix={deptYearMatrix} data={resultsData?.records || []} />
           </div>
         </div>
       )}
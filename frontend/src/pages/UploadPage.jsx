@@ -6,7 +6,7 @@ import { Input } from '@/components/ui/input'
 import { Label } from '@/components/ui/label'
 import { Progress } from '@/components/ui/progress'
 import { useToast } from '@/components/ui/use-toast'
-import { generatePresignedUrl, uploadFile } from '@/utils/api'
+import { generatePresignedUrl, uploadFile, getUploadStatus } from '@/utils/api'
 import { Upload, File, X, CheckCircle2, AlertCircle } from 'lucide-react'
 
 export default function UploadPage() {
@@ -14,6 +14,9 @@ export default function UploadPage() {
   const [uploading, setUploading] = useState(false)
   const [uploadProgress, setUploadProgress] = useState(0)
   const [lecture, setLecture] = useState('')
+  const [department, setDepartment] = useState('')
+  const [studentYear, setStudentYear] = useState('')
+  const [division, setDivision] = useState('')
   const [date, setDate] = useState(new Date().toISOString().split('T')[0])
   const dateInputRef = useRef(null)
   const { toast } = useToast()
@@ -78,6 +81,60 @@ export default function UploadPage() {
     multiple: false,
   })
 
+  const pollProcessingStatus = (uploadedFileName) => {
+    const startedAt = Date.now()
+    const POLL_INTERVAL_MS = 2000
+    const POLL_TIMEOUT_MS = 5 * 60 * 1000
+
+    const finish = (title, description, variant) => {
+      // Dispatch custom event to refresh dashboard
+      window.dispatchEvent(new CustomEvent('refreshDashboard'))
+      toast({ title, description, ...(variant ? { variant } : {}) })
+    }
+
+    const poll = async () => {
+      let status
+      try {
+        status = await getUploadStatus(uploadedFileName)
+      } catch (error) {
+        // Status endpoint unavailable - fall back to a fixed wait
+        console.warn('Upload status unavailable, falling back to fixed wait:', error)
+        setTimeout(() => finish('Processing complete', 'Attendance data has been processed. Check the dashboard for updates.'), 10000)
+        return
+      }
+
+      if (status.status === 'COMPLETED') {
+        finish('Processing complete', `${status.records_processed ?? 0} attendance records processed. Check the dashboard for updates.`)
+      } else if (status.status === 'DUPLICATE') {
+        finish('Already processed', 'An identical file was already processed for this date and lecture.')
+      } else if (status.status === 'REJECTED') {
+        toast({
+          title: 'Upload rejected',
+          description: status.error || 'The file does not match the attendance template.',
+          variant: 'destructive',
+        })
+      } else if (status.status === 'FAILED') {
+        toast({
+          title: 'Processing failed',
+          description: status.error || 'The uploaded file could not be processed.',
+          variant: 'destructive',
+        })
+      } else if (Date.now() - startedAt > POLL_TIMEOUT_MS) {
+        toast({
+          title: 'Still processing',
+          description: 'Processing is taking longer than usual. Check the dashboard again in a few minutes.',
+        })
+      } else {
+        if (status.status === 'PROCESSING' && status.progress_percentage != null) {
+          console.log(`Processing ${uploadedFileName}: ${status.progress_percentage}%`)
+        }
+        setTimeout(poll, POLL_INTERVAL_MS)
+      }
+    }
+
+    setTimeout(poll, POLL_INTERVAL_MS)
+  }
+
   const handleUpload = async () => {
     if (!file) {
       toast({
@@ -270,7 +327,11 @@ export default function UploadPage() {
       // IMPORTANT: Send selectedDate (from DOM), not the React state
       let presignedResponse
       try {
-        presignedResponse = await generatePresignedUrl(selectedDate, lecture, fileName, contentType)
+        presignedResponse = await generatePresignedUrl(selectedDate, lecture, fileName, contentType, {
+          department,
+          year: studentYear,
+          division,
+        })
       } catch (error) {
         // Handle errors from Lambda
         console.error('Error generating presigned URL:', error)
@@ -365,7 +426,7 @@ export default function UploadPage() {
 
       // Upload file
       console.log('Uploading file to S3...')
-      await uploadFile(file, presignedUrl)
+      await uploadFile(file, presignedUrl, presignedResponse.upload_headers)
       
       clearInterval(progressInterval)
       setUploadProgress(100)
@@ -382,16 +443,8 @@ export default function UploadPage() {
         setUploadProgress(0)
       }, 2000)
 
-      // Trigger dashboard refresh after processing (wait for Lambda to process)
-      // The Lambda typically processes within 5-10 seconds
-      setTimeout(() => {
-        // Dispatch custom event to refresh dashboard
-        window.dispatchEvent(new CustomEvent('refreshDashboard'))
-        toast({
-          title: 'Processing complete',
-          description: 'Attendance data has been processed. Check the dashboard for updates.',
-        })
-      }, 10000) // Wait 10 seconds for Lambda to process
+      // Poll the processing status and refresh the dashboard when done
+      pollProcessingStatus(presignedResponse.file_name)
     } catch (error) {
       console.error('Upload error:', error)
       console.error('Error details:', {
@@ -573,6 +626,42 @@ export default function UploadPage() {
             </div>
           </div>
 
+          {/* Target Class - enables Absent marking for the whole division */}
+          <div className="grid grid-cols-1 md:grid-cols-3 gap-4">
+            <div className="space-y-2">
+              <Label htmlFor="department">Department (Optional)</Label>
+              <Input
+                id="department"
+                placeholder="e.g., Computer"
+                value={department}
+                onChange={(e) => setDepartment(e.target.value)}
+              />
+            </div>
+            <div className="space-y-2">
+              <Label htmlFor="student-year">Year (Optional)</Label>
+              <Input
+                id="student-year"
+                placeholder="e.g., 2"
+                value={studentYear}
+                onChange={(e) => setStudentYear(e.target.value)}
+              />
+            </div>
+            <div className="space-y-2">
+              <Label htmlFor="division">Division (Optional)</Label>
+              <Input
+                id="division"
+                placeholder="e.g., A"
+                value={division}
+                onChange={(e) => setDivision(e.target.value)}
+              />
+            </div>
+          </div>
+          {(department || studentYear || division) && !(department && studentYear && division) && (
+            <p className="text-xs text-muted-foreground">
+              Fill in department, year and division to mark students of that class who are missing from the sheet as Absent.
+            </p>
+          )}
+
           {/* Dropzone */}
           <div
             {...getRootProps()}
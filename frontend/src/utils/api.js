@@ -66,16 +66,34 @@ export const getResults = async (params = {}) => {
   }
 }
 
-export const getAnalytics = async (params = {}) => {
+// Follow-up requests per analytics query; past this the last partial result is returned
+const MAX_ANALYTICS_FOLLOW_UPS = 20
+
+// Budgeted queries return partial results with a continuation token: follow the
+// tokens until the result is complete, passing each partial result to onPartial.
+// Tokens carry running aggregates and can outgrow URL limits, so they are POSTed.
+export const getAnalytics = async (params = {}, { onPartial } = {}) => {
   try {
-    const response = await api.get('/analytics', { params })
+    let response = await api.get('/analytics', { params })
+    let followUps = 0
+    while (response.data?.partial && response.data.continuation) {
+      if (followUps >= MAX_ANALYTICS_FOLLOW_UPS) {
+        console.warn(`Analytics still partial after ${followUps} follow-up requests, showing partial result`)
+        break
+      }
+      if (onPartial) {
+        onPartial(response.data)
+      }
+      response = await api.post('/analytics', { continuation: response.data.continuation }, { params })
+      followUps += 1
+    }
     return response.data
   } catch (error) {
     throw error
   }
 }
 
-export const generatePresignedUrl = async (date, lecture, fileName, contentType) => {
+export const generatePresignedUrl = async (date, lecture, fileName, contentType, targetClass = {}) => {
   try {
     // CRITICAL: Ensure date is a valid string, not empty, not null, not undefined
     const dateToSend = date && typeof date === 'string' && date.trim().length >= 10 
@@ -96,6 +114,13 @@ export const generatePresignedUrl = async (date, lecture, fileName, contentType)
       content_type: contentType,
     }
     
+    // Optional target class - the Lambda only uses it when all three are set
+    if (targetClass.department && targetClass.year && targetClass.division) {
+      requestBody.department = targetClass.department
+      requestBody.year = targetClass.year
+      requestBody.division = targetClass.division
+    }
+    
     console.log('=== API REQUEST: generate-presigned-url ===')
     console.log('URL: /generate-presigned-url')
     console.log('Method: POST')
@@ -194,7 +219,7 @@ export const generatePresignedUrl = async (date, lecture, fileName, contentType)
   }
 }
 
-export const uploadFile = async (file, presignedUrl) => {
+export const uploadFile = async (file, presignedUrl, uploadHeaders = {}) => {
   try {
     console.log('Uploading file:', {
       fileName: file.name,
@@ -206,6 +231,8 @@ export const uploadFile = async (file, presignedUrl) => {
     const response = await axios.put(presignedUrl, file, {
       headers: {
         'Content-Type': file.type || 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        // Metadata headers signed into the presigned URL (e.g. target class)
+        ...(uploadHeaders || {}),
       },
       timeout: 30000, // 30 second timeout
       onUploadProgress: (progressEvent) => {
@@ -300,5 +327,32 @@ export const getEntryLogs = async (params = {}) => {
   }
 }
 
+export const getLiveStats = async (params = {}) => {
+  try {
+    const response = await api.get('/live-stats', { params })
+    return response.data
+  } catch (error) {
+    throw error
+  }
+}
+
+export const getUploadStatus = async (fileName) => {
+  try {
+    const response = await api.get('/upload-status', { params: { file_name: fileName } })
+    return response.data
+  } catch (error) {
+    throw error
+  }
+}
+
+export const getDefaulters = async (params = {}) => {
+  try {
+    const response = await api.get('/defaulters', { params })
+    return response.data
+  } catch (error) {
+    throw error
+  }
+}
+
 export default api
 